@@ -1,6 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, m2m_changed
 from django.dispatch import receiver
 
 
@@ -42,4 +42,55 @@ def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
         instance.profile.save()
     else:
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+        UserProfile.objects.create(user=instance)
+
+
+@receiver(m2m_changed, sender=UserProfile.favorite_categories.through)
+def refresh_feed_on_favorites_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Rebuild materialized feeds (after commit) when users' favorite categories change"""
+    if action == 'pre_clear':
+        # pk_set is None on post_clear - remember who followed what
+        if reverse:
+            # category.interested_users.clear() - instance is the category
+            instance._feed_user_ids_before_clear = list(
+                sender.objects.filter(category_id=instance.pk).values_list('userprofile__user_id', flat=True)
+            )
+        else:
+            instance._feed_category_ids_before_clear = list(
+                sender.objects.filter(userprofile_id=instance.pk).values_list('category_id', flat=True)
+            )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    from topicsloop.cache import bump_generation
+    from blog.feeds import cooled_category_ids
+
+    # Audience sizes changed - hot category set must be recomputed
+    bump_generation('favorites')
+
+    if not reverse:
+        user_ids = [instance.user_id]
+        if action == 'post_clear':
+            removed = dict.fromkeys(instance.__dict__.pop('_feed_category_ids_before_clear', []), 1)
+        else:
+            removed = dict.fromkeys(pk_set or [], 1) if action == 'post_remove' else {}
+    elif action == 'post_clear':
+        user_ids = instance.__dict__.pop('_feed_user_ids_before_clear', [])
+        removed = {instance.pk: len(user_ids)}
+    else:
+        # category.interested_users.add(...) - instance is the category
+        user_ids = list(UserProfile.objects.filter(id__in=pk_set or []).values_list('user_id', flat=True))
+        removed = {instance.pk: len(user_ids)} if action == 'post_remove' else {}
+
+    # Categories that just fell below the hot threshold are no longer merged on read
+    cooled_ids = cooled_category_ids(removed)
+
+    def rebuild():
+        from blog.feeds import rebuild_user_feed, backfill_category_followers
+        for user_id in user_ids:
+            rebuild_user_feed(user_id)
+        if cooled_ids:
+            backfill_category_followers(cooled_ids)
+
+    transaction.on_commit(rebuild)
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0001_initial'),
+        ('blog', '0009_feedentry'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='categoryembedding',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='categoryembedding',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text="Hash of the category text used for 'text' embeddings", max_length=64),
+        ),
+        migrations.AddField(
+            model_name='categoryembedding',
+            name='source',
+            field=models.CharField(choices=[('posts', 'Mean of post embeddings'), ('text', 'Category name/description text')], default='posts', help_text='What the vector was built from', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='categoryembedding',
+            name='aggregated_vector',
+            field=models.JSONField(help_text='Vector aggregated from all posts in this category (or encoded from its text)'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='categoryembedding',
+            unique_together={('category', 'model_name', 'source')},
+        ),
+    ]
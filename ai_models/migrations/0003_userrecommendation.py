@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0002_categoryembedding_source'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=100)),
+                ('post_ids', models.JSONField(default=list, help_text='Recommended post ids, best first')),
+                ('scores', models.JSONField(default=list, help_text='Similarity score of each post in post_ids')),
+                ('source_updated_at', models.DateTimeField(help_text='updated_at of the UserEmbedding the list was computed from')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stored_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['computed_at'], name='ai_models_u_compute_7897be_idx')],
+                'unique_together': {('user', 'model_name')},
+            },
+        ),
+    ]
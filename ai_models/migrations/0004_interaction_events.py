@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:26
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0003_userrecommendation'),
+        ('blog', '0009_feedentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InteractionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('event_type', models.CharField(choices=[('view', 'Post view'), ('similar_click', 'Click on a similar post'), ('recommendation_click', 'Click on a recommendation'), ('graph_focus', 'Post focused in the network graph')], max_length=30)),
+                ('event_count', models.PositiveIntegerField(default=0)),
+                ('user_count', models.PositiveIntegerField(default=0, help_text='Distinct signed-in users')),
+                ('post', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='interaction_rollups', to='blog.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['post', 'date'], name='ai_models_i_post_id_68fd43_idx')],
+                'unique_together': {('date', 'post', 'event_type')},
+            },
+        ),
+        migrations.CreateModel(
+            name='InteractionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('view', 'Post view'), ('similar_click', 'Click on a similar post'), ('recommendation_click', 'Click on a recommendation'), ('graph_focus', 'Post focused in the network graph')], max_length=30)),
+                ('session_key', models.CharField(blank=True, help_text='Session of an anonymous visitor', max_length=40)),
+                ('context_post_id', models.PositiveIntegerField(blank=True, help_text='Post the interaction started from (e.g. the page listing similar posts)', null=True)),
+                ('source', models.CharField(blank=True, help_text='UI element or endpoint that produced the event', max_length=30)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('post', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='interaction_events', to='blog.post')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='interaction_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='ai_models_i_user_id_11031f_idx'), django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='ai_models_i_created_df95e2_brin')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0004_interaction_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreamCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position', models.BigIntegerField(default=0, help_text='Id of the last processed InteractionEvent')),
+                ('processed_events', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0005_streamcursor'),
+        ('blog', '0009_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostPopularity',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='blog.post')),
+                ('log_score', models.FloatField(help_text='log2 of the decayed popularity, relative to the popularity epoch')),
+                ('interaction_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('centrality', models.FloatField(default=0.0, help_text="Sum of the post's similarity scores")),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('root_category', models.ForeignKey(blank=True, help_text="Root of the post's primary category", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-log_score'], name='ai_models_p_log_sco_31bcb1_idx'), models.Index(fields=['root_category', '-log_score'], name='ai_models_p_root_ca_844930_idx')],
+            },
+        ),
+    ]
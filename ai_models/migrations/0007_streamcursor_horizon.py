@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0006_postpopularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='streamcursor',
+            name='horizon',
+            field=models.BigIntegerField(default=0, help_text='Highest id of the table at horizon_at'),
+        ),
+        migrations.AddField(
+            model_name='streamcursor',
+            name='horizon_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='streamcursor',
+            name='position',
+            field=models.BigIntegerField(default=0, help_text='Id of the last processed row'),
+        ),
+    ]
@@ -1,10 +1,18 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import BrinIndex
+from django.utils import timezone
 from blog.models import Post
 from accounts.models import CustomUser
 import json
+import logging
 import numpy as np
 from django.core.exceptions import ValidationError
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from topicsloop.cache import bump_generation
+
+logger = logging.getLogger(__name__)
 
 
 class BaseEmbedding(models.Model):
@@ -212,27 +220,43 @@ class UserEmbedding(BaseEmbedding):
 
 class CategoryEmbedding(BaseEmbedding):
     """
-    Embeddings for categories based on aggregated posts
+    Embeddings for categories based on aggregated posts or on the category text
     """
+    SOURCE_CHOICES = [
+        ('posts', 'Mean of post embeddings'),
+        ('text', 'Category name/description text'),
+    ]
+
     category = models.ForeignKey(
         'blog.Category',
         on_delete=models.CASCADE,
         related_name='embeddings'
     )
+    source = models.CharField(
+        max_length=10,
+        choices=SOURCE_CHOICES,
+        default='posts',
+        help_text="What the vector was built from"
+    )
     aggregated_vector = models.JSONField(
-        help_text="Vector aggregated from all posts in this category"
+        help_text="Vector aggregated from all posts in this category (or encoded from its text)"
     )
     vector_dimension = models.PositiveIntegerField()
     post_count = models.PositiveIntegerField(
         default=0,
         help_text="Number of posts used to create this aggregation"
     )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="Hash of the category text used for 'text' embeddings"
+    )
 
     class Meta:
-        unique_together = ('category', 'model_name')
+        unique_together = ('category', 'model_name', 'source')
 
     def __str__(self):
-        return f"Category embedding for '{self.category.name}' ({self.model_name})"
+        return f"Category embedding for '{self.category.name}' ({self.model_name}, {self.source})"
 
     def save(self, *args, **kwargs):
         if self.aggregated_vector:
@@ -240,6 +264,191 @@ class CategoryEmbedding(BaseEmbedding):
         super().save(*args, **kwargs)
 
 
+class UserRecommendation(models.Model):
+    """
+    Precomputed ranked recommendation list for a user
+    Written by the batch recommender (gnn_models.batch_recommendations);
+    RecommendationsView filters it at read time instead of scoring live.
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='stored_recommendations'
+    )
+    model_name = models.CharField(max_length=100)
+    post_ids = models.JSONField(
+        default=list,
+        help_text="Recommended post ids, best first"
+    )
+    scores = models.JSONField(
+        default=list,
+        help_text="Similarity score of each post in post_ids"
+    )
+    source_updated_at = models.DateTimeField(
+        help_text="updated_at of the UserEmbedding the list was computed from"
+    )
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'model_name')
+        indexes = [
+            models.Index(fields=['computed_at']),
+        ]
+
+    def __str__(self):
+        return f"{len(self.post_ids)} recommendations for user {self.user_id} ({self.model_name})"
+
+
+class InteractionEvent(models.Model):
+    """
+    Append-only log of user interactions with posts (views, clicks, graph focus)
+    Written in batches by the in-process event buffer (api.events), never per
+    request. No FK constraints, so a post or user deleted while events wait in
+    a buffer cannot fail a whole flush; daily totals live in InteractionDailyRollup.
+    """
+    EVENT_TYPE_CHOICES = [
+        ('view', 'Post view'),
+        ('similar_click', 'Click on a similar post'),
+        ('recommendation_click', 'Click on a recommendation'),
+        ('graph_focus', 'Post focused in the network graph'),
+    ]
+
+    event_type = models.CharField(max_length=30, choices=EVENT_TYPE_CHOICES)
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True, blank=True,
+        related_name='interaction_events'
+    )
+    session_key = models.CharField(
+        max_length=40,
+        blank=True,
+        help_text="Session of an anonymous visitor"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='interaction_events'
+    )
+    context_post_id = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Post the interaction started from (e.g. the page listing similar posts)"
+    )
+    source = models.CharField(
+        max_length=30,
+        blank=True,
+        help_text="UI element or endpoint that produced the event"
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            # Rows arrive in time order - a BRIN index covers day ranges at a fraction of a btree's size
+            BrinIndex(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} of post {self.post_id} by {self.user_id or 'anonymous'}"
+
+
+class InteractionDailyRollup(models.Model):
+    """
+    Per day, post and event type totals of InteractionEvent
+    Recomputed by `python manage.py rollup_interactions`.
+    """
+    date = models.DateField()
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='interaction_rollups'
+    )
+    event_type = models.CharField(max_length=30, choices=InteractionEvent.EVENT_TYPE_CHOICES)
+    event_count = models.PositiveIntegerField(default=0)
+    user_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Distinct signed-in users"
+    )
+
+    class Meta:
+        unique_together = ('date', 'post', 'event_type')
+        indexes = [
+            models.Index(fields=['post', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date}: {self.event_count} x {self.event_type} of post {self.post_id}"
+
+
+class PostPopularity(models.Model):
+    """
+    Time-decayed popularity of a post, globally and within its root category
+    Maintained incrementally by gnn_models.popularity from new interaction
+    events, comments and posts. log_score is stored against a fixed epoch, so
+    rows updated at different times stay comparable and ordering by it
+    ranks posts by their current decayed popularity.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity'
+    )
+    root_category = models.ForeignKey(
+        'blog.Category',
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='+',
+        help_text="Root of the post's primary category"
+    )
+    log_score = models.FloatField(
+        help_text="log2 of the decayed popularity, relative to the popularity epoch"
+    )
+    interaction_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    centrality = models.FloatField(
+        default=0.0,
+        help_text="Sum of the post's similarity scores"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-log_score']),
+            models.Index(fields=['root_category', '-log_score']),
+        ]
+
+    def __str__(self):
+        return f"Popularity of post {self.post_id}: {self.log_score:.2f}"
+
+
+class StreamCursor(models.Model):
+    """
+    Position of an incremental consumer in an append-only table (e.g. the InteractionEvent log)
+    Holds the id of the last row the consumer has applied; it is advanced
+    in the same transaction as the consumer's writes. Reads stop at the
+    horizon once it is old enough (see gnn_models.streams).
+    """
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(
+        default=0,
+        help_text="Id of the last processed row"
+    )
+    processed_events = models.BigIntegerField(default=0)
+    horizon = models.BigIntegerField(
+        default=0,
+        help_text="Highest id of the table at horizon_at"
+    )
+    horizon_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Cursor '{self.name}' at event {self.position}"
+
+
 class EmbeddingJob(models.Model):
     """
     Tracks embedding generation jobs for async processing
@@ -274,4 +483,70 @@ class EmbeddingJob(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.job_type} job for ID {self.target_id} ({self.status})"
\ No newline at end of file
+        return f"{self.job_type} job for ID {self.target_id} ({self.status})"
+
+
+@receiver([post_save, post_delete], sender=PostEmbedding)
+@receiver([post_save, post_delete], sender=CategoryEmbedding)
+def invalidate_embedding_caches(sender, **kwargs):
+    """Anything derived from stored vectors (centroids, similarity graphs) is stale"""
+    bump_generation('embeddings')
+
+
+def _schedule_centroid_changes(changes, model_name):
+    """Apply (category_id, vector, sign) changes to the stored centroids after commit"""
+    def apply():
+        try:
+            from gnn_models.centroids import apply_centroid_changes
+            apply_centroid_changes(changes, model_name=model_name)
+        except Exception as e:
+            logger.warning(f"Incremental centroid update failed ({model_name}): {e}")
+
+    transaction.on_commit(apply)
+
+
+@receiver(pre_save, sender=PostEmbedding)
+def remember_previous_post_vector(sender, instance, raw=False, **kwargs):
+    """Keep the stored vector so post_save can replace it in the category centroid"""
+    if raw or instance.pk is None:
+        return
+    instance._previous_vector = PostEmbedding.objects.filter(pk=instance.pk).values_list(
+        'embedding_vector', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=PostEmbedding)
+def update_centroid_for_post_vector(sender, instance, raw=False, **kwargs):
+    """Swap the post's old vector for the new one in its primary category centroid"""
+    previous = instance.__dict__.pop('_previous_vector', None)
+    if raw or previous == instance.embedding_vector:
+        return
+    category_id = Post.objects.filter(pk=instance.post_id).values_list('primary_category_id', flat=True).first()
+    if category_id is None:
+        return
+    changes = [(category_id, instance.embedding_vector, 1)]
+    if previous is not None:
+        changes.append((category_id, previous, -1))
+    _schedule_centroid_changes(changes, instance.model_name)
+
+
+@receiver(pre_delete, sender=PostEmbedding)
+def remove_post_vector_from_centroid(sender, instance, **kwargs):
+    """Embedding (or its post) is being deleted - take it out of the category centroid"""
+    category_id = Post.objects.filter(pk=instance.post_id).values_list('primary_category_id', flat=True).first()
+    if category_id is not None:
+        _schedule_centroid_changes([(category_id, instance.embedding_vector, -1)], instance.model_name)
+
+
+@receiver(post_save, sender=UserEmbedding)
+def refresh_changed_user_recommendations(sender, instance, **kwargs):
+    """Interest vector changed - recompute the stored list instead of waiting for the schedule"""
+    def refresh():
+        try:
+            from gnn_models.batch_recommendations import refresh_user_recommendations
+            refresh_user_recommendations([instance.user_id], model_name=instance.model_name)
+        except Exception:
+            # The list predates the embedding, so the scheduled refresh_recommendations run picks it up
+            logger.exception(f"Recommendation refresh failed for user {instance.user_id} ({instance.model_name})")
+
+    transaction.on_commit(refresh)
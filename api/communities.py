@@ -0,0 +1,409 @@
+"""
+Community detection for collapsing dense regions of the network views
+
+At full scale the category and post graphs are hairballs. The
+`detect_communities` batch job clusters them with Louvain modularity
+optimisation (implemented on scipy sparse matrices):
+
+- 'categories' - category co-occurrence graph (posts shared by two categories)
+- 'posts'      - k-nearest-neighbour graph of post embeddings (cosine)
+
+The first phase moves nodes one at a time to the neighbouring community with
+the best modularity gain until nothing moves. The second phase merges each
+community into a single node (Pᵀ A P). The two phases repeat until a pass
+improves nothing. Nodes without edges are grouped into one "Unconnected"
+community.
+
+Membership, community summaries (label, size, top members) and
+community-to-community edges are stored in GraphClustering. With
+`collapse=clusters` the network endpoints return this community graph;
+`expand=<ids>` opens communities into their members (member_edges()
+recomputes the links among those members only).
+"""
+
+import logging
+import time
+from collections import Counter
+import numpy as np
+from scipy import sparse
+from topicsloop.cache import StampedMemo, bump_generation
+
+logger = logging.getLogger(__name__)
+
+COMMUNITY_GRAPHS = ('categories', 'posts')
+
+DEFAULT_RESOLUTION = 1.0
+MAX_LEVELS = 10
+MAX_SWEEPS = 20
+
+# Post kNN graph
+KNN_TOP_K = 10
+KNN_MIN_SIMILARITY = 0.3
+KNN_BLOCK_SIZE = 512
+
+TOP_MEMBERS = 5
+# Members shown per expanded community
+MAX_EXPANDED_MEMBERS = 300
+
+_clusterings = StampedMemo()
+
+
+# === Louvain ===
+
+def modularity(adjacency, membership, resolution=DEFAULT_RESOLUTION):
+    """Modularity of a partition of a symmetric weighted graph"""
+    total = adjacency.sum()
+    if total == 0:
+        return 0.0
+    assignment = sparse.csr_matrix(
+        (np.ones(len(membership)), (np.arange(len(membership)), membership))
+    )
+    community_graph = assignment.T @ adjacency @ assignment
+    internal = community_graph.diagonal()
+    degree = np.asarray(community_graph.sum(axis=1)).ravel()
+    return float(np.sum(internal / total - resolution * (degree / total) ** 2))
+
+
+def _local_moving(adjacency, resolution, rng):
+    """Phase 1: greedy node moves; returns (community per node, whether anything moved)"""
+    n = adjacency.shape[0]
+    total = adjacency.sum()
+    degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    community = np.arange(n)
+    community_degree = degree.copy()
+    indptr, indices, weights = adjacency.indptr, adjacency.indices, adjacency.data
+
+    improved = False
+    for _ in range(MAX_SWEEPS):
+        moved = 0
+        for node in rng.permutation(n):
+            current = community[node]
+            links = {}
+            for neighbour, weight in zip(indices[indptr[node]:indptr[node + 1]], weights[indptr[node]:indptr[node + 1]]):
+                if neighbour != node:
+                    target = community[neighbour]
+                    links[target] = links.get(target, 0.0) + weight
+
+            community_degree[current] -= degree[node]
+            scale = resolution * degree[node] / total
+            best = current
+            best_gain = links.get(current, 0.0) - scale * community_degree[current]
+            for target, weight in links.items():
+                gain = weight - scale * community_degree[target]
+                if gain > best_gain + 1e-12:
+                    best, best_gain = target, gain
+            community_degree[best] += degree[node]
+
+            if best != current:
+                community[node] = best
+                moved += 1
+        if not moved:
+            break
+        improved = True
+    return community, improved
+
+
+def louvain(adjacency, resolution=DEFAULT_RESOLUTION, seed=0):
+    """
+    Louvain communities of a symmetric weighted graph
+
+    Args:
+        adjacency: Symmetric scipy sparse matrix
+        resolution: Higher values give more, smaller communities
+
+    Returns:
+        Array with the community number (0..k-1) of every node
+    """
+    rng = np.random.default_rng(seed)
+    graph = sparse.csr_matrix(adjacency, dtype=np.float64)
+    membership = np.arange(graph.shape[0])
+    if graph.nnz == 0:
+        return membership
+
+    for _ in range(MAX_LEVELS):
+        community, improved = _local_moving(graph, resolution, rng)
+        if not improved:
+            break
+        _, community = np.unique(community, return_inverse=True)
+        membership = community[membership]
+        assignment = sparse.csr_matrix(
+            (np.ones(len(community)), (np.arange(len(community)), community))
+        )
+        graph = (assignment.T @ graph @ assignment).tocsr()
+
+    _, membership = np.unique(membership, return_inverse=True)
+    return membership
+
+
+# === Source graphs ===
+
+def _category_graph(category_ids=None):
+    """(node ids, adjacency) of the category co-occurrence graph"""
+    from blog.category_tree import get_category_tree
+    from .cooccurrence import category_cooccurrence
+
+    pairs = category_cooccurrence(category_ids=category_ids)
+    if category_ids is None:
+        category_ids = list(get_category_tree().parent)
+    index = {category_id: position for position, category_id in enumerate(category_ids)}
+    rows, columns, weights = [], [], []
+    for category_a, category_b, shared in pairs:
+        rows.append(index[category_a])
+        columns.append(index[category_b])
+        weights.append(shared)
+    adjacency = sparse.coo_matrix((weights, (rows, columns)), shape=(len(category_ids),) * 2).tocsr()
+    return list(category_ids), adjacency + adjacency.T
+
+
+def _post_knn_graph(post_ids=None, top_k=KNN_TOP_K):
+    """(node ids, adjacency) of the post embedding kNN graph"""
+    from ai_models.models import PostEmbedding
+    from gnn_models.centroids import DEFAULT_MODEL_NAME
+
+    embeddings = PostEmbedding.objects.filter(model_name=DEFAULT_MODEL_NAME)
+    if post_ids is not None:
+        embeddings = embeddings.filter(post_id__in=post_ids)
+    rows = list(embeddings.values_list('post_id', 'embedding_vector'))
+    node_ids = [post_id for post_id, _ in rows]
+    n = len(rows)
+    if n < 2:
+        return node_ids, sparse.csr_matrix((n, n))
+
+    matrix = np.asarray([vector for _, vector in rows], dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    k = min(top_k, n - 1)
+
+    sources, targets, weights = [], [], []
+    for start in range(0, n, KNN_BLOCK_SIZE):
+        similarity = matrix[start:start + KNN_BLOCK_SIZE] @ matrix.T
+        block_rows = np.arange(similarity.shape[0])
+        similarity[block_rows, start + block_rows] = -np.inf
+        best = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(similarity, best, axis=1)
+        keep = best_scores >= KNN_MIN_SIMILARITY
+        sources.append(np.repeat(start + block_rows, k)[keep.ravel()])
+        targets.append(best[keep])
+        weights.append(best_scores[keep])
+
+    adjacency = sparse.coo_matrix(
+        (np.concatenate(weights), (np.concatenate(sources), np.concatenate(targets))), shape=(n, n)
+    ).tocsr()
+    # Symmetrize: keep the stronger direction of each pair
+    return node_ids, adjacency.maximum(adjacency.T)
+
+
+def _source_graph(graph_key, node_ids=None):
+    if graph_key == 'categories':
+        return _category_graph(node_ids)
+    return _post_knn_graph(node_ids)
+
+
+def _node_labels(graph_key, node_ids):
+    """Display names used to label communities"""
+    if graph_key == 'categories':
+        from blog.category_tree import get_category_tree
+        names = get_category_tree().name
+        return {category_id: names.get(category_id, str(category_id)) for category_id in node_ids}
+
+    from blog.models import Post
+    return dict(Post.objects.filter(id__in=node_ids).values_list('id', 'primary_category__name'))
+
+
+# === Stored clusterings ===
+
+def detect_communities(graph_key, resolution=DEFAULT_RESOLUTION):
+    """
+    Cluster one graph and store the result
+
+    Returns:
+        The saved GraphClustering
+    """
+    from .models import GraphClustering
+
+    started = time.time()
+    node_ids, adjacency = _source_graph(graph_key)
+    membership = louvain(adjacency, resolution=resolution)
+    score = modularity(adjacency, membership, resolution) if len(node_ids) else 0.0
+
+    degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    isolated = degree == 0
+    if isolated.any():
+        # Singletons without edges - one shared community instead of hundreds
+        connected_ids, membership[~isolated] = np.unique(membership[~isolated], return_inverse=True)
+        membership[isolated] = len(connected_ids)
+
+    community_count = int(membership.max()) + 1 if len(membership) else 0
+    labels = _node_labels(graph_key, node_ids)
+    communities = []
+    for community in range(community_count):
+        members = np.flatnonzero(membership == community)
+        top = members[np.argsort(-degree[members], kind='stable')[:TOP_MEMBERS]]
+        if isolated[members].all():
+            label = 'Unconnected'
+        elif graph_key == 'categories':
+            label = ', '.join(labels[node_ids[member]] for member in top[:3])
+        else:
+            # Posts: most common primary category among the members
+            counts = Counter(labels.get(node_ids[member]) for member in members)
+            label = next((name for name, _ in counts.most_common() if name), 'Uncategorized')
+        communities.append({
+            'id': community,
+            'label': label,
+            'size': len(members),
+            'top_members': [node_ids[member] for member in top],
+        })
+
+    assignment = sparse.csr_matrix(
+        (np.ones(len(membership)), (np.arange(len(membership)), membership)), shape=(len(membership), community_count)
+    )
+    between = sparse.triu(assignment.T @ adjacency @ assignment, k=1).tocoo()
+    community_edges = sorted(
+        ([int(a), int(b), round(float(weight), 3)] for a, b, weight in zip(between.row, between.col, between.data)),
+        key=lambda edge: -edge[2]
+    )
+
+    clustering, _ = GraphClustering.objects.update_or_create(
+        graph_key=graph_key,
+        defaults={
+            'membership': {str(node_id): int(community) for node_id, community in zip(node_ids, membership)},
+            'communities': communities,
+            'community_edges': community_edges,
+            'modularity': score,
+            'node_count': len(node_ids),
+            'edge_count': adjacency.nnz // 2,
+            'computation_time': time.time() - started,
+        }
+    )
+    bump_generation('communities')
+    logger.info(f"Communities '{graph_key}': {community_count} for {len(node_ids)} nodes "
+                f"(modularity {score:.3f}) in {clustering.computation_time:.1f}s")
+    return clustering
+
+
+def get_clustering(graph_key):
+    """
+    Stored GraphClustering (None if never computed)
+
+    Memoized per row version (id, updated_at), so a detect_communities run
+    in another process is picked up; a missing clustering is not memoized.
+    """
+    from .models import GraphClustering
+
+    rows = GraphClustering.objects.filter(graph_key=graph_key)
+    return _clusterings.get(
+        graph_key,
+        stamp=lambda: rows.values_list('id', 'updated_at').first(),
+        load=lambda: rows.first(),
+        generations=('communities',),
+    )
+
+
+def community_members(clustering, community):
+    """Node ids (ints) in one community"""
+    return [int(node_id) for node_id, member_of in clustering.membership.items() if member_of == community]
+
+
+def community_graph(clustering, expand=()):
+    """
+    GraphBuilder with one node per community and the links between them
+
+    Args:
+        clustering: GraphClustering
+        expand: Community numbers the caller will open into member nodes
+    """
+    from .graph_builder import GraphBuilder
+
+    graph = GraphBuilder()
+    for community in clustering.communities:
+        graph.add_node(
+            f"community_{community['id']}",
+            kind='community',
+            label=f"{community['label']} ({community['size']})",
+            type='community',
+            community_id=community['id'],
+            member_count=community['size'],
+            expanded=community['id'] in expand,
+            title=f"{community['label']}\n{community['size']} members - click to expand",
+            shape='dot',
+            size=min(int(15 + 4 * community['size'] ** 0.5), 150),
+            value=community['size'],
+        )
+    for community_a, community_b, weight in clustering.community_edges:
+        graph.add_edge(
+            f'community_{community_a}', f'community_{community_b}',
+            value=weight,
+            title=f'Links between communities: {weight:g}',
+            width=min(1 + weight ** 0.5, 10),
+        )
+    return graph
+
+
+def member_edges(graph_key, member_ids):
+    """
+    Links among the given nodes only (for expanded communities)
+
+    Returns:
+        List of (node_a, node_b, weight) with node_a < node_b
+    """
+    node_ids, adjacency = _source_graph(graph_key, member_ids)
+    upper = sparse.triu(adjacency, k=1).tocoo()
+    return [
+        (min(node_ids[a], node_ids[b]), max(node_ids[a], node_ids[b]), float(weight))
+        for a, b, weight in zip(upper.row, upper.col, upper.data)
+    ]
+
+
+def parse_expand(value):
+    """'3,7' -> {3, 7} (invalid entries ignored)"""
+    return {int(part) for part in (value or '').split(',') if part.strip().isdigit()}
+
+
+def collapsed_network(graph_key, expand, member_nodes, node_id):
+    """
+    Response for collapse=clusters: community graph with some communities opened
+
+    Args:
+        graph_key: 'categories' or 'posts'
+        expand: Community numbers to open into member nodes
+        member_nodes: Callable(member_ids) -> {member_id: vis.js node fields}
+        node_id: Callable(member_id) -> vis.js node id used by the view
+
+    Returns:
+        {'nodes', 'edges', 'stats'}, or None if no clustering is stored
+    """
+    clustering = get_clustering(graph_key)
+    if clustering is None:
+        return None
+
+    expand = {community for community in expand if community < len(clustering.communities)}
+    graph = community_graph(clustering, expand)
+    truncated = []
+
+    for community in sorted(expand):
+        members = community_members(clustering, community)
+        if len(members) > MAX_EXPANDED_MEMBERS:
+            truncated.append(community)
+            members = members[:MAX_EXPANDED_MEMBERS]
+
+        hub = f'community_{community}'
+        for member, fields in member_nodes(members).items():
+            graph.add_node(node_id(member), kind='member', community_id=community, **fields)
+            graph.add_edge(hub, node_id(member), color={'color': '#dfe6e9'}, width=1, dashes=True)
+        for member_a, member_b, weight in member_edges(graph_key, members):
+            graph.add_edge(node_id(member_a), node_id(member_b), value=weight, title=f'{weight:.3g}')
+
+    return {
+        **graph.to_vis(),
+        'stats': {
+            'collapse': 'clusters',
+            'communities': len(clustering.communities),
+            'expanded': sorted(expand),
+            'truncated': truncated,
+            'member_nodes': graph.node_count('member'),
+            'total_nodes': graph.node_count(),
+            'total_edges': graph.edge_count(),
+            'clustered_nodes': clustering.node_count,
+            'modularity': round(clustering.modularity, 4),
+            'computed_at': clustering.updated_at.isoformat(),
+        }
+    }
@@ -0,0 +1,110 @@
+"""
+Category co-occurrence counts for the category network views
+
+Two categories are connected when posts are filed under both of them. The
+counts are computed in PostgreSQL: primary and additional categories are
+unioned into one (post_id, category_id) relation, optionally mapped to
+their ancestor at a given level, and self-joined on post_id keeping only
+pairs with category_a < category_b. Python receives just the edge list,
+so memory does not depend on the number of posts.
+
+Results are cached against the posts and categories generations.
+"""
+
+from django.core.cache import cache
+from django.db import connection
+from blog.models import Post, Category
+from topicsloop.cache import versioned_key
+
+COOCCURRENCE_CACHE_TIMEOUT = 3600
+
+
+def _cooccurrence_sql(rollup_level, category_ids):
+    post_table = Post._meta.db_table
+    additional_table = Post.additional_categories.through._meta.db_table
+    category_table = Category._meta.db_table
+    params = []
+
+    if rollup_level is None:
+        rollup_cte = ''
+        mapped_select = 'SELECT post_id, category_id FROM post_categories'
+    else:
+        # Every category paired with each of its ancestors (and itself);
+        # categories shallower than rollup_level map to themselves
+        rollup_cte = f"""
+            ancestry AS (
+                SELECT id AS category_id, id AS ancestor_id, level AS ancestor_level, level AS own_level
+                FROM {category_table}
+                UNION ALL
+                SELECT a.category_id, p.id, p.level, a.own_level
+                FROM ancestry a
+                JOIN {category_table} c ON c.id = a.ancestor_id
+                JOIN {category_table} p ON p.id = c.parent_id
+            ),
+        """
+        mapped_select = """
+            SELECT DISTINCT pc.post_id, a.ancestor_id AS category_id
+            FROM post_categories pc
+            JOIN ancestry a ON a.category_id = pc.category_id
+            WHERE a.ancestor_level = LEAST(a.own_level, %s)
+        """
+        params.append(rollup_level)
+
+    category_filter = ''
+    if category_ids is not None:
+        category_filter = 'WHERE category_id = ANY(%s)'
+        params.append(list(category_ids))
+
+    sql = f"""
+        WITH RECURSIVE {rollup_cte}
+        post_categories AS (
+            SELECT id AS post_id, primary_category_id AS category_id
+            FROM {post_table}
+            WHERE primary_category_id IS NOT NULL
+            UNION
+            SELECT post_id, category_id
+            FROM {additional_table}
+        ),
+        mapped AS (
+            SELECT * FROM ({mapped_select}) m {category_filter}
+        )
+        SELECT a.category_id, b.category_id, COUNT(*) AS shared_posts
+        FROM mapped a
+        JOIN mapped b ON a.post_id = b.post_id AND a.category_id < b.category_id
+        GROUP BY a.category_id, b.category_id
+        ORDER BY shared_posts DESC, a.category_id, b.category_id
+    """
+    return sql, params
+
+
+def category_cooccurrence(category_ids=None, rollup_level=None):
+    """
+    Number of posts shared by each pair of categories
+
+    Args:
+        category_ids: Only count pairs within these categories (None = all)
+        rollup_level: Map categories to their ancestor at this level first,
+            so posts in subcategories count for the parent (None = no rollup)
+
+    Returns:
+        List of (category_a, category_b, shared_posts) with category_a < category_b,
+        strongest pairs first
+    """
+    if category_ids is not None:
+        category_ids = sorted(set(category_ids))
+        if len(category_ids) < 2:
+            return []
+
+    cache_key = versioned_key(
+        'category_cooccurrence',
+        (rollup_level, tuple(category_ids) if category_ids is not None else None),
+        generations=('posts', 'categories')
+    )
+    edges = cache.get(cache_key)
+    if edges is None:
+        sql, params = _cooccurrence_sql(rollup_level, category_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            edges = [tuple(row) for row in cursor.fetchall()]
+        cache.set(cache_key, edges, COOCCURRENCE_CACHE_TIMEOUT)
+    return edges
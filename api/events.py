@@ -0,0 +1,280 @@
+"""
+Interaction event ingestion
+
+Post views, clicks on similar posts/recommendations and graph focus events
+are recorded with record_event(), which only appends to an in-process ring
+buffer. A daemon thread flushes the buffer to InteractionEvent with one
+bulk_create every FLUSH_EVERY events or FLUSH_INTERVAL seconds, whichever
+comes first, so the request path never writes to the database per event.
+
+If the database falls behind, the buffer keeps the newest BUFFER_CAPACITY
+events and counts what it dropped (see get_buffer_stats()). Events still
+buffered when a process exits are flushed by an atexit hook; a killed
+process loses at most one interval of events.
+
+Sources:
+- InteractionEventMiddleware (api.middleware): post detail views and
+  post-network requests with focus_post_id
+- EventIngestView (/api/events/): batches sent by the frontend
+
+Daily totals are kept in InteractionDailyRollup by rollup_interactions().
+"""
+
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BUFFER_CAPACITY = 20000
+FLUSH_EVERY = 500
+FLUSH_INTERVAL = 5
+INSERT_BATCH_SIZE = 1000
+
+# Event types the frontend may send to /api/events/ (views come from the middleware)
+CLIENT_EVENT_TYPES = {'similar_click', 'recommendation_click', 'graph_focus'}
+MAX_EVENTS_PER_BATCH = 100
+# Client timestamps older than this (queued offline) are clamped
+MAX_CLIENT_EVENT_AGE = timedelta(hours=24)
+
+
+class EventBuffer:
+    """Thread-safe ring buffer of pending events with a background flusher"""
+
+    def __init__(self, capacity=BUFFER_CAPACITY, flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL):
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._events = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def append(self, event):
+        """Queue one event dict (InteractionEvent field values)"""
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self.recorded += 1
+            pending = len(self._events)
+            if self._thread is None or not self._thread.is_alive():
+                self._start_flusher()
+        if pending >= self.flush_every:
+            self._wake.set()
+
+    def _start_flusher(self):
+        self._thread = threading.Thread(target=self._run, name='interaction-event-flusher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing interaction events failed")
+            finally:
+                # The thread got its own DB connection - do not leak it
+                close_old_connections()
+
+    def _drain(self):
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def flush(self):
+        """
+        Write all buffered events with bulk_create
+
+        Returns:
+            Number of events written
+        """
+        from ai_models.models import InteractionEvent
+
+        with self._flush_lock:
+            events = self._drain()
+            if not events:
+                return 0
+            try:
+                with transaction.atomic():
+                    InteractionEvent.objects.bulk_create(
+                        [InteractionEvent(**event) for event in events],
+                        batch_size=INSERT_BATCH_SIZE
+                    )
+            except Exception:
+                self.dropped += len(events)
+                raise
+            self.written += len(events)
+            logger.debug(f"Flushed {len(events)} interaction events")
+            return len(events)
+
+    def stats(self):
+        return {
+            'pending': len(self),
+            'recorded': self.recorded,
+            'written': self.written,
+            'dropped': self.dropped,
+        }
+
+
+event_buffer = EventBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    if len(event_buffer):
+        try:
+            event_buffer.flush()
+        except Exception:
+            logger.exception("Could not flush interaction events on exit")
+
+
+def record_event(event_type, post_id, user_id=None, session_key='', context_post_id=None, source='',
+                 created_at=None):
+    """
+    Queue an interaction event (no database access)
+
+    Args:
+        event_type: One of InteractionEvent.EVENT_TYPE_CHOICES
+        post_id: Post interacted with
+        user_id: Signed-in user (None for anonymous visitors)
+        session_key: Session of an anonymous visitor
+        context_post_id: Post the interaction started from
+        source: UI element or endpoint that produced the event
+        created_at: Event time (default: now)
+    """
+    event_buffer.append({
+        'event_type': event_type,
+        'post_id': post_id,
+        'user_id': user_id,
+        'session_key': session_key or '',
+        'context_post_id': context_post_id,
+        'source': source[:30],
+        'created_at': created_at or timezone.now(),
+    })
+
+
+def get_buffer_stats():
+    """Counters of this process's event buffer"""
+    return event_buffer.stats()
+
+
+def request_identity(request):
+    """(user_id, session_key) of a request - the session is never created for this"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.id, ''
+    session = getattr(request, 'session', None)
+    return None, (session.session_key or '') if session is not None else ''
+
+
+def parse_client_events(raw_events, now=None):
+    """
+    Validate a batch posted to /api/events/
+
+    Each event: {"type": "...", "post_id": 1, "context_post_id": 2 (optional),
+    "source": "..." (optional), "ts": epoch milliseconds (optional)}
+
+    Returns:
+        (valid event kwargs for record_event, number rejected)
+    """
+    now = now or timezone.now()
+    valid = []
+    rejected = 0
+    for raw in raw_events[:MAX_EVENTS_PER_BATCH]:
+        try:
+            event_type = raw['type']
+            post_id = int(raw['post_id'])
+            context_post_id = raw.get('context_post_id')
+            context_post_id = int(context_post_id) if context_post_id is not None else None
+            created_at = now
+            if raw.get('ts') is not None:
+                created_at = datetime.fromtimestamp(float(raw['ts']) / 1000, tz=dt_timezone.utc)
+                created_at = min(max(created_at, now - MAX_CLIENT_EVENT_AGE), now)
+        except (KeyError, TypeError, ValueError, OverflowError, OSError):
+            rejected += 1
+            continue
+        if event_type not in CLIENT_EVENT_TYPES or post_id <= 0:
+            rejected += 1
+            continue
+        valid.append({
+            'event_type': event_type,
+            'post_id': post_id,
+            'context_post_id': context_post_id,
+            'source': str(raw.get('source', '')),
+            'created_at': created_at,
+        })
+    rejected += max(0, len(raw_events) - MAX_EVENTS_PER_BATCH)
+    return valid, rejected
+
+
+def recently_seen_post_ids(user_id, days=30, limit=500):
+    """Posts the user viewed or opened recently, newest first (one indexed query)"""
+    from ai_models.models import InteractionEvent
+
+    since = timezone.now() - timedelta(days=days)
+    post_ids = InteractionEvent.objects.filter(
+        user_id=user_id,
+        created_at__gte=since
+    ).order_by('-created_at').values_list('post_id', flat=True)[:limit]
+    return set(post_ids)
+
+
+def rollup_interactions(day):
+    """
+    Recompute the InteractionDailyRollup rows of one (UTC) day
+
+    Idempotent - rerunning a day replaces its totals, so the current day can
+    be rolled up repeatedly as events arrive.
+
+    Args:
+        day: datetime.date
+
+    Returns:
+        Number of rollup rows written
+    """
+    from ai_models.models import InteractionEvent, InteractionDailyRollup
+
+    start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    totals = InteractionEvent.objects.filter(
+        created_at__gte=start,
+        created_at__lt=start + timedelta(days=1)
+    ).values('post_id', 'event_type').annotate(
+        event_count=Count('id'),
+        user_count=Count('user_id', distinct=True)
+    ).order_by()
+
+    rows = [
+        InteractionDailyRollup(
+            date=day,
+            post_id=total['post_id'],
+            event_type=total['event_type'],
+            event_count=total['event_count'],
+            user_count=total['user_count'],
+        )
+        for total in totals.iterator(chunk_size=5000)
+    ]
+    with transaction.atomic():
+        InteractionDailyRollup.objects.bulk_create(
+            rows,
+            batch_size=INSERT_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['date', 'post', 'event_type'],
+            update_fields=['event_count', 'user_count'],
+        )
+    logger.info(f"Rolled up {len(rows)} post/event totals for {day}")
+    return len(rows)
@@ -0,0 +1,112 @@
+"""
+Facet counts for the post list endpoint
+
+Computes, for the current filtered result set, how many posts fall under
+each root category, each level-1 category and each tag. Everything comes
+from one SQL statement: a recursive CTE maps every category to its root and
+level-1 ancestor, a GROUPING SETS aggregate counts distinct posts per
+ancestor, and tag counts are appended with UNION ALL. A window function
+caps each facet to the top `limit` values.
+"""
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from blog.models import Post, Category, Tag
+
+DEFAULT_FACET_LIMIT = 20
+MAX_FACET_LIMIT = 100
+
+FACET_NAMES = {
+    'root': 'root_categories',
+    'level1': 'level1_categories',
+    'tag': 'tags',
+}
+
+
+def _facet_sql(filtered_sql):
+    post_table = Post._meta.db_table
+    additional_table = Post.additional_categories.through._meta.db_table
+    tags_table = Post.tags.through._meta.db_table
+    category_table = Category._meta.db_table
+    tag_table = Tag._meta.db_table
+
+    return f"""
+        WITH RECURSIVE category_tree AS (
+            SELECT id, id AS root_id, NULL::bigint AS level1_id
+            FROM {category_table}
+            WHERE parent_id IS NULL
+            UNION
+            SELECT c.id, t.root_id, COALESCE(t.level1_id, c.id)
+            FROM {category_table} c
+            JOIN category_tree t ON c.parent_id = t.id
+        ),
+        filtered AS ({filtered_sql}),
+        post_categories AS (
+            SELECT p.id AS post_id, p.primary_category_id AS category_id
+            FROM {post_table} p
+            WHERE p.primary_category_id IS NOT NULL AND p.id IN (SELECT id FROM filtered)
+            UNION
+            SELECT pc.post_id, pc.category_id
+            FROM {additional_table} pc
+            WHERE pc.post_id IN (SELECT id FROM filtered)
+        ),
+        facet_counts AS (
+            SELECT CASE WHEN GROUPING(t.root_id) = 0 THEN 'root' ELSE 'level1' END AS facet,
+                   COALESCE(t.root_id, t.level1_id) AS value_id,
+                   COUNT(DISTINCT pc.post_id) AS post_count
+            FROM post_categories pc
+            JOIN category_tree t ON t.id = pc.category_id
+            GROUP BY GROUPING SETS ((t.root_id), (t.level1_id))
+            UNION ALL
+            SELECT 'tag', pt.tag_id, COUNT(*)
+            FROM {tags_table} pt
+            WHERE pt.post_id IN (SELECT id FROM filtered)
+            GROUP BY pt.tag_id
+        ),
+        ranked AS (
+            SELECT facet, value_id, post_count,
+                   ROW_NUMBER() OVER (PARTITION BY facet ORDER BY post_count DESC, value_id) AS position
+            FROM facet_counts
+            WHERE value_id IS NOT NULL
+        )
+        SELECT r.facet, r.value_id, r.post_count, COALESCE(c.name, tg.name)
+        FROM ranked r
+        LEFT JOIN {category_table} c ON r.facet <> 'tag' AND c.id = r.value_id
+        LEFT JOIN {tag_table} tg ON r.facet = 'tag' AND tg.id = r.value_id
+        WHERE r.position <= %s
+        ORDER BY r.facet, r.position
+    """
+
+
+def compute_post_facets(posts, limit=DEFAULT_FACET_LIMIT):
+    """
+    Count posts per root category, level-1 category and tag
+
+    Args:
+        posts: Filtered Post queryset (ordering/pagination are ignored)
+        limit: Maximum number of values returned per facet
+
+    Returns:
+        Dict with 'root_categories', 'level1_categories' and 'tags' lists of
+        {'id', 'name', 'count'}, largest first
+    """
+    facets = {name: [] for name in FACET_NAMES.values()}
+
+    try:
+        filtered_sql, filtered_params = posts.order_by().values('id').query.sql_with_params()
+    except EmptyResultSet:
+        # posts.none() - nothing to count
+        return facets
+
+    with connection.cursor() as cursor:
+        cursor.execute(_facet_sql(filtered_sql), [*filtered_params, limit])
+        rows = cursor.fetchall()
+
+    for facet, value_id, post_count, name in rows:
+        facets[FACET_NAMES[facet]].append({
+            'id': value_id,
+            'name': name,
+            'count': post_count
+        })
+
+    return facets
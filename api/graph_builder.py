@@ -0,0 +1,171 @@
+"""
+Incremental graph construction for the network endpoints
+
+Network views used to keep nodes and edges in plain lists and check
+membership with `any(n['id'] == ... for n in nodes)` inside edge loops,
+which is O(nodes x edges). GraphBuilder keeps both indexed by id/key:
+
+- add_node() / has_node() are O(1) and nodes are counted per type
+- add_edge() deduplicates by key (undirected pairs by default) and can
+  require both endpoints to exist
+- capped edges (e.g. similarity links) respect a per-node degree limit
+  (`max_connections`): each node keeps a min-heap of its capped edges, so
+  a stronger edge evicts the weakest one in O(log degree)
+- to_vis() returns the {'nodes': [...], 'edges': [...]} shape vis.js expects
+"""
+
+import heapq
+import itertools
+from collections import Counter, defaultdict
+
+
+class GraphBuilder:
+    """Id-indexed nodes/edges with dedup, type counters and degree caps"""
+
+    def __init__(self, max_connections=None):
+        """
+        Args:
+            max_connections: Max capped edges per node (None = unlimited)
+        """
+        self.max_connections = max_connections
+        self._nodes = {}
+        self._node_kinds = Counter()
+        self._edges = {}
+        self._edge_entries = {}
+        self._degree = Counter()
+        self._weakest = defaultdict(list)
+        self._sequence = itertools.count()
+
+    # === Nodes ===
+
+    def add_node(self, node_id, kind=None, **attrs):
+        """
+        Add a node unless one with this id exists
+
+        Args:
+            node_id: Unique node id
+            kind: Node type for the per-type counters (not added to the node itself)
+            **attrs: vis.js node fields
+
+        Returns:
+            True if the node was added
+        """
+        if node_id in self._nodes:
+            return False
+        self._nodes[node_id] = {'id': node_id, **attrs}
+        self._node_kinds[kind] += 1
+        return True
+
+    def has_node(self, node_id):
+        return node_id in self._nodes
+
+    def get_node(self, node_id):
+        return self._nodes.get(node_id)
+
+    def node_count(self, kind=None):
+        """Number of nodes, optionally of one kind"""
+        if kind is None:
+            return len(self._nodes)
+        return self._node_kinds[kind]
+
+    # === Edges ===
+
+    @staticmethod
+    def edge_key(source, target, directed=False):
+        if directed:
+            return (source, target)
+        return tuple(sorted((source, target), key=str))
+
+    def has_edge(self, source, target, directed=False):
+        return self.edge_key(source, target, directed) in self._edges
+
+    def edge_count(self):
+        return len(self._edges)
+
+    def add_edge(self, source, target, key=None, weight=0.0, capped=False,
+                 require_nodes=True, directed=False, **attrs):
+        """
+        Add an edge unless one with the same key exists
+
+        Args:
+            source, target: Node ids
+            key: Dedup key (default: the unordered/ordered endpoint pair)
+            weight: Strength used to rank capped edges
+            capped: Count towards max_connections of both endpoints
+            require_nodes: Skip the edge if an endpoint is not a node
+            directed: Treat (source, target) and (target, source) as different
+            **attrs: Extra vis.js edge fields
+
+        Returns:
+            True if the edge was added
+        """
+        if source == target:
+            return False
+        if require_nodes and (source not in self._nodes or target not in self._nodes):
+            return False
+        if key is None:
+            key = self.edge_key(source, target, directed)
+        if key in self._edges:
+            return False
+
+        if capped and self.max_connections is not None:
+            evict = set()
+            for endpoint in (source, target):
+                if self._degree[endpoint] >= self.max_connections:
+                    weakest = self._peek_weakest(endpoint)
+                    if weakest is None or weight <= weakest[0]:
+                        return False
+                    evict.add(weakest[2])
+            for evicted_key in evict:
+                self.remove_edge(evicted_key)
+
+        self._edges[key] = {'from': source, 'to': target, **attrs}
+
+        if capped:
+            entry = (weight, next(self._sequence), key)
+            self._edge_entries[key] = (entry, source, target)
+            for endpoint in (source, target):
+                self._degree[endpoint] += 1
+                heapq.heappush(self._weakest[endpoint], entry)
+        return True
+
+    def remove_edge(self, key):
+        self._edges.pop(key, None)
+        stored = self._edge_entries.pop(key, None)
+        if stored is not None:
+            # Heap entries are removed lazily in _peek_weakest
+            _, source, target = stored
+            self._degree[source] -= 1
+            self._degree[target] -= 1
+
+    def _peek_weakest(self, node_id):
+        """Weakest live capped edge entry of a node"""
+        heap = self._weakest[node_id]
+        while heap:
+            entry = heap[0]
+            stored = self._edge_entries.get(entry[2])
+            if stored is not None and stored[0] is entry:
+                return entry
+            heapq.heappop(heap)
+        return None
+
+    def sort_edges(self, key, reverse=False):
+        """Reorder edges (e.g. strongest first) - affects serialization order only"""
+        self._edges = dict(sorted(self._edges.items(), key=lambda item: key(item[1]), reverse=reverse))
+
+    # === Output ===
+
+    @property
+    def nodes(self):
+        return list(self._nodes.values())
+
+    @property
+    def edges(self):
+        return list(self._edges.values())
+
+    def node_kind_counts(self):
+        return {kind: count for kind, count in self._node_kinds.items() if kind is not None}
+
+    def to_vis(self):
+        """Nodes and edges in the vis.js DataSet shape"""
+        return {'nodes': self.nodes, 'edges': self.edges}
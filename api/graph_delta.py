@@ -0,0 +1,109 @@
+"""
+Graph version tokens and deltas for interactive refetches
+
+Refocusing, toggling personalization or moving a threshold slider used to
+download the whole network again although most nodes stay. Every network
+response now carries a `version` token: a hash of its nodes and edges under
+which the graph is kept in the cache for GRAPH_VERSION_TIMEOUT seconds.
+A client that sends `since=<token>` with its next request gets only what
+changed against that graph:
+
+    {'version': new_token, 'base_version': since,
+     'delta': {'added_nodes', 'updated_nodes', 'removed_nodes',
+               'added_edges', 'removed_edges'},
+     'stats': {...}}
+
+Removed nodes/edges are given by id; edges without an id get one
+("<from>-><to>") so they can be removed on the client. If the base graph
+has expired the full response is returned as usual (with its version).
+"""
+
+import hashlib
+import json
+from django.core.cache import cache
+
+GRAPH_VERSION_TIMEOUT = 600
+GRAPH_VERSION_KEY_PREFIX = 'graph_version'
+
+
+def _edge_id(edge):
+    return edge.get('id') or f"{edge['from']}->{edge['to']}"
+
+
+def _snapshot(response_data):
+    nodes = {node['id']: node for node in response_data.get('nodes', [])}
+    edges = {}
+    for edge in response_data.get('edges', []):
+        edge_id = _edge_id(edge)
+        edges[edge_id] = {**edge, 'id': edge_id}
+    return {'nodes': nodes, 'edges': edges}
+
+
+def remember_graph(snapshot):
+    """Store a graph snapshot and return its version token"""
+    content = json.dumps([list(snapshot['nodes'].values()), list(snapshot['edges'].values())],
+                         sort_keys=True, default=str)
+    token = hashlib.md5(content.encode()).hexdigest()[:16]
+    # Same content -> same token; an existing copy only needs its timeout renewed
+    key = f'{GRAPH_VERSION_KEY_PREFIX}:{token}'
+    if not cache.touch(key, GRAPH_VERSION_TIMEOUT):
+        cache.set(key, snapshot, GRAPH_VERSION_TIMEOUT)
+    return token
+
+
+def graph_delta(previous, current):
+    """Added/updated/removed nodes and added/removed edges between two snapshots"""
+    return {
+        'added_nodes': [node for node_id, node in current['nodes'].items() if node_id not in previous['nodes']],
+        'updated_nodes': [
+            node for node_id, node in current['nodes'].items()
+            if node_id in previous['nodes'] and previous['nodes'][node_id] != node
+        ],
+        'removed_nodes': [node_id for node_id in previous['nodes'] if node_id not in current['nodes']],
+        # Changed edges are replaced: removed by id and added again
+        'added_edges': [
+            edge for edge_id, edge in current['edges'].items()
+            if previous['edges'].get(edge_id) != edge
+        ],
+        'removed_edges': [
+            edge_id for edge_id, edge in previous['edges'].items()
+            if current['edges'].get(edge_id) != edge
+        ],
+    }
+
+
+def versioned_graph_response(response_data, since=None):
+    """
+    Attach a version token to a network response, or reduce it to a delta
+
+    Args:
+        response_data: Full {'nodes', 'edges', 'stats', ...} response
+        since: Version token the client already has (optional)
+
+    Returns:
+        Delta response if `since` is still cached, otherwise the full
+        response with edge ids filled in and a 'version' key
+    """
+    snapshot = _snapshot(response_data)
+    version = remember_graph(snapshot)
+
+    previous = cache.get(f'{GRAPH_VERSION_KEY_PREFIX}:{since}') if since else None
+    if previous is None:
+        return {
+            **response_data,
+            'edges': list(snapshot['edges'].values()),
+            'version': version,
+        }
+
+    delta = graph_delta(previous, snapshot)
+    extra = {key: value for key, value in response_data.items() if key not in ('nodes', 'edges')}
+    return {
+        **extra,
+        'version': version,
+        'base_version': since,
+        'delta': delta,
+        'stats': {
+            **response_data.get('stats', {}),
+            'delta_changes': sum(len(changes) for changes in delta.values()),
+        },
+    }
@@ -0,0 +1,343 @@
+"""
+Server-side force-directed layouts for the network views
+
+The browser used to lay out every graph with vis.js physics, which stalls
+once a few thousand nodes are on screen. Layouts are now computed offline
+(`python manage.py compute_graph_layouts`, meant to run from cron) with a
+vectorized ForceAtlas2-style simulation and stored in GraphLayout per graph
+key. Viz responses copy the stored x/y into the nodes and switch physics
+off for them.
+
+Forces (ForceAtlas2, linear attraction):
+- repulsion  k_r * (deg_i + 1) * (deg_j + 1) / distance between all pairs;
+  exact in row blocks for small graphs, and for large graphs approximated on
+  a grid (one-level Barnes-Hut): far cells act through their centre of mass,
+  nodes in the same cell repel exactly
+- attraction weight * distance along edges
+- gravity    k_g * (deg + 1) towards the origin
+
+Each run is seeded from the stored positions; new nodes start next to their
+already placed neighbours (a post next to its category), so after small
+changes a short warm run is enough.
+"""
+
+import logging
+import time
+import numpy as np
+from topicsloop.cache import StampedMemo, bump_generation
+
+logger = logging.getLogger(__name__)
+
+# Graph key -> include post nodes
+LAYOUT_GRAPHS = {
+    'categories': False,
+    'posts': True,
+}
+DEFAULT_GRAPH_KEY = 'posts'
+
+# Edge weights (attraction strength)
+HIERARCHY_WEIGHT = 2.0
+PRIMARY_CATEGORY_WEIGHT = 1.0
+ADDITIONAL_CATEGORY_WEIGHT = 0.3
+
+REPULSION = 80.0
+GRAVITY = 1.0
+MAX_DISPLACEMENT = 40.0
+COOLING = 0.99
+
+FULL_ITERATIONS = 300
+# Used when at least WARM_START_RATIO of the nodes have stored positions
+WARM_ITERATIONS = 60
+WARM_START_RATIO = 0.9
+WARM_START_SPEED = 0.3
+# Stop early once the mean step (in layout units) falls below this
+CONVERGENCE_TOLERANCE = 0.05
+
+# Above this many nodes repulsion uses the grid approximation
+EXACT_REPULSION_MAX_NODES = 4000
+GRID_NODES_PER_CELL = 64
+MAX_GRID_SIZE = 64
+BLOCK_SIZE = 256
+
+_layouts = StampedMemo()
+
+
+# === Graph ===
+
+def build_layout_graph(include_posts=True):
+    """
+    Load the category (and post) graph in the node id scheme of the viz views
+
+    Returns:
+        (node_ids, sources, targets, weights) - edges as index arrays
+    """
+    from blog.models import Post
+    from blog.category_tree import get_category_tree
+
+    tree = get_category_tree()
+    node_ids = [f'category_{category_id}' for category_id in tree.parent]
+    index = {node_id: position for position, node_id in enumerate(node_ids)}
+    edges = []
+
+    for category_id, parent_id in tree.parent.items():
+        if parent_id is not None:
+            edges.append((index[f'category_{category_id}'], index[f'category_{parent_id}'], HIERARCHY_WEIGHT))
+
+    if include_posts:
+        for post_id, category_id in Post.objects.values_list('id', 'primary_category_id').iterator(chunk_size=10000):
+            node_id = f'post_{post_id}'
+            index[node_id] = len(node_ids)
+            node_ids.append(node_id)
+            if category_id is not None:
+                edges.append((index[node_id], index[f'category_{category_id}'], PRIMARY_CATEGORY_WEIGHT))
+
+        additional = Post.additional_categories.through.objects.values_list('post_id', 'category_id')
+        for post_id, category_id in additional.iterator(chunk_size=10000):
+            edges.append((index[f'post_{post_id}'], index[f'category_{category_id}'], ADDITIONAL_CATEGORY_WEIGHT))
+
+    if edges:
+        sources, targets, weights = (np.asarray(column) for column in zip(*edges))
+    else:
+        sources = targets = np.zeros(0, dtype=np.int64)
+        weights = np.zeros(0)
+    return node_ids, sources.astype(np.int64), targets.astype(np.int64), weights.astype(np.float64)
+
+
+# === Forces ===
+
+def _pairwise_repulsion(positions, mass, other_positions, other_mass):
+    """Exact repulsion on `positions` from all `other_positions`, in row blocks"""
+    force = np.zeros_like(positions)
+    for start in range(0, len(positions), BLOCK_SIZE):
+        block = slice(start, start + BLOCK_SIZE)
+        delta = positions[block, None, :] - other_positions[None, :, :]
+        distance_sq = np.einsum('ijk,ijk->ij', delta, delta)
+        # Coincident points (including a node and itself) have delta 0 - no force
+        np.maximum(distance_sq, 1e-9, out=distance_sq)
+        strength = mass[block, None] * other_mass[None, :] / distance_sq
+        force[block] = np.einsum('ij,ijk->ik', strength, delta)
+    return force
+
+
+def _grid_repulsion(positions, mass):
+    """Repulsion approximated with a uniform grid of centres of mass"""
+    n = len(positions)
+    grid_size = int(min(MAX_GRID_SIZE, max(2, np.ceil(np.sqrt(n / GRID_NODES_PER_CELL)))))
+    low = positions.min(axis=0)
+    span = np.maximum(positions.max(axis=0) - low, 1e-9)
+    cell_xy = np.minimum((positions - low) / span * grid_size, grid_size - 1).astype(np.int64)
+    cells = cell_xy[:, 0] * grid_size + cell_xy[:, 1]
+
+    cell_count = grid_size * grid_size
+    cell_mass = np.bincount(cells, weights=mass, minlength=cell_count)
+    occupied = np.flatnonzero(cell_mass)
+    centers = np.stack([
+        np.bincount(cells, weights=mass * positions[:, axis], minlength=cell_count)[occupied]
+        for axis in range(2)
+    ], axis=1) / cell_mass[occupied, None]
+
+    # Far field: every occupied cell except the node's own
+    force = _pairwise_repulsion(positions, mass, centers, cell_mass[occupied])
+    own = np.searchsorted(occupied, cells)
+    delta = positions - centers[own]
+    distance_sq = np.maximum(np.einsum('ij,ij->i', delta, delta), 1e-9)
+    force -= (mass * cell_mass[cells] / distance_sq)[:, None] * delta
+
+    # Near field: exact within each cell
+    order = np.argsort(cells, kind='stable')
+    boundaries = np.flatnonzero(np.diff(cells[order])) + 1
+    for members in np.split(order, boundaries):
+        if len(members) > 1:
+            force[members] += _pairwise_repulsion(
+                positions[members], mass[members], positions[members], mass[members]
+            )
+    return force
+
+
+def _repulsion(positions, mass):
+    if len(positions) <= EXACT_REPULSION_MAX_NODES:
+        return _pairwise_repulsion(positions, mass, positions, mass)
+    return _grid_repulsion(positions, mass)
+
+
+def force_layout(positions, sources, targets, weights, iterations=FULL_ITERATIONS, speed=1.0):
+    """
+    Run the force simulation
+
+    Args:
+        positions: (n, 2) start coordinates
+        sources, targets, weights: Edge index arrays
+        iterations: Maximum number of steps
+        speed: Initial step multiplier (lower for warm starts)
+
+    Returns:
+        (positions, iterations_run)
+    """
+    positions = np.array(positions, dtype=np.float64)
+    n = len(positions)
+    if n < 2:
+        return positions, 0
+
+    degree = np.bincount(sources, minlength=n) + np.bincount(targets, minlength=n)
+    mass = degree + 1.0
+
+    iterations_run = 0
+    for _ in range(iterations):
+        iterations_run += 1
+        force = REPULSION * _repulsion(positions, mass)
+
+        pull = (positions[sources] - positions[targets]) * weights[:, None]
+        np.add.at(force, sources, -pull)
+        np.add.at(force, targets, pull)
+
+        radius = np.maximum(np.linalg.norm(positions, axis=1, keepdims=True), 1e-9)
+        force -= GRAVITY * mass[:, None] * positions / radius
+
+        step = force / mass[:, None] * speed
+        length = np.linalg.norm(step, axis=1, keepdims=True)
+        step *= np.minimum(1.0, MAX_DISPLACEMENT / np.maximum(length, 1e-9))
+        positions += step
+        speed *= COOLING
+
+        if float(np.mean(np.minimum(length, MAX_DISPLACEMENT))) < CONVERGENCE_TOLERANCE:
+            break
+
+    return positions, iterations_run
+
+
+def _seed_positions(node_ids, sources, targets, previous, rng):
+    """Stored coordinates where available, otherwise next to placed neighbours"""
+    n = len(node_ids)
+    positions = np.zeros((n, 2))
+    placed = np.zeros(n, dtype=bool)
+    for position, node_id in enumerate(node_ids):
+        stored = previous.get(node_id)
+        if stored is not None:
+            positions[position] = stored
+            placed[position] = True
+    seeded = int(placed.sum())
+
+    spread = float(np.abs(positions[placed]).max()) if seeded else 100.0 * np.sqrt(n)
+    # Edges in both directions so each unplaced node can find a placed neighbour
+    both_sources = np.concatenate([sources, targets])
+    both_targets = np.concatenate([targets, sources])
+    while not placed.all():
+        usable = ~placed[both_sources] & placed[both_targets]
+        if not usable.any():
+            remaining = np.flatnonzero(~placed)
+            positions[remaining] = rng.uniform(-spread, spread, size=(len(remaining), 2))
+            placed[remaining] = True
+            break
+        totals = np.zeros((n, 2))
+        counts = np.zeros(n)
+        np.add.at(totals, both_sources[usable], positions[both_targets[usable]])
+        np.add.at(counts, both_sources[usable], 1)
+        newly = np.flatnonzero(counts)
+        positions[newly] = totals[newly] / counts[newly, None] + rng.normal(scale=10.0, size=(len(newly), 2))
+        placed[newly] = True
+
+    return positions, seeded
+
+
+# === Stored layouts ===
+
+def compute_layout(graph_key=DEFAULT_GRAPH_KEY, iterations=None, restart=False):
+    """
+    Recompute and store the layout of one graph
+
+    Args:
+        graph_key: Key from LAYOUT_GRAPHS
+        iterations: Override the step count (default: warm or full run)
+        restart: Ignore stored positions and start from scratch
+
+    Returns:
+        The saved GraphLayout
+    """
+    from .models import GraphLayout
+
+    started = time.time()
+    node_ids, sources, targets, weights = build_layout_graph(include_posts=LAYOUT_GRAPHS[graph_key])
+
+    layout = GraphLayout.objects.filter(graph_key=graph_key).first()
+    previous = {} if restart or layout is None else layout.positions
+    rng = np.random.default_rng(0)
+    positions, seeded = _seed_positions(node_ids, sources, targets, previous, rng)
+
+    warm = len(node_ids) > 0 and seeded >= WARM_START_RATIO * len(node_ids)
+    if iterations is None:
+        iterations = WARM_ITERATIONS if warm else FULL_ITERATIONS
+    positions, iterations_run = force_layout(
+        positions, sources, targets, weights,
+        iterations=iterations,
+        speed=WARM_START_SPEED if warm else 1.0,
+    )
+
+    layout, _ = GraphLayout.objects.update_or_create(
+        graph_key=graph_key,
+        defaults={
+            'positions': {
+                node_id: [round(float(x), 1), round(float(y), 1)]
+                for node_id, (x, y) in zip(node_ids, positions)
+            },
+            'node_count': len(node_ids),
+            'edge_count': len(sources),
+            'iterations': iterations_run,
+            'seeded_nodes': seeded,
+            'computation_time': time.time() - started,
+        }
+    )
+    bump_generation('layout')
+    logger.info(f"Layout '{graph_key}': {len(node_ids)} nodes, {len(sources)} edges, "
+                f"{iterations_run} iterations ({seeded} seeded) in {layout.computation_time:.1f}s")
+    return layout
+
+
+def _stored_layout(graph_key):
+    """(id, updated_at, positions) of the stored layout or None, memoized per row version"""
+    from .models import GraphLayout
+
+    rows = GraphLayout.objects.filter(graph_key=graph_key)
+    return _layouts.get(
+        graph_key,
+        stamp=lambda: rows.values_list('id', 'updated_at').first(),
+        load=lambda: rows.values_list('id', 'updated_at', 'positions').first(),
+        generations=('layout',),
+    )
+
+
+def get_layout_positions(graph_key=DEFAULT_GRAPH_KEY):
+    """Stored node id -> (x, y) of a graph ({} if never computed)"""
+    layout = _stored_layout(graph_key)
+    return layout[2] if layout else {}
+
+
+def get_layout_version(graph_key=DEFAULT_GRAPH_KEY):
+    """
+    Version of the stored layout for cache keys and ETags
+
+    Derived from the GraphLayout row, so it changes in every process when
+    compute_graph_layouts rewrites the layout.
+    """
+    layout = _stored_layout(graph_key)
+    return f'{layout[0]}.{layout[1].timestamp():.6f}' if layout else 'none'
+
+
+def apply_layout(nodes, positions):
+    """
+    Pin nodes to stored coordinates
+
+    Args:
+        nodes: vis.js node dicts (modified in place)
+        positions: Node id -> (x, y)
+
+    Returns:
+        Number of nodes that received a position
+    """
+    placed = 0
+    for node in nodes:
+        position = positions.get(node['id'])
+        if position is not None:
+            node['x'], node['y'] = position
+            node['physics'] = False
+            placed += 1
+    return placed
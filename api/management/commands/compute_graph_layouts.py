@@ -0,0 +1,42 @@
+"""
+Django management command to precompute network layouts (run from cron)
+
+Usage:
+    python manage.py compute_graph_layouts                    # All graphs, warm start
+    python manage.py compute_graph_layouts --graph-key posts  # One graph
+    python manage.py compute_graph_layouts --restart          # Ignore stored positions
+"""
+
+from django.core.management.base import BaseCommand
+from api.layout import compute_layout, LAYOUT_GRAPHS
+
+
+class Command(BaseCommand):
+    help = 'Compute force-directed layouts for the network views and store node coordinates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--graph-key',
+            choices=sorted(LAYOUT_GRAPHS),
+            help='Only compute this graph (default: all)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            help='Number of force iterations (default: short run when seeded, full run otherwise)'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Start from scratch instead of the stored positions'
+        )
+
+    def handle(self, *args, **options):
+        graph_keys = [options['graph_key']] if options['graph_key'] else list(LAYOUT_GRAPHS)
+
+        for graph_key in graph_keys:
+            layout = compute_layout(graph_key, iterations=options['iterations'], restart=options['restart'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{graph_key}: {layout.node_count} nodes, {layout.iterations} iterations "
+                f"({layout.seeded_nodes} seeded) in {layout.computation_time:.1f}s"
+            ))
@@ -0,0 +1,58 @@
+"""
+Django management command to roll up interaction events into daily totals (run from cron)
+
+Usage:
+    python manage.py rollup_interactions                      # Yesterday and today
+    python manage.py rollup_interactions --days 7             # The last 7 days
+    python manage.py rollup_interactions --date 2024-05-01    # One day
+    python manage.py rollup_interactions --prune-after 90     # Also delete raw events older than 90 days
+"""
+
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from ai_models.models import InteractionEvent
+from api.events import rollup_interactions
+
+
+class Command(BaseCommand):
+    help = 'Recompute InteractionDailyRollup totals from the interaction event log'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Roll up a single day (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Number of days up to today to roll up (default: 2)'
+        )
+        parser.add_argument(
+            '--prune-after',
+            type=int,
+            help='Delete raw events older than this many days (their days must be rolled up already)'
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                days = [date.fromisoformat(options['date'])]
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+        else:
+            today = timezone.now().date()
+            days = [today - timedelta(days=offset) for offset in range(options['days'] - 1, -1, -1)]
+
+        for day in days:
+            rows = rollup_interactions(day)
+            self.stdout.write(f'{day}: {rows} post/event totals')
+
+        if options['prune_after']:
+            cutoff = timezone.now() - timedelta(days=options['prune_after'])
+            deleted, _ = InteractionEvent.objects.filter(created_at__lt=cutoff).delete()
+            self.stdout.write(f'Deleted {deleted} events older than {options["prune_after"]} days')
+
+        self.stdout.write(self.style.SUCCESS('Interaction rollup finished'))
@@ -0,0 +1,44 @@
+"""
+Django management command to prebuild visualization caches (after deploys and imports)
+
+Usage:
+    python manage.py warm_viz_caches
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from api.views import PostNetworkView
+from api.cooccurrence import category_cooccurrence
+from api.user_similarity import get_user_interest_graph
+from api.viz_cache import get_rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Prebuild cached network responses for the default parameter sets'
+
+    def handle(self, *args, **options):
+        view = PostNetworkView()
+        for params in PostNetworkView.WARM_PARAMETER_SETS:
+            started = time.time()
+            response_data, _ = view.get_cached_network(force=True, **params)
+            self.stdout.write(
+                f"post_network {params or 'defaults'}: {len(response_data['nodes'])} nodes "
+                f"in {time.time() - started:.1f}s"
+            )
+
+        # Shared inputs of the category and user network views
+        started = time.time()
+        pairs = category_cooccurrence()
+        self.stdout.write(f'category co-occurrence: {len(pairs)} pairs in {time.time() - started:.1f}s')
+
+        started = time.time()
+        get_user_interest_graph()
+        self.stdout.write(f'user interest graph in {time.time() - started:.1f}s')
+
+        stats = get_rebuild_stats('post_network')
+        if stats:
+            self.stdout.write(
+                f"post_network rebuilds so far: {stats['builds']}, "
+                f"avg {stats['avg_seconds']:.2f}s, max {stats['max_seconds']:.2f}s"
+            )
+        self.stdout.write(self.style.SUCCESS('Visualization caches warmed'))
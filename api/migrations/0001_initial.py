@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraphLayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('graph_key', models.CharField(help_text="Which graph the layout belongs to (e.g. 'posts', 'categories')", max_length=50, unique=True)),
+                ('positions', models.JSONField(default=dict, help_text='Node id -> [x, y]')),
+                ('node_count', models.PositiveIntegerField(default=0)),
+                ('edge_count', models.PositiveIntegerField(default=0)),
+                ('iterations', models.PositiveIntegerField(default=0, help_text='Force iterations run for the last computation')),
+                ('seeded_nodes', models.PositiveIntegerField(default=0, help_text='Nodes that started from their previously stored position')),
+                ('computation_time', models.FloatField(default=0.0, help_text='Seconds')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraphClustering',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('graph_key', models.CharField(help_text="Which graph was clustered (e.g. 'posts', 'categories')", max_length=50, unique=True)),
+                ('membership', models.JSONField(default=dict, help_text='Node id -> community number')),
+                ('communities', models.JSONField(default=list, help_text='Community summaries: id, label, size, top members')),
+                ('community_edges', models.JSONField(default=list, help_text='[community_a, community_b, weight] between communities')),
+                ('modularity', models.FloatField(default=0.0)),
+                ('node_count', models.PositiveIntegerField(default=0)),
+                ('edge_count', models.PositiveIntegerField(default=0)),
+                ('computation_time', models.FloatField(default=0.0, help_text='Seconds')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.db import models
+
+
+class GraphLayout(models.Model):
+    """
+    Precomputed node coordinates for a network visualization
+    One row per graph key; written by the `compute_graph_layouts` command
+    (see api.layout) and read by the viz endpoints to ship fixed x/y.
+    """
+    graph_key = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="Which graph the layout belongs to (e.g. 'posts', 'categories')"
+    )
+    positions = models.JSONField(
+        default=dict,
+        help_text="Node id -> [x, y]"
+    )
+    node_count = models.PositiveIntegerField(default=0)
+    edge_count = models.PositiveIntegerField(default=0)
+    iterations = models.PositiveIntegerField(
+        default=0,
+        help_text="Force iterations run for the last computation"
+    )
+    seeded_nodes = models.PositiveIntegerField(
+        default=0,
+        help_text="Nodes that started from their previously stored position"
+    )
+    computation_time = models.FloatField(default=0.0, help_text="Seconds")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Layout '{self.graph_key}' ({self.node_count} nodes)"
+
+
+class GraphClustering(models.Model):
+    """
+    Precomputed communities (Louvain) of a network
+    One row per graph key; written by the `detect_communities` command
+    (see api.communities) and read by the viz endpoints for collapse=clusters.
+    """
+    graph_key = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="Which graph was clustered (e.g. 'posts', 'categories')"
+    )
+    membership = models.JSONField(
+        default=dict,
+        help_text="Node id -> community number"
+    )
+    communities = models.JSONField(
+        default=list,
+        help_text="Community summaries: id, label, size, top members"
+    )
+    community_edges = models.JSONField(
+        default=list,
+        help_text="[community_a, community_b, weight] between communities"
+    )
+    modularity = models.FloatField(default=0.0)
+    node_count = models.PositiveIntegerField(default=0)
+    edge_count = models.PositiveIntegerField(default=0)
+    computation_time = models.FloatField(default=0.0, help_text="Seconds")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Clustering '{self.graph_key}' ({len(self.communities)} communities)"
@@ -0,0 +1,78 @@
+"""
+Normalized query cache for the post list endpoint
+
+Many requests to /api/posts/ differ only in irrelevant ways (whitespace or
+case in the search box, parameter order, ...). Normalizing the filters into
+one tuple lets facet counts and result pages be shared between them. Keys
+are bound to the posts/categories generations, so any post or category
+change invalidates them without explicit deletes.
+
+Result entries store only the ordered post ids and the total count; the
+requested page is hydrated with a single id__in query.
+"""
+
+import hashlib
+from topicsloop.cache import versioned_key
+
+# Cached listings/facets live at most this long even without data changes
+POST_QUERY_CACHE_TIMEOUT = 600
+
+
+def normalize_search(search_query):
+    """Collapse whitespace and case so equivalent searches share a key"""
+    if not search_query:
+        return ''
+    return ' '.join(search_query.split()).lower()
+
+
+def ids_fingerprint(ids):
+    """Short stable hash of a set of ids (e.g. a user's favorite categories)"""
+    joined = ','.join(str(i) for i in sorted(set(ids)))
+    return hashlib.md5(joined.encode()).hexdigest()[:16]
+
+
+def post_filter_parts(search_query, category_id, scope):
+    """
+    Describe a filtered post set independent of ordering and pagination
+
+    Args:
+        search_query: Raw search text (or None)
+        category_id: Parsed ?category= id (or None)
+        scope: 'all', 'none', 'favorites:<hash>' or 'selected:<hash>'
+    """
+    return (normalize_search(search_query), category_id, scope)
+
+
+def post_query_key(prefix, filter_parts):
+    """Cache key for data derived from a filtered post set"""
+    return versioned_key(prefix, filter_parts, generations=('posts', 'categories'))
+
+
+# Only the head of each ordered result list is cached; deeper pages fall
+# back to a direct (paginated) query
+POST_RESULTS_MAX_IDS = 1000
+
+
+def build_result_window(posts):
+    """
+    Materialize the cacheable part of an ordered post queryset
+
+    Returns:
+        {'ids': [first POST_RESULTS_MAX_IDS ids in order], 'total': full count}
+    """
+    ids = list(posts.values_list('id', flat=True)[:POST_RESULTS_MAX_IDS])
+    # A short list is the whole result - no need for a COUNT query
+    total = len(ids) if len(ids) < POST_RESULTS_MAX_IDS else posts.count()
+    return {'ids': ids, 'total': total}
+
+
+def hydrate_posts(post_ids):
+    """Load posts for a page of ids with one query (+ prefetches), keeping order"""
+    from blog.models import Post
+
+    posts_by_id = Post.objects.select_related(
+        'author', 'primary_category'
+    ).prefetch_related(
+        'additional_categories', 'tags'
+    ).in_bulk(post_ids)
+    return [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
@@ -1,3 +1,503 @@
-from django.test import TestCase
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from ai_models.models import InteractionDailyRollup, InteractionEvent, PostEmbedding
+from blog.feeds import FEED_MAX_LENGTH
+from blog.models import Category, FeedEntry, Post, Tag
+from scipy import sparse
+
+from api import events
+from api.communities import louvain, modularity
+from api.cooccurrence import category_cooccurrence
+from api.facets import compute_post_facets
+
+
+def _create_user(name):
+    return CustomUser.objects.create_user(username=name, email=f'{name}@example.com')
+
+
+class FacetCountTests(TestCase):
+    """The single facet statement agrees with per-category ORM counts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = _create_user('author')
+        science = Category.objects.create(name='Science')
+        physics = Category.objects.create(name='Physics', parent=science)
+        quantum = Category.objects.create(name='Quantum', parent=physics)
+        biology = Category.objects.create(name='Biology', parent=science)
+        art = Category.objects.create(name='Art')
+        painting = Category.objects.create(name='Painting', parent=art)
+        cls.categories = [science, physics, quantum, biology, art, painting]
+        cls.tags = [Tag.objects.create(name=name) for name in ('alpha', 'beta', 'gamma')]
+
+        layout = [
+            # (primary, additional, tags)
+            (quantum, [physics], [0, 1]),   # both categories in the Physics subtree - counted once
+            (physics, [], [0]),
+            (biology, [painting], [1]),     # counted under both roots
+            (painting, [], [0, 2]),
+            (science, [], []),
+            (None, [art], [2]),             # additional category only
+            (None, [], [0]),                # uncategorized
+        ]
+        for number, (primary, additional, tag_rows) in enumerate(layout):
+            post = Post.objects.create(
+                title=f'Post {number}', content='text', author=cls.author, primary_category=primary
+            )
+            post.additional_categories.set(additional)
+            post.tags.set([cls.tags[row] for row in tag_rows])
+
+    def _expected(self, posts, limit):
+        tree = {category.id: category for category in self.categories}
+
+        def subtree(category):
+            ids = {category.id}
+            for other in self.categories:
+                current = other
+                while current.parent_id is not None:
+                    current = tree[current.parent_id]
+                    if current.id == category.id:
+                        ids.add(other.id)
+            return ids
+
+        def category_counts(level):
+            counts = []
+            for category in self.categories:
+                if category.level != level:
+                    continue
+                ids = subtree(category)
+                count = posts.filter(
+                    Q(primary_category_id__in=ids) | Q(additional_categories__id__in=ids)
+                ).distinct().count()
+                if count:
+                    counts.append({'id': category.id, 'name': category.name, 'count': count})
+            return counts
+
+        tag_counts = []
+        for tag in self.tags:
+            count = posts.filter(tags=tag).count()
+            if count:
+                tag_counts.append({'id': tag.id, 'name': tag.name, 'count': count})
+
+        def top(counts):
+            return sorted(counts, key=lambda entry: (-entry['count'], entry['id']))[:limit]
+
+        return {
+            'root_categories': top(category_counts(0)),
+            'level1_categories': top(category_counts(1)),
+            'tags': top(tag_counts),
+        }
+
+    def test_all_posts(self):
+        posts = Post.objects.all()
+        self.assertEqual(compute_post_facets(posts, limit=20), self._expected(posts, 20))
+
+    def test_filtered_posts(self):
+        posts = Post.objects.filter(title__in=['Post 0', 'Post 2', 'Post 5'])
+        self.assertEqual(compute_post_facets(posts, limit=20), self._expected(posts, 20))
+
+    def test_per_facet_cap(self):
+        posts = Post.objects.all()
+        facets = compute_post_facets(posts, limit=1)
+        self.assertEqual(facets, self._expected(posts, 1))
+        self.assertTrue(all(len(values) == 1 for values in facets.values()))
+
+    def test_empty_queryset(self):
+        self.assertEqual(
+            compute_post_facets(Post.objects.none()),
+            {'root_categories': [], 'level1_categories': [], 'tags': []}
+        )
+
+
+class FeedPaginationTests(TestCase):
+    """The favorites listing pages past the materialized feed into a direct query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = _create_user('author')
+        cls.category = Category.objects.create(name='Science')
+        Post.objects.bulk_create(
+            Post(title=f'Post {number}', content='text', author=author, primary_category=cls.category)
+            for number in range(FEED_MAX_LENGTH + 5)
+        )
+        # Distinct timestamps, oldest first by id
+        now = timezone.now()
+        post_ids = list(Post.objects.order_by('id').values_list('id', flat=True))
+        for position, post_id in enumerate(post_ids):
+            Post.objects.filter(id=post_id).update(created_at=now - timedelta(minutes=len(post_ids) - position))
+        cls.newest_first = post_ids[::-1]
+
+    def setUp(self):
+        self.reader = _create_user('reader')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader.profile.favorite_categories.add(self.category)
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def _page(self, number, page_size=100):
+        response = self.client.get('/api/posts/', {'page': number, 'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_feed_is_capped(self):
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), FEED_MAX_LENGTH)
+
+    def test_pages_inside_and_past_the_feed(self):
+        last_feed_page = self._page(FEED_MAX_LENGTH // 100)
+        self.assertEqual(last_feed_page['pagination']['total_count'], FEED_MAX_LENGTH + 5)
+        self.assertEqual(
+            [post['id'] for post in last_feed_page['posts']],
+            self.newest_first[FEED_MAX_LENGTH - 100:FEED_MAX_LENGTH]
+        )
+
+        past_feed = self._page(FEED_MAX_LENGTH // 100 + 1)
+        self.assertFalse(past_feed['pagination']['has_next'])
+        self.assertEqual([post['id'] for post in past_feed['posts']], self.newest_first[FEED_MAX_LENGTH:])
+
+
+class CategoryCooccurrenceTests(TestCase):
+    """Co-occurrence edges agree with pairwise ORM counts, with and without rollup"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = _create_user('author')
+        science = Category.objects.create(name='Science')
+        physics = Category.objects.create(name='Physics', parent=science)
+        quantum = Category.objects.create(name='Quantum', parent=physics)
+        art = Category.objects.create(name='Art')
+        painting = Category.objects.create(name='Painting', parent=art)
+        music = Category.objects.create(name='Music')
+        cls.categories = [science, physics, quantum, art, painting, music]
+
+        layout = [
+            (quantum, [painting]),
+            (quantum, [physics, painting]),
+            (physics, [art]),
+            (painting, [music]),
+            (music, []),
+        ]
+        for number, (primary, additional) in enumerate(layout):
+            post = Post.objects.create(
+                title=f'Post {number}', content='text', author=author, primary_category=primary
+            )
+            post.additional_categories.set(additional)
+
+    def _mapped(self, category, rollup_level):
+        """The category's ancestor at rollup_level (itself when shallower)"""
+        while rollup_level is not None and category.level > rollup_level:
+            category = category.parent
+        return category.id
+
+    def _expected(self, rollup_level=None, category_ids=None):
+        post_categories = {}
+        for post in Post.objects.prefetch_related('additional_categories').select_related(
+            'primary_category__parent__parent'
+        ):
+            categories = list(post.additional_categories.select_related('parent__parent'))
+            if post.primary_category:
+                categories.append(post.primary_category)
+            mapped = {self._mapped(category, rollup_level) for category in categories}
+            if category_ids is not None:
+                mapped &= set(category_ids)
+            post_categories[post.id] = mapped
+
+        counts = {}
+        for mapped in post_categories.values():
+            for a in mapped:
+                for b in mapped:
+                    if a < b:
+                        counts[(a, b)] = counts.get((a, b), 0) + 1
+        return sorted(((a, b, count) for (a, b), count in counts.items()), key=lambda edge: (-edge[2], edge[0], edge[1]))
+
+    def test_without_rollup(self):
+        self.assertEqual(category_cooccurrence(), self._expected())
+
+    def test_rollup_to_roots(self):
+        edges = category_cooccurrence(rollup_level=0)
+        self.assertEqual(edges, self._expected(rollup_level=0))
+        # Quantum + Painting on two posts becomes Science + Art
+        science, art = self.categories[0].id, self.categories[3].id
+        self.assertIn((science, art, 3), edges)
+
+    def test_rollup_to_level1(self):
+        self.assertEqual(category_cooccurrence(rollup_level=1), self._expected(rollup_level=1))
+
+    def test_restricted_to_categories(self):
+        category_ids = [category.id for category in self.categories[:3]]
+        self.assertEqual(
+            category_cooccurrence(category_ids=category_ids), self._expected(category_ids=category_ids)
+        )
+        self.assertEqual(category_cooccurrence(category_ids=category_ids[:1]), [])
+
+
+class UnifiedNetworkPostSimilarityTests(TestCase):
+    """Post nodes of the unified network are linked from stored embeddings only"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from gnn_models.centroids import DEFAULT_MODEL_NAME
+
+        author = _create_user('author')
+        cls.category = Category.objects.create(name='Science')
+        # The view needs at least two categories
+        Category.objects.create(name='Art')
+        vectors = [[1.0, 0.0], [0.99, 0.1], [0.0, 1.0]]
+        cls.posts = []
+        for number, vector in enumerate(vectors):
+            post = Post.objects.create(
+                title=f'Post {number}', content='text', author=author, primary_category=cls.category
+            )
+            PostEmbedding.objects.create(
+                post=post, model_name=DEFAULT_MODEL_NAME, embedding_vector=vector,
+                embedding_dimension=2, content_hash=str(number)
+            )
+            cls.posts.append(post)
+
+    def _network(self, **params):
+        with mock.patch('gnn_models.integration.GNNIntegrationManager.find_similar_posts_by_embedding') as encode_search:
+            response = APIClient().get('/api/viz/unified-network/', {
+                'include_posts': 'true', 'min_posts': 0, 'similarity_threshold': 0.9, **params
+            })
+        self.assertEqual(response.status_code, 200)
+        encode_search.assert_not_called()
+        return response.data
+
+    def _similarity_edges(self, data):
+        return {
+            frozenset((edge['from'], edge['to'])) for edge in data['edges']
+            if str(edge.get('id', '')).startswith('similarity_')
+        }
+
+    def test_visible_posts_linked_by_stored_vectors(self):
+        first, second, _ = self.posts
+        self.assertEqual(
+            self._similarity_edges(self._network()), {frozenset((f'post_{first.id}', f'post_{second.id}'))}
+        )
+
+    def test_focus_post_adds_similar_posts(self):
+        first, second, third = self.posts
+        data = self._network(focus_post_id=first.id, max_posts=2)
+        post_nodes = {node['id'] for node in data['nodes'] if node.get('type') == 'post'}
+        self.assertEqual(post_nodes, {f'post_{first.id}', f'post_{second.id}'})
+
+
+def _two_cliques():
+    """Two 4-cliques (nodes 0-3 and 4-7) joined by the edge 3-4"""
+    edges = [(a, b) for block in (range(4), range(4, 8)) for a in block for b in block if a < b] + [(3, 4)]
+    rows, cols = zip(*edges)
+    adjacency = sparse.coo_matrix((np.ones(len(edges)), (rows, cols)), shape=(8, 8))
+    return (adjacency + adjacency.T).tocsr()
+
+
+class LouvainTests(SimpleTestCase):
+
+    def test_modularity_of_known_partitions(self):
+        adjacency = _two_cliques()
+        # 13 edges, each clique: 6 internal edges and total degree 13
+        self.assertAlmostEqual(modularity(adjacency, np.array([0] * 4 + [1] * 4)), 2 * (12 / 26 - (13 / 26) ** 2))
+        self.assertAlmostEqual(modularity(adjacency, np.zeros(8, dtype=int)), 0.0)
+        degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+        self.assertAlmostEqual(modularity(adjacency, np.arange(8)), -np.sum((degrees / 26) ** 2))
+
+    def test_louvain_finds_the_cliques(self):
+        adjacency = _two_cliques()
+        membership = louvain(adjacency)
+        self.assertEqual(len(set(membership[:4])), 1)
+        self.assertEqual(len(set(membership[4:])), 1)
+        self.assertNotEqual(membership[0], membership[4])
+        self.assertEqual(sorted(set(membership.tolist())), [0, 1])
+
+    def test_louvain_is_seeded(self):
+        adjacency = _two_cliques()
+        np.testing.assert_array_equal(louvain(adjacency, seed=3), louvain(adjacency, seed=3))
+
+    def test_higher_resolution_splits_more(self):
+        adjacency = _two_cliques()
+        self.assertGreater(len(set(louvain(adjacency, resolution=10.0).tolist())), 2)
+
+    def test_graph_without_edges(self):
+        np.testing.assert_array_equal(louvain(sparse.csr_matrix((3, 3))), np.arange(3))
+        self.assertEqual(modularity(sparse.csr_matrix((3, 3)), np.arange(3)), 0.0)
+
+
+class EventBufferTests(SimpleTestCase):
+    """Background flushing of the in-process event buffer (flush itself is faked)"""
+
+    def _buffer(self, **kwargs):
+        buffer = events.EventBuffer(**kwargs)
+        flushed = threading.Event()
+
+        def fake_flush():
+            drained = buffer._drain()
+            if drained:
+                buffer.flushed_events = drained
+                flushed.set()
+            return len(drained)
+
+        buffer.flush = fake_flush
+        return buffer, flushed
+
+    def test_flush_when_size_reached(self):
+        buffer, flushed = self._buffer(flush_every=3, flush_interval=60)
+        buffer.append({'event_type': 'view', 'post_id': 1})
+        buffer.append({'event_type': 'view', 'post_id': 2})
+        self.assertFalse(flushed.wait(0.2))
+        buffer.append({'event_type': 'view', 'post_id': 3})
+        self.assertTrue(flushed.wait(5))
+        self.assertEqual([event['post_id'] for event in buffer.flushed_events], [1, 2, 3])
+        self.assertEqual(len(buffer), 0)
+
+    def test_flush_after_interval(self):
+        buffer, flushed = self._buffer(flush_every=100, flush_interval=0.05)
+        buffer.append({'event_type': 'view', 'post_id': 1})
+        self.assertTrue(flushed.wait(5))
+        self.assertEqual(len(buffer.flushed_events), 1)
+
+    def test_full_buffer_keeps_newest_and_counts_drops(self):
+        buffer, _ = self._buffer(capacity=2, flush_every=100, flush_interval=60)
+        for post_id in (1, 2, 3):
+            buffer.append({'event_type': 'view', 'post_id': post_id})
+        self.assertEqual([event['post_id'] for event in buffer._events], [2, 3])
+        self.assertEqual(buffer.stats()['dropped'], 1)
+        self.assertEqual(buffer.stats()['recorded'], 3)
+
+
+class ParseClientEventsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = datetime(2026, 1, 2, 12, 0, tzinfo=dt_timezone.utc)
+
+    def test_valid_event(self):
+        valid, rejected = events.parse_client_events(
+            [{'type': 'similar_click', 'post_id': '12', 'context_post_id': 5, 'source': 'post_detail'}], now=self.now
+        )
+        self.assertEqual(rejected, 0)
+        self.assertEqual(valid, [{
+            'event_type': 'similar_click', 'post_id': 12, 'context_post_id': 5,
+            'source': 'post_detail', 'created_at': self.now,
+        }])
+
+    def test_unknown_types_are_rejected(self):
+        # Views are recorded by the middleware only
+        valid, rejected = events.parse_client_events(
+            [{'type': 'view', 'post_id': 1}, {'type': 'bogus', 'post_id': 1}, {'post_id': 1}], now=self.now
+        )
+        self.assertEqual((valid, rejected), ([], 3))
+
+    def test_bad_post_ids_are_rejected(self):
+        raw = [
+            {'type': 'similar_click', 'post_id': post_id} for post_id in ('abc', None, 0, -3, [1])
+        ] + [{'type': 'similar_click'}, {'type': 'similar_click', 'post_id': 1, 'context_post_id': 'x'}]
+        valid, rejected = events.parse_client_events(raw, now=self.now)
+        self.assertEqual((valid, rejected), ([], len(raw)))
+
+    def test_client_timestamps_are_clamped(self):
+        hour_ms = 3600 * 1000
+        now_ms = self.now.timestamp() * 1000
+        valid, _ = events.parse_client_events([
+            {'type': 'graph_focus', 'post_id': 1, 'ts': now_ms - hour_ms},
+            {'type': 'graph_focus', 'post_id': 1, 'ts': now_ms + hour_ms},
+            {'type': 'graph_focus', 'post_id': 1, 'ts': now_ms - 48 * hour_ms},
+        ], now=self.now)
+        self.assertEqual([event['created_at'] for event in valid], [
+            self.now - timedelta(hours=1), self.now, self.now - events.MAX_CLIENT_EVENT_AGE
+        ])
+
+    def test_oversized_batch_is_truncated(self):
+        raw = [{'type': 'graph_focus', 'post_id': 1}] * (events.MAX_EVENTS_PER_BATCH + 5)
+        valid, rejected = events.parse_client_events(raw, now=self.now)
+        self.assertEqual((len(valid), rejected), (events.MAX_EVENTS_PER_BATCH, 5))
+
+
+class EventIngestionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = _create_user('reader')
+        cls.post = Post.objects.create(title='Post', content='text', author=cls.user)
+
+    def setUp(self):
+        # A private buffer that never flushes on its own
+        patcher = mock.patch.object(events, 'event_buffer', events.EventBuffer(flush_every=1000, flush_interval=3600))
+        self.buffer = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ingest_view_queues_valid_events(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/events/', {'events': [
+            {'type': 'recommendation_click', 'post_id': self.post.id, 'source': 'post_list'},
+            {'type': 'view', 'post_id': self.post.id},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data['accepted'], response.data['rejected']), (1, 1))
+        self.assertEqual(
+            [(event['event_type'], event['post_id'], event['user_id']) for event in self.buffer._events],
+            [('recommendation_click', self.post.id, self.user.id)]
+        )
+        self.assertFalse(InteractionEvent.objects.exists())
+
+    def test_ingest_view_requires_event_list(self):
+        response = APIClient().post('/api/events/', {'events': 'nope'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_middleware_records_post_views(self):
+        response = APIClient().get(f'/api/posts/{self.post.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(event['event_type'], event['post_id']) for event in self.buffer._events],
+                         [('view', self.post.id)])
+
+    def test_flush_writes_buffered_events(self):
+        events.record_event('view', self.post.id, user_id=self.user.id)
+        events.record_event('graph_focus', self.post.id, session_key='abc')
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(
+            sorted(InteractionEvent.objects.values_list('event_type', 'user_id', 'session_key')),
+            [('graph_focus', None, 'abc'), ('view', self.user.id, '')]
+        )
+        self.assertEqual(self.buffer.stats()['written'], 2)
+        self.assertEqual(self.buffer.flush(), 0)
+
+
+class RollupInteractionsTests(TestCase):
+
+    def test_daily_totals(self):
+        user, other = _create_user('reader'), _create_user('other')
+        first = Post.objects.create(title='First', content='text', author=user)
+        second = Post.objects.create(title='Second', content='text', author=user)
+        day = date(2026, 1, 2)
+        at = datetime(2026, 1, 2, 10, 0, tzinfo=dt_timezone.utc)
+        InteractionEvent.objects.bulk_create([
+            InteractionEvent(event_type='view', post=first, user=user, created_at=at),
+            InteractionEvent(event_type='view', post=first, user=user, created_at=at),
+            InteractionEvent(event_type='view', post=first, user=other, created_at=at),
+            InteractionEvent(event_type='view', post=first, session_key='anon', created_at=at),
+            InteractionEvent(event_type='similar_click', post=second, user=other, created_at=at),
+            # Other days are not counted
+            InteractionEvent(event_type='view', post=second, user=user, created_at=at - timedelta(days=1)),
+            InteractionEvent(event_type='view', post=second, user=user, created_at=at + timedelta(days=1)),
+        ])
+
+        self.assertEqual(events.rollup_interactions(day), 2)
+        expected = [
+            (first.id, 'view', 4, 2),
+            (second.id, 'similar_click', 1, 1),
+        ]
+        rows = InteractionDailyRollup.objects.filter(date=day).order_by('post_id', 'event_type')
+        self.assertEqual(list(rows.values_list('post_id', 'event_type', 'event_count', 'user_count')), expected)
+
+        # Rerunning replaces the totals
+        InteractionEvent.objects.create(event_type='view', post=first, user=other, created_at=at)
+        events.rollup_interactions(day)
+        self.assertEqual(
+            InteractionDailyRollup.objects.get(date=day, post=first, event_type='view').event_count, 5
+        )
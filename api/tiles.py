@@ -0,0 +1,227 @@
+"""
+Zoom-level tiles over a precomputed network layout
+
+The layout plane (coordinates from api.layout / GraphLayout) is split like
+a map: zoom z has 2^z x 2^z tiles. Each zoom is a level of detail:
+
+- categories down to depth z are individual nodes
+- posts are individual nodes from POST_MIN_ZOOM on
+- everything deeper is folded into cluster nodes - one per (nearest visible
+  category, cluster grid cell), placed at the members' centroid and linked
+  to that category
+
+A TileIndex holds, per zoom, a grid of tile -> nodes/clusters/edges. Each
+edge is stored in the tile of its child endpoint only, so a client merging
+tiles never receives an edge twice. The index is built once per layout,
+posts and categories generation and shared by all requests.
+
+Tile ETags are derived from the layout version and those generations, so
+a revalidation request can be answered with 304 before the index is even
+touched.
+"""
+
+import hashlib
+import logging
+from collections import defaultdict
+import numpy as np
+from topicsloop.cache import get_generation
+from .layout import get_layout_positions, get_layout_version, DEFAULT_GRAPH_KEY
+
+logger = logging.getLogger(__name__)
+
+MAX_ZOOM = 6
+POST_MIN_ZOOM = 3
+# Cluster cells per tile side
+CLUSTER_GRID = 4
+# Largest vis.js size of a cluster node (same cap as category nodes)
+MAX_CLUSTER_SIZE = 150
+# Margin around the layout's bounding box (fraction of its size)
+WORLD_PADDING = 0.02
+
+TILE_GENERATIONS = ('posts', 'categories')
+
+_index_cache = {}
+
+
+def _tile_generations(graph_key):
+    return (get_layout_version(graph_key),) + tuple(get_generation(name) for name in TILE_GENERATIONS)
+
+
+def tile_etag(graph_key, z, x, y):
+    """ETag of a tile - changes whenever the layout, posts or categories change"""
+    parts = f'{graph_key}:{z}:{x}:{y}:{_tile_generations(graph_key)}'
+    return f'"{hashlib.md5(parts.encode()).hexdigest()}"'
+
+
+class TileIndex:
+    """Per-zoom grid of nodes, clusters and edges for one stored layout"""
+
+    def __init__(self, positions, tree, posts):
+        """
+        Args:
+            positions: Node id -> (x, y) from GraphLayout
+            tree: CategoryTree
+            posts: Iterable of (post_id, title, primary_category_id)
+        """
+        self.tree = tree
+        self.depth = {category_id: len(tree.path(category_id)) - 1 for category_id in tree.parent}
+
+        # Base node dicts, shared by every zoom
+        self.node_data = {}
+        for category_id, depth in self.depth.items():
+            node_id = f'category_{category_id}'
+            if node_id in positions:
+                self.node_data[node_id] = {
+                    'id': node_id, 'label': tree.name[category_id], 'type': 'category',
+                    'category_id': category_id, 'parent_id': tree.parent[category_id], 'level': depth,
+                }
+        self.post_category = {}
+        for post_id, title, category_id in posts:
+            node_id = f'post_{post_id}'
+            if node_id in positions:
+                self.node_data[node_id] = {
+                    'id': node_id, 'label': title[:30] + ('...' if len(title) > 30 else ''),
+                    'type': 'post', 'post_id': post_id, 'category_id': category_id,
+                }
+                self.post_category[node_id] = category_id
+
+        self.node_ids = list(self.node_data)
+        coordinates = np.asarray([positions[node_id] for node_id in self.node_ids], dtype=np.float64).reshape(-1, 2)
+        for node_id, (x, y) in zip(self.node_ids, coordinates):
+            self.node_data[node_id]['x'] = float(x)
+            self.node_data[node_id]['y'] = float(y)
+
+        # Square world so tiles are square too
+        if len(coordinates):
+            low = coordinates.min(axis=0)
+            size = float((coordinates.max(axis=0) - low).max()) or 1.0
+        else:
+            low, size = np.zeros(2), 1.0
+        padding = size * WORLD_PADDING
+        self.origin = low - padding
+        self.size = size + 2 * padding
+        self.coordinates = coordinates
+
+        self.levels = [self._build_level(z) for z in range(MAX_ZOOM + 1)]
+
+    @property
+    def bounds(self):
+        return {
+            'min_x': float(self.origin[0]), 'min_y': float(self.origin[1]),
+            'max_x': float(self.origin[0] + self.size), 'max_y': float(self.origin[1] + self.size),
+        }
+
+    def _cells(self, resolution):
+        cells = np.floor((self.coordinates - self.origin) / self.size * resolution).astype(np.int64)
+        return np.clip(cells, 0, resolution - 1)
+
+    def _visible_category(self, category_id, z):
+        """Nearest category on the path of category_id that is shown at zoom z"""
+        if category_id is None or category_id not in self.depth:
+            return None
+        return self.tree.ancestor_at_level(category_id, z)
+
+    def _build_level(self, z):
+        tiles_per_side = 2 ** z
+        tile_cells = self._cells(tiles_per_side)
+        cluster_cells = self._cells(tiles_per_side * CLUSTER_GRID)
+
+        tiles = defaultdict(lambda: {'nodes': [], 'clusters': [], 'edges': []})
+        clusters = {}
+
+        for position, node_id in enumerate(self.node_ids):
+            data = self.node_data[node_id]
+            tile = tuple(tile_cells[position].tolist())
+
+            if data['type'] == 'category':
+                visible = data['level'] <= z
+                anchor = self.tree.parent[data['category_id']] if visible else self._visible_category(data['category_id'], z)
+            else:
+                visible = z >= POST_MIN_ZOOM
+                anchor = self._visible_category(self.post_category[node_id], z)
+
+            if visible:
+                tiles[tile]['nodes'].append(node_id)
+                if anchor is not None:
+                    tiles[tile]['edges'].append((node_id, f'category_{anchor}'))
+                continue
+
+            cell = tuple(cluster_cells[position].tolist())
+            key = (anchor, cell)
+            cluster = clusters.get(key)
+            if cluster is None:
+                cluster = clusters[key] = {
+                    'tile': tile, 'anchor': anchor, 'x': 0.0, 'y': 0.0, 'posts': 0, 'categories': 0,
+                    'id': f'cluster_{z}_{anchor}_{cell[0]}_{cell[1]}',
+                }
+            cluster['x'] += data['x']
+            cluster['y'] += data['y']
+            cluster['posts' if data['type'] == 'post' else 'categories'] += 1
+
+        for cluster in clusters.values():
+            members = cluster['posts'] + cluster['categories']
+            cluster['x'] /= members
+            cluster['y'] /= members
+            tile = tiles[cluster.pop('tile')]
+            tile['clusters'].append(cluster)
+            if cluster['anchor'] is not None:
+                tile['edges'].append((cluster['id'], f"category_{cluster['anchor']}"))
+
+        return dict(tiles)
+
+    def tile(self, z, x, y):
+        """vis.js nodes and edges of one tile"""
+        content = self.levels[z].get((x, y))
+        if content is None:
+            return {'nodes': [], 'edges': []}
+
+        nodes = [{**self.node_data[node_id], 'physics': False} for node_id in content['nodes']]
+        for cluster in content['clusters']:
+            members = cluster['posts'] + cluster['categories']
+            nodes.append({
+                'id': cluster['id'],
+                'label': f"{cluster['posts']} posts" if not cluster['categories']
+                         else f"{cluster['categories']} categories, {cluster['posts']} posts",
+                'type': 'cluster',
+                'category_id': cluster['anchor'],
+                'post_count': cluster['posts'],
+                'category_count': cluster['categories'],
+                'x': cluster['x'],
+                'y': cluster['y'],
+                'size': min(int(10 + 4 * members ** 0.5), MAX_CLUSTER_SIZE),
+                'physics': False,
+            })
+        edges = [
+            {'id': f'{source}_to_{target}', 'from': source, 'to': target}
+            for source, target in content['edges']
+        ]
+        return {'nodes': nodes, 'edges': edges}
+
+
+def get_tile_index(graph_key=DEFAULT_GRAPH_KEY):
+    """
+    Shared TileIndex for a stored layout, rebuilt when its data changes
+
+    Returns:
+        TileIndex, or None if no layout has been computed for graph_key
+    """
+    from blog.models import Post
+    from blog.category_tree import get_category_tree
+
+    generations = _tile_generations(graph_key)
+    cached = _index_cache.get(graph_key)
+    if cached is not None and cached[0] == generations:
+        return cached[1]
+
+    positions = get_layout_positions(graph_key)
+    if not positions:
+        return None
+
+    index = TileIndex(
+        positions,
+        get_category_tree(),
+        Post.objects.values_list('id', 'title', 'primary_category_id').iterator(chunk_size=10000),
+    )
+    _index_cache[graph_key] = (generations, index)
+    logger.info(f"Built tile index '{graph_key}': {len(index.node_ids)} nodes, zoom 0-{MAX_ZOOM}")
+    return index
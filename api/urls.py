@@ -5,7 +5,7 @@ from .views import (
     UserProfileViewSet, CategoryNetworkView, UserNetworkView,
     SimilarPostsView, SimilarCategoriesView, RecommendationsView, EmbeddingStatsView, EmbeddingGenerationView,
     SemanticCategoryNetworkView, UnifiedCategoryNetworkView, AutoCategorizationView,
-    PostNetworkView
+    PostNetworkView, NetworkTileView, EventIngestView, TrendingPostsView
 )
 
 # Router dla ViewSets
@@ -18,6 +18,7 @@ urlpatterns = [
     path('', api_root, name='api-root'),
     path('posts/', PostListView.as_view(), name='post-list'),
     path('posts/<int:pk>/', PostDetailView.as_view(), name='post-detail'),
+    path('posts/trending/', TrendingPostsView.as_view(), name='trending-posts'),
 
     # Visualization endpoints
     path('viz/category-network/', CategoryNetworkView.as_view(), name='category-network'),
@@ -25,6 +26,7 @@ urlpatterns = [
     path('viz/unified-network/', UnifiedCategoryNetworkView.as_view(), name='unified-category-network'),
     path('viz/user-network/', UserNetworkView.as_view(), name='user-network'),
     path('viz/post-network/', PostNetworkView.as_view(), name='post-network'),
+    path('viz/tiles/<int:z>/<int:x>/<int:y>/', NetworkTileView.as_view(), name='network-tile'),
 
     # AI-enhanced endpoints
     path('posts/<int:post_id>/similar/', SimilarPostsView.as_view(), name='similar-posts'),
@@ -34,5 +36,8 @@ urlpatterns = [
     path('ai/embeddings/', EmbeddingGenerationView.as_view(), name='embedding-generation'),
     path('ai/auto-categorize/', AutoCategorizationView.as_view(), name='auto-categorization'),
 
+    # Interaction events (buffered, written in bulk)
+    path('events/', EventIngestView.as_view(), name='interaction-events'),
+
     path('', include(router.urls)),  # Dodaje /categories/ i /tags/
 ]
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Shared-interest graph between users
+
+Users are rows and categories are columns of a sparse incidence matrix A
+(A[u, c] = 1 when user u has category c among their favorites), loaded from
+the favorites through table with one query. The number of shared interests
+for every pair of users is (A · Aᵀ)[u, v]. The product is evaluated in row
+blocks so that memory stays bounded even when a popular category links
+almost everyone; only the top-k neighbours of each user (with at least
+`min_overlap` shared categories) are kept.
+
+The result is cached against the favorites and categories generations.
+"""
+
+import numpy as np
+from scipy import sparse
+from django.core.cache import cache
+from topicsloop.cache import versioned_key
+
+DEFAULT_TOP_K = 10
+MAX_TOP_K = 100
+USER_GRAPH_CACHE_TIMEOUT = 3600
+
+# Users per A[block] · Aᵀ product
+BLOCK_SIZE = 256
+
+
+def build_incidence_matrix():
+    """
+    Load the user x category favorites matrix
+
+    Returns:
+        (matrix, user_ids, usernames, category_ids) where matrix is a CSR
+        matrix with one row per user that has favorites
+    """
+    from accounts.models import UserProfile
+
+    rows = UserProfile.favorite_categories.through.objects.values_list(
+        'userprofile__user_id', 'userprofile__user__username', 'category_id'
+    ).order_by('userprofile__user_id')
+
+    user_index = {}
+    category_index = {}
+    usernames = []
+    row_indices = []
+    col_indices = []
+    for user_id, username, category_id in rows.iterator(chunk_size=10000):
+        if user_id not in user_index:
+            user_index[user_id] = len(user_index)
+            usernames.append(username)
+        if category_id not in category_index:
+            category_index[category_id] = len(category_index)
+        row_indices.append(user_index[user_id])
+        col_indices.append(category_index[category_id])
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(row_indices), dtype=np.int32), (row_indices, col_indices)),
+        shape=(len(user_index), len(category_index))
+    )
+    matrix.sum_duplicates()
+    return matrix, list(user_index), usernames, list(category_index)
+
+
+def top_shared_interests(matrix, top_k=DEFAULT_TOP_K, min_overlap=1):
+    """
+    Strongest shared-interest pairs from the incidence matrix
+
+    Args:
+        matrix: CSR user x category matrix
+        top_k: Neighbours kept per user
+        min_overlap: Minimum number of shared categories
+
+    Returns:
+        Dict {(row_a, row_b): shared_count} with row_a < row_b
+    """
+    transposed = matrix.T.tocsr()
+    pairs = {}
+
+    for start in range(0, matrix.shape[0], BLOCK_SIZE):
+        block = (matrix[start:start + BLOCK_SIZE] @ transposed).tocsr()
+
+        for offset in range(block.shape[0]):
+            row = start + offset
+            begin, end = block.indptr[offset], block.indptr[offset + 1]
+            neighbours = block.indices[begin:end]
+            counts = block.data[begin:end]
+
+            keep = (neighbours != row) & (counts >= min_overlap)
+            neighbours = neighbours[keep]
+            counts = counts[keep]
+            if len(counts) > top_k:
+                best = np.argpartition(-counts, top_k - 1)[:top_k]
+                neighbours = neighbours[best]
+                counts = counts[best]
+
+            for neighbour, count in zip(neighbours.tolist(), counts.tolist()):
+                pairs[(min(row, neighbour), max(row, neighbour))] = count
+
+    return pairs
+
+
+def get_user_interest_graph(top_k=DEFAULT_TOP_K, min_overlap=1):
+    """
+    Users with favorites and their strongest shared-interest links
+
+    Returns:
+        {'users': [(user_id, username, [category_id, ...]), ...],
+         'edges': [(user_id_a, user_id_b, shared_count), ...]}
+    """
+    cache_key = versioned_key(
+        'user_interest_graph', (top_k, min_overlap), generations=('favorites', 'categories')
+    )
+    graph = cache.get(cache_key)
+    if graph is not None:
+        return graph
+
+    matrix, user_ids, usernames, category_ids = build_incidence_matrix()
+
+    users = []
+    for row, user_id in enumerate(user_ids):
+        columns = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+        users.append((user_id, usernames[row], [category_ids[c] for c in columns.tolist()]))
+
+    pairs = top_shared_interests(matrix, top_k=top_k, min_overlap=min_overlap)
+    edges = [
+        (user_ids[row_a], user_ids[row_b], count)
+        for (row_a, row_b), count in sorted(pairs.items(), key=lambda item: -item[1])
+    ]
+
+    graph = {'users': users, 'edges': edges}
+    cache.set(cache_key, graph, USER_GRAPH_CACHE_TIMEOUT)
+    return graph
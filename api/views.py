@@ -10,6 +10,16 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django.db import models
+from django.core.cache import cache
+from .cooccurrence import category_cooccurrence
+from .user_similarity import get_user_interest_graph, DEFAULT_TOP_K, MAX_TOP_K
+from .graph_builder import GraphBuilder
+from .wire import VIZ_RENDERER_CLASSES
+from .facets import compute_post_facets, DEFAULT_FACET_LIMIT, MAX_FACET_LIMIT
+from .post_cache import (
+    post_filter_parts, post_query_key, ids_fingerprint, build_result_window, hydrate_posts,
+    POST_QUERY_CACHE_TIMEOUT
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -54,6 +64,7 @@ class PostListView(APIView):
         # === CATEGORY FILTERING ===
         # New category filtering parameter (separate from existing favorites logic)
         category_filter_id = request.query_params.get('category', None)
+        category_id = None
         if category_filter_id:
             try:
                 category_id = int(category_filter_id)
@@ -64,16 +75,21 @@ class PostListView(APIView):
                 )
                 posts = posts.filter(category_filter).distinct()
             except (ValueError, TypeError):
-                pass  # Invalid category ID, ignore filter
+                category_id = None  # Invalid category ID, ignore filter
 
         # Check for manual category filtering via query parameters (existing logic)
         category_ids = request.query_params.get('categories', None)
         show_all = request.query_params.get('show_all', 'false').lower() == 'true'
 
+        # Which personal filter was applied - part of the normalized cache key
+        scope = 'all'
+        # Ordered ids read from the materialized favorites feed (if used)
+        feed_window = None
+
         if request.user.is_authenticated:
             try:
                 user_profile = request.user.profile
-                favorite_categories = user_profile.favorite_categories.all()
+                favorite_ids = list(user_profile.favorite_categories.values_list('id', flat=True))
 
                 # Manual category selection (via query params)
                 if category_ids is not None and not show_all:
@@ -81,11 +97,11 @@ class PostListView(APIView):
                         if category_ids == '':
                             # User explicitly selected NO categories - show no posts
                             posts = posts.none()
+                            scope = 'none'
                         else:
                             selected_category_ids = [int(cat_id.strip()) for cat_id in category_ids.split(',') if cat_id.strip()]
                             # Filter by manually selected categories from user's favorites
-                            user_favorite_ids = list(favorite_categories.values_list('id', flat=True))
-                            valid_category_ids = [cat_id for cat_id in selected_category_ids if cat_id in user_favorite_ids]
+                            valid_category_ids = [cat_id for cat_id in selected_category_ids if cat_id in favorite_ids]
 
                             if valid_category_ids:
                                 from django.db.models import Q
@@ -94,29 +110,70 @@ class PostListView(APIView):
                                     Q(additional_categories__id__in=valid_category_ids)
                                 )
                                 posts = posts.filter(category_filter).distinct()
+                                scope = f'selected:{ids_fingerprint(valid_category_ids)}'
                             else:
                                 # No valid categories selected - show no posts
                                 posts = posts.none()
+                                scope = 'none'
                     except (ValueError, TypeError):
                         pass  # Invalid category IDs, fall back to default behavior
 
                 # Default behavior: show posts from all favorite categories (if no manual selection)
-                elif not show_all and favorite_categories.exists():
+                elif not show_all and favorite_ids:
                     from django.db.models import Q
+                    from blog.category_tree import get_category_tree
+                    from blog.feeds import read_feed, FEED_MAX_LENGTH
+
+                    # Favorites include their subcategories
+                    feed_category_ids = get_category_tree().descendants(favorite_ids)
                     category_filter = (
-                        Q(primary_category__in=favorite_categories) |
-                        Q(additional_categories__in=favorite_categories)
+                        Q(primary_category__id__in=feed_category_ids) |
+                        Q(additional_categories__id__in=feed_category_ids)
                     )
                     filtered_posts = posts.filter(category_filter).distinct()
 
+                    # 📰 Plain newest-first listing: read the precomputed feed
+                    # instead of joining posts x categories x favorites
+                    plain_listing = (
+                        not search_query and category_id is None and
+                        request.query_params.get('order', 'newest') not in ('oldest', 'title')
+                    )
+                    if plain_listing:
+                        feed_ids = read_feed(request.user.id, favorite_ids)
+                        if feed_ids:
+                            # A full feed is capped - the total is counted below
+                            feed_window = {
+                                'ids': feed_ids,
+                                'total': len(feed_ids) if len(feed_ids) < FEED_MAX_LENGTH else None
+                            }
+
                     # If we have filtered posts, use them; otherwise show all posts
-                    if filtered_posts.exists():
+                    if feed_window is not None or filtered_posts.exists():
                         posts = filtered_posts
+                        scope = f'favorites:{ids_fingerprint(favorite_ids)}'
 
             except UserProfile.DoesNotExist:
                 # User has no profile yet, show all posts
                 pass
 
+        filter_parts = post_filter_parts(search_query, category_id, scope)
+
+        # === FACETS (optional) ===
+        # Counts per root category, level-1 category and tag for this result set
+        facets = None
+        if request.query_params.get('facets', 'false').lower() == 'true':
+            try:
+                facet_limit = int(request.query_params.get('facet_limit', DEFAULT_FACET_LIMIT))
+            except (ValueError, TypeError):
+                facet_limit = DEFAULT_FACET_LIMIT
+            facet_limit = max(1, min(facet_limit, MAX_FACET_LIMIT))
+
+            facets_cache_key = post_query_key('post_facets', (filter_parts, facet_limit))
+            facets = cache.get(facets_cache_key)
+            if facets is None:
+                facets = compute_post_facets(posts, limit=facet_limit)
+                cache.set(facets_cache_key, facets, POST_QUERY_CACHE_TIMEOUT)
+
         # === ORDERING ===
         order_by = request.query_params.get('order', 'newest')
         if order_by == 'oldest':
@@ -132,7 +189,24 @@ class PostListView(APIView):
         page_size = int(request.query_params.get('page_size', 10))  # Default 10 posts per page
         page_number = request.query_params.get('page', 1)
 
-        paginator = Paginator(posts, page_size)
+        # Ordered ids + total are cached per normalized query; only the
+        # requested page is loaded from the database
+        results_cache_key = post_query_key('post_results', (filter_parts, order_by))
+        if feed_window is not None and feed_window['total'] is None:
+            # Pages past the feed are queried directly below, so they must be counted
+            count_cache_key = post_query_key('post_count', filter_parts)
+            total = cache.get(count_cache_key)
+            if total is None:
+                total = posts.count()
+                cache.set(count_cache_key, total, POST_QUERY_CACHE_TIMEOUT)
+            feed_window['total'] = max(total, len(feed_window['ids']))
+        result_window = feed_window or cache.get(results_cache_key)
+        if result_window is None:
+            result_window = build_result_window(posts)
+            cache.set(results_cache_key, result_window, POST_QUERY_CACHE_TIMEOUT)
+
+        # Paginate positions; the page is then resolved to posts below
+        paginator = Paginator(range(result_window['total']), page_size)
         total_count = paginator.count
         total_pages = paginator.num_pages
 
@@ -143,10 +217,18 @@ class PostListView(APIView):
         except EmptyPage:
             page_obj = paginator.page(paginator.num_pages)
 
+        page_start = (page_obj.number - 1) * page_size
+        page_end = page_start + len(page_obj.object_list)
+        if page_end <= len(result_window['ids']):
+            page_posts = hydrate_posts(result_window['ids'][page_start:page_end])
+        else:
+            # Beyond the cached window - query this page directly
+            page_posts = list(posts[page_start:page_end])
+
         # === RESPONSE WITH PAGINATION METADATA ===
-        serializer = PostSerializer(page_obj.object_list, many=True)
+        serializer = PostSerializer(page_posts, many=True)
 
-        return Response({
+        response_data = {
             'posts': serializer.data,
             'pagination': {
                 'current_page': page_obj.number,
@@ -167,7 +249,11 @@ class PostListView(APIView):
                 'page': page_number,
                 'page_size': page_size
             }
-        })
+        }
+        if facets is not None:
+            response_data['facets'] = facets
+
+        return Response(response_data)
 
     def post(self, request):
         if not request.user.is_authenticated:
@@ -374,6 +460,58 @@ class PostDetailView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class TrendingPostsView(APIView):
+    """
+    Currently most popular posts, globally or within one root category
+    Reads the precomputed PostPopularity table (gnn_models.popularity) with a
+    single index scan; only the returned posts are loaded.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        """
+        Query params:
+        - category: Category id - its root category tree is used (optional)
+        - limit: Number of posts (default 20, max 100)
+        """
+        from gnn_models.popularity import top_popular
+        from blog.category_tree import get_category_tree
+
+        try:
+            limit = max(1, min(int(request.GET.get('limit', 20)), 100))
+            category_id = int(request.GET['category']) if request.GET.get('category') else None
+        except ValueError as e:
+            return Response({'error': f'Invalid parameter: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        root_id = None
+        if category_id is not None:
+            tree = get_category_tree()
+            if category_id not in tree.parent:
+                return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
+            root_id = tree.root_of(category_id)
+
+        trending = top_popular(limit, root_category_id=root_id)
+        posts = Post.objects.prefetch_related(
+            'primary_category',
+            'additional_categories',
+            'tags'
+        ).select_related('author').in_bulk([post_id for post_id, _, _, _ in trending])
+
+        return Response({
+            'posts': [
+                {
+                    'post': PostSerializer(posts[post_id]).data,
+                    'trending_score': round(score, 4),
+                    'interaction_count': interactions,
+                    'comment_count': comments
+                }
+                for post_id, score, interactions, comments in trending if post_id in posts
+            ],
+            'root_category_id': root_id,
+            'limit': limit
+        })
+
+
 class UserProfileViewSet(viewsets.ModelViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
@@ -412,66 +550,68 @@ class CategoryNetworkView(APIView):
     Returns category network data for vis.js visualization
     """
     permission_classes = [AllowAny]
+    renderer_classes = VIZ_RENDERER_CLASSES  # ?format=columnar
 
     def get(self, request):
         """
         Returns category network data for vis.js
         Structure: nodes (categories) + edges (connections via posts)
+
+        collapse=clusters returns precomputed communities instead (expand=<ids> opens them)
         """
         from django.db.models import Count
-        from collections import defaultdict
+
+        if request.GET.get('collapse') == 'clusters':
+            from .communities import collapsed_network, parse_expand
+
+            def member_nodes(category_ids):
+                return {
+                    category.id: {'label': category.name, 'title': f"{category.name}\n{category.description}", 'group': 'category'}
+                    for category in Category.objects.filter(id__in=category_ids)
+                }
+
+            data = collapsed_network('categories', parse_expand(request.GET.get('expand')), member_nodes,
+                                     node_id=lambda category_id: category_id)
+            if data is None:
+                return Response({
+                    'error': 'Communities not computed yet - run `python manage.py detect_communities`',
+                    'nodes': [],
+                    'edges': []
+                }, status=status.HTTP_404_NOT_FOUND)
+            return Response(data)
 
         # Get all categories with post counts
         categories = Category.objects.annotate(
             post_count=Count('post', distinct=True) + Count('secondary_posts', distinct=True)
         ).filter(post_count__gt=0)
 
+        graph = GraphBuilder()
+
         # Create nodes
-        nodes = []
         for category in categories:
-            nodes.append({
-                'id': category.id,
-                'label': category.name,
-                'title': f"{category.name}\n{category.description}\nPosts: {category.post_count}",
-                'value': category.post_count,  # Size based on post count
-                'group': 'category'
-            })
+            graph.add_node(
+                category.id,
+                kind='category',
+                label=category.name,
+                title=f"{category.name}\n{category.description}\nPosts: {category.post_count}",
+                value=category.post_count,  # Size based on post count
+                group='category'
+            )
 
-        # Create edges based on posts that share categories
-        edges = []
-        edge_weights = defaultdict(int)
-
-        # Get posts with their categories
-        posts = Post.objects.prefetch_related('primary_category', 'additional_categories').all()
-
-        for post in posts:
-            post_categories = []
-            if post.primary_category:
-                post_categories.append(post.primary_category.id)
-            post_categories.extend([cat.id for cat in post.additional_categories.all()])
-
-            # Create edges between all category pairs in this post
-            for i, cat1 in enumerate(post_categories):
-                for cat2 in post_categories[i+1:]:
-                    edge_key = tuple(sorted([cat1, cat2]))
-                    edge_weights[edge_key] += 1
-
-        # Convert edge weights to vis.js format
-        for (cat1, cat2), weight in edge_weights.items():
-            edges.append({
-                'from': cat1,
-                'to': cat2,
-                'value': weight,
-                'title': f"Shared in {weight} post(s)",
-                'width': min(weight * 2, 10)  # Limit max width
-            })
+        # Create edges based on posts that share categories (counted in SQL)
+        for cat1, cat2, weight in category_cooccurrence():
+            graph.add_edge(
+                cat1, cat2,
+                value=weight,
+                title=f"Shared in {weight} post(s)",
+                width=min(weight * 2, 10)  # Limit max width
+            )
 
         return Response({
-            'nodes': nodes,
-            'edges': edges,
+            **graph.to_vis(),
             'stats': {
-                'total_categories': len(nodes),
-                'total_connections': len(edges),
+                'total_categories': graph.node_count(),
+                'total_connections': graph.edge_count(),
                 'most_connected': max(categories, key=lambda c: c.post_count).name if categories else None
             }
         })
@@ -482,58 +622,55 @@ class UserNetworkView(APIView):
     Returns user network based on shared interests
     """
     permission_classes = [AllowAny]
+    renderer_classes = VIZ_RENDERER_CLASSES  # ?format=columnar
 
     def get(self, request):
         """
         Returns user network based on shared interests
         """
-        # Get users with their favorite categories
-        from collections import defaultdict
+        # Shared-interest counts come from a sparse user x category product
+        from blog.category_tree import get_category_tree
+
+        try:
+            top_k = int(request.query_params.get('top_k', DEFAULT_TOP_K))
+            min_overlap = int(request.query_params.get('min_overlap', 1))
+        except (ValueError, TypeError):
+            top_k, min_overlap = DEFAULT_TOP_K, 1
+        top_k = max(1, min(top_k, MAX_TOP_K))
+        min_overlap = max(1, min_overlap)
 
-        profiles = UserProfile.objects.prefetch_related('favorite_categories', 'user').all()
+        graph_data = get_user_interest_graph(top_k=top_k, min_overlap=min_overlap)
+        category_names = get_category_tree().name
 
-        nodes = []
-        edges = []
+        graph = GraphBuilder()
 
         # Create user nodes
-        for profile in profiles:
-            if profile.favorite_categories.exists():
-                nodes.append({
-                    'id': f"user_{profile.user.id}",
-                    'label': profile.user.username,
-                    'title': f"{profile.user.username}\nInterests: {', '.join([cat.name for cat in profile.favorite_categories.all()])}",
-                    'group': 'user',
-                    'value': profile.favorite_categories.count()
-                })
+        for user_id, username, interest_ids in graph_data['users']:
+            graph.add_node(
+                f"user_{user_id}",
+                kind='user',
+                label=username,
+                title=f"{username}\nInterests: {', '.join(category_names.get(cid, '') for cid in interest_ids)}",
+                group='user',
+                value=len(interest_ids)
+            )
 
         # Create edges based on shared interests
-        for i, profile1 in enumerate(profiles):
-            if not profile1.favorite_categories.exists():
-                continue
-
-            for profile2 in profiles[i+1:]:
-                if not profile2.favorite_categories.exists():
-                    continue
-
-                # Count shared categories
-                shared_categories = set(profile1.favorite_categories.values_list('id', flat=True)) & \
-                                  set(profile2.favorite_categories.values_list('id', flat=True))
-
-                if shared_categories:
-                    edges.append({
-                        'from': f"user_{profile1.user.id}",
-                        'to': f"user_{profile2.user.id}",
-                        'value': len(shared_categories),
-                        'title': f"Shared interests: {len(shared_categories)}",
-                        'width': len(shared_categories)
-                    })
+        for user1_id, user2_id, shared_count in graph_data['edges']:
+            graph.add_edge(
+                f"user_{user1_id}", f"user_{user2_id}",
+                value=shared_count,
+                title=f"Shared interests: {shared_count}",
+                width=shared_count
+            )
 
         return Response({
-            'nodes': nodes,
-            'edges': edges,
+            **graph.to_vis(),
             'stats': {
-                'total_users': len(nodes),
-                'total_connections': len(edges)
+                'total_users': graph.node_count(),
+                'total_connections': graph.edge_count(),
+                'top_k': top_k,
+                'min_overlap': min_overlap
             }
         })
 
@@ -548,6 +685,7 @@ class SimilarPostsView(APIView):
     def get(self, request, post_id):
         from ai_models.models import PostSimilarity
         from gnn_models.integration import gnn_manager
+        from gnn_models.diversify import parse_diversity, candidate_pool_size, diversify_posts
         from django.db.models import Q
 
         try:
@@ -559,6 +697,9 @@ class SimilarPostsView(APIView):
             algorithm = request.GET.get('algorithm', 'cosine')
             method = request.GET.get('method', 'gnn')  # 'gnn' or 'fallback' - use embeddings by default
             limit = int(request.GET.get('limit', 10))
+            diversity = parse_diversity(request.GET.get('diversity'))  # 0 = relevance only, 1 = novelty only
+            # MMR needs more candidates than it returns
+            pool_size = candidate_pool_size(limit, diversity)
 
             # Initialize GNN manager if not already done
             if not gnn_manager.models_loaded:
@@ -569,25 +710,24 @@ class SimilarPostsView(APIView):
                 # Use semantic embeddings for enhanced similarity
                 semantic_similarities = gnn_manager.find_similar_posts_by_embedding(
                     post_id=target_post.id,
-                    top_k=limit,
+                    top_k=pool_size,
                     threshold=threshold
                 )
 
                 if semantic_similarities:
                     # Convert to PostSimilarity-like objects for response
-                    similarities = []
-                    for similar_post_id, similarity_score in semantic_similarities:
-                        try:
-                            similar_post = Post.objects.get(id=similar_post_id)
-                            similarities.append(type('obj', (object,), {
-                                'post1': target_post,
-                                'post2': similar_post,
-                                'similarity_score': similarity_score,
-                                'algorithm': 'sentence_transformers',
-                                'model_name': gnn_manager.embedding_manager.model_name if gnn_manager.embedding_manager else 'unknown'
-                            }))
-                        except Post.DoesNotExist:
-                            continue
+                    similar_posts = Post.objects.in_bulk([similar_post_id for similar_post_id, _ in semantic_similarities])
+                    similarities = [
+                        type('obj', (object,), {
+                            'post1': target_post,
+                            'post2': similar_posts[similar_post_id],
+                            'similarity_score': similarity_score,
+                            'algorithm': 'sentence_transformers',
+                            'model_name': gnn_manager.embedding_manager.model_name if gnn_manager.embedding_manager else 'unknown'
+                        })
+                        for similar_post_id, similarity_score in semantic_similarities
+                        if similar_post_id in similar_posts
+                    ]
                     method_used = 'semantic_embeddings'
                 else:
                     # Fallback to traditional
@@ -595,7 +735,7 @@ class SimilarPostsView(APIView):
                         post=target_post,
                         threshold=threshold,
                         algorithm=algorithm
-                    )[:limit]
+                    ).select_related('post1', 'post2')[:pool_size]
                     method_used = 'traditional_fallback'
             else:
                 # Traditional similarity
@@ -603,9 +743,20 @@ class SimilarPostsView(APIView):
                     post=target_post,
                     threshold=threshold,
                     algorithm=algorithm
-                )[:limit]
+                ).select_related('post1', 'post2')[:pool_size]
                 method_used = 'traditional'
 
+            # 🎨 Dywersyfikacja (MMR) - near-duplicates of already chosen posts are pushed down
+            similarities = list(similarities)
+            order = diversify_posts(
+                [(similarity.post2 if similarity.post1 == target_post else similarity.post1).id
+                 for similarity in similarities],
+                [similarity.similarity_score for similarity in similarities],
+                limit,
+                diversity
+            )
+            similarities = [similarities[i] for i in order]
+
             # Build response with similar posts
             similar_posts_data = []
             for similarity in similarities:
@@ -637,7 +788,8 @@ class SimilarPostsView(APIView):
                     'threshold': threshold,
                     'algorithm': algorithm,
                     'method': method,
-                    'limit': limit
+                    'limit': limit,
+                    'diversity': diversity
                 },
                 'gnn_status': {
                     'available': gnn_manager.pytorch_available,
@@ -678,7 +830,7 @@ class SimilarCategoriesView(APIView):
             limit = int(request.GET.get('limit', 10))
 
             # Get embeddings for the target category
-            target_embeddings = CategoryEmbedding.objects.filter(category=target_category)
+            target_embeddings = CategoryEmbedding.objects.filter(category=target_category, source='posts')
 
             if not target_embeddings.exists():
                 return Response({
@@ -697,7 +849,7 @@ class SimilarCategoriesView(APIView):
             target_vector = np.array(target_embedding.aggregated_vector)
 
             # Get all other category embeddings
-            other_embeddings = CategoryEmbedding.objects.exclude(
+            other_embeddings = CategoryEmbedding.objects.filter(source='posts').exclude(
                 category=target_category
             ).select_related('category')
 
@@ -768,20 +920,28 @@ class SimilarCategoriesView(APIView):
 class RecommendationsView(APIView):
     """
     Get personalized post recommendations for authenticated users
-    Based on user embeddings and post similarities, enhanced with GNN
+    Two-stage recommender (gnn_models.recommender): candidates from the interest
+    vector, favorite categories and popular posts, re-ranked with MMR
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        from ai_models.models import UserEmbedding, PostEmbedding
+        from ai_models.models import UserEmbedding
         from gnn_models.integration import gnn_manager
-        import numpy as np
+        from gnn_models.centroids import DEFAULT_MODEL_NAME
+        from gnn_models.recommender import recommend, SOURCE_REASONS
+        from gnn_models.diversify import parse_diversity
+        from .events import recently_seen_post_ids
 
         try:
             # Get query parameters
             limit = int(request.GET.get('limit', 10))
-            model_name = request.GET.get('model', 'default')
+            model_name = request.GET.get('model', DEFAULT_MODEL_NAME)
             method = request.GET.get('method', 'fallback')  # 'gnn' or 'fallback'
+            diversity = parse_diversity(request.GET.get('diversity'))  # 0 = relevance only, 1 = novelty only
+            # Posts the client has already shown (comma separated ids) and posts the user recently opened
+            exclude_ids = {int(part) for part in request.GET.get('exclude', '').split(',') if part.strip().isdigit()}
+            exclude_ids |= recently_seen_post_ids(request.user.id)
 
             # Initialize GNN manager if not already done
             if not gnn_manager.models_loaded:
@@ -810,72 +970,41 @@ class RecommendationsView(APIView):
                         'total_found': len(gnn_recommendations)
                     })
 
-            # Fallback to traditional embedding-based recommendations
-            try:
-                user_embedding = UserEmbedding.objects.get(
-                    user=request.user,
-                    model_name=model_name
-                )
-            except UserEmbedding.DoesNotExist:
-                # If no embeddings, use GNN fallback
-                gnn_recommendations = gnn_manager.get_post_recommendations_gnn(
-                    user_id=request.user.id,
-                    num_recommendations=limit,
-                    method='fallback'
-                )
-
-                return Response({
-                    'message': 'No interest profile found. Using basic recommendations.',
-                    'recommendations': gnn_recommendations,
-                    'method_used': 'fallback',
-                    'gnn_status': {
-                        'available': gnn_manager.pytorch_available,
-                        'models_loaded': gnn_manager.models_loaded
-                    },
-                    'fallback': 'basic_similarity'
-                })
-
-            # Get all post embeddings for the same model
-            post_embeddings = PostEmbedding.objects.filter(
-                model_name=model_name
-            ).select_related('post').exclude(
-                post__author=request.user  # Exclude user's own posts
+            # Two-stage pipeline: candidates (interest vector, fresh posts in favorite
+            # categories, popular posts) re-ranked together; only the winners are loaded
+            ranked, pipeline_stats = recommend(
+                request.user.id, limit=limit, model_name=model_name, exclude_post_ids=exclude_ids,
+                diversity=diversity
             )
+            posts = Post.objects.prefetch_related(
+                'primary_category',
+                'additional_categories',
+                'tags'
+            ).select_related('author').in_bulk([item['post_id'] for item in ranked])
+
+            recommendations = [
+                {
+                    'post': PostSerializer(posts[item['post_id']]).data,
+                    'similarity_score': item['similarity'],
+                    'score': item['score'],
+                    'model_name': model_name,
+                    'reason': SOURCE_REASONS[item['sources'][0]],
+                    'sources': item['sources']
+                }
+                for item in ranked if item['post_id'] in posts
+            ]
 
-            # Calculate similarities
-            recommendations = []
-            user_vector = np.array(user_embedding.interest_vector)
-
-            for post_embed in post_embeddings:
-                post_vector = np.array(post_embed.embedding_vector)
-
-                # Calculate cosine similarity
-                dot_product = np.dot(user_vector, post_vector)
-                user_norm = np.linalg.norm(user_vector)
-                post_norm = np.linalg.norm(post_vector)
-
-                if user_norm > 0 and post_norm > 0:
-                    similarity = dot_product / (user_norm * post_norm)
-
-                    recommendations.append({
-                        'post': PostSerializer(post_embed.post).data,
-                        'similarity_score': float(similarity),
-                        'model_name': model_name,
-                        'reason': 'Embedding similarity'
-                    })
-
-            # Sort by similarity and limit results
-            recommendations.sort(key=lambda x: x['similarity_score'], reverse=True)
-            recommendations = recommendations[:limit]
+            user_embedding = UserEmbedding.objects.filter(user=request.user).first()
 
             return Response({
                 'recommendations': recommendations,
-                'method_used': 'embedding_similarity',
+                'method_used': 'two_stage',
+                'pipeline': pipeline_stats,
                 'user_profile': {
                     'activity_count': user_embedding.activity_count,
                     'last_updated': user_embedding.updated_at,
                     'vector_dimension': user_embedding.vector_dimension
-                },
+                } if user_embedding else None,
                 'gnn_status': {
                     'available': gnn_manager.pytorch_available,
                     'models_loaded': gnn_manager.models_loaded
@@ -883,7 +1012,8 @@ class RecommendationsView(APIView):
                 'search_params': {
                     'limit': limit,
                     'model_name': model_name,
-                    'method': method
+                    'method': method,
+                    'diversity': diversity
                 },
                 'total_found': len(recommendations)
             })
@@ -900,6 +1030,42 @@ class RecommendationsView(APIView):
             )
 
 
+class EventIngestView(APIView):
+    """
+    Batch endpoint for interaction events sent by the frontend
+    Events are only queued in the in-process buffer (api.events) and written
+    in bulk in the background - no database write happens in this request.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        """
+        POST body:
+        {
+            "events": [
+                {"type": "similar_click", "post_id": 12, "context_post_id": 5,
+                 "source": "post_detail", "ts": 1700000000000}
+            ]
+        }
+        """
+        from .events import parse_client_events, record_event, request_identity, MAX_EVENTS_PER_BATCH
+
+        raw_events = request.data.get('events') if isinstance(request.data, dict) else None
+        if not isinstance(raw_events, list):
+            return Response({'error': 'Expected {"events": [...]}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        events, rejected = parse_client_events(raw_events)
+        user_id, session_key = request_identity(request)
+        for event in events:
+            record_event(user_id=user_id, session_key=session_key, **event)
+
+        return Response({
+            'accepted': len(events),
+            'rejected': rejected,
+            'max_batch': MAX_EVENTS_PER_BATCH
+        }, status=status.HTTP_202_ACCEPTED)
+
+
 class EmbeddingStatsView(APIView):
     """
     Get statistics about embeddings and AI processing
@@ -1120,6 +1286,7 @@ class SemanticCategoryNetworkView(APIView):
     Much more accurate than simple tag-based connections
     """
     permission_classes = [AllowAny]
+    renderer_classes = VIZ_RENDERER_CLASSES  # ?format=columnar
 
     def get(self, request):
         """
@@ -1127,86 +1294,65 @@ class SemanticCategoryNetworkView(APIView):
         """
         try:
             from django.db.models import Count
-            from ai_models.models import PostEmbedding
-            from collections import defaultdict
+            from gnn_models.centroids import (
+                ensure_fresh_centroids, load_centroid_matrix, centroid_similarities
+            )
             import numpy as np
 
             # Get query parameters
             similarity_threshold = float(request.GET.get('threshold', 0.6))
             min_posts_per_category = int(request.GET.get('min_posts', 3))
+            rollup = request.GET.get('rollup', 'false').lower() == 'true'
 
-            # Get categories with enough posts and embeddings
-            categories = Category.objects.annotate(
-                post_count=Count('post', distinct=True)
-            ).filter(
-                post_count__gte=min_posts_per_category
-            )
+            # Stored centroids (mean post embedding per category), refreshed only where stale
+            ensure_fresh_centroids()
+            centroid_ids, centroids, embedded_counts = load_centroid_matrix(rollup=rollup)
 
-            if len(categories) < 2:
+            # Categories with enough embedded posts
+            selected_rows = np.flatnonzero(embedded_counts >= min_posts_per_category)
+
+            if len(selected_rows) < 2:
                 return Response({
                     'nodes': [],
                     'edges': [],
                     'stats': {'message': 'Not enough categories with embeddings for semantic analysis'}
                 })
 
+            selected_ids = [centroid_ids[row] for row in selected_rows]
+            categories = {
+                category.id: category
+                for category in Category.objects.filter(id__in=selected_ids).annotate(
+                    post_count=Count('post', distinct=True)
+                )
+            }
+
             # Create nodes
             nodes = []
-            category_embeddings = {}
-
-            for category in categories:
-                # Get all embeddings for posts in this category
-                embeddings = PostEmbedding.objects.filter(
-                    post__primary_category=category
-                ).select_related('post')
-
-                if embeddings.count() < min_posts_per_category:
+            for row, category_id in zip(selected_rows, selected_ids):
+                category = categories.get(category_id)
+                if category is None:
                     continue
+                nodes.append({
+                    'id': category.id,
+                    'label': category.name,
+                    'title': f"{category.name}\\n{category.description}\\nPosts: {category.post_count}\\nSemantic center of {embedded_counts[row]} posts",
+                    'value': category.post_count,
+                    'group': 'semantic_category'
+                })
 
-                # Calculate category's average embedding
-                embedding_vectors = []
-                for emb in embeddings:
-                    embedding_vectors.append(np.array(emb.embedding_vector, dtype=np.float32))
-
-                if embedding_vectors:
-                    # Average embedding represents category's semantic center
-                    avg_embedding = np.mean(embedding_vectors, axis=0)
-                    category_embeddings[category.id] = avg_embedding
-
-                    nodes.append({
-                        'id': category.id,
-                        'label': category.name,
-                        'title': f"{category.name}\\n{category.description}\\nPosts: {category.post_count}\\nSemantic center of {len(embedding_vectors)} posts",
-                        'value': category.post_count,
-                        'group': 'semantic_category'
-                    })
-
-            # Create semantic edges based on embedding similarity
+            # Create semantic edges - all pairwise cosines in one matrix product
             edges = []
-            edge_weights = defaultdict(float)
-
-            categories_list = list(category_embeddings.keys())
-            for i, cat1_id in enumerate(categories_list):
-                for cat2_id in categories_list[i+1:]:
-                    # Calculate cosine similarity between category embeddings
-                    emb1 = category_embeddings[cat1_id]
-                    emb2 = category_embeddings[cat2_id]
-
-                    # Cosine similarity
-                    dot_product = np.dot(emb1, emb2)
-                    norm_product = np.linalg.norm(emb1) * np.linalg.norm(emb2)
-                    similarity = float(dot_product / norm_product) if norm_product > 0 else 0.0
-
-                    if similarity >= similarity_threshold:
-                        edges.append({
-                            'from': cat1_id,
-                            'to': cat2_id,
-                            'value': similarity,
-                            'title': f"Semantic similarity: {similarity:.3f}",
-                            'width': min(similarity * 10, 8),  # Scale for visualization
-                            'color': {
-                                'color': '#2ecc71' if similarity > 0.8 else '#3498db' if similarity > 0.7 else '#95a5a6'
-                            }
-                        })
+            for row_a, row_b, similarity in centroid_similarities(centroids[selected_rows], similarity_threshold):
+                edges.append({
+                    'from': selected_ids[row_a],
+                    'to': selected_ids[row_b],
+                    'value': similarity,
+                    'title': f"Semantic similarity: {similarity:.3f}",
+                    'width': min(similarity * 10, 8),  # Scale for visualization
+                    'color': {
+                        'color': '#2ecc71' if similarity > 0.8 else '#3498db' if similarity > 0.7 else '#95a5a6'
+                    }
+                })
 
             return Response({
                 'nodes': nodes,
@@ -1216,6 +1362,7 @@ class SemanticCategoryNetworkView(APIView):
                     'semantic_connections': len(edges),
                     'similarity_threshold': similarity_threshold,
                     'min_posts_per_category': min_posts_per_category,
+                    'rollup': rollup,
                     'avg_similarity': np.mean([edge['value'] for edge in edges]) if edges else 0,
                     'method': 'semantic_embeddings'
                 }
@@ -1251,7 +1398,7 @@ class AutoCategorizationView(APIView):
         }
         """
         try:
-            from gnn_models.auto_categorization import auto_categorization_engine
+            from gnn_models.auto_categorization import auto_categorization_engine, MAX_REQUEST_POSTS
 
             data = request.data
             action = data.get('action', 'suggest')
@@ -1305,8 +1452,17 @@ class AutoCategorizationView(APIView):
                 })
 
             elif action == 'batch':
-                # Batch auto-categorization
+                # Batch auto-categorization of an explicit post list - the whole corpus is left
+                # to the auto_categorize management command
                 post_ids = data.get('post_ids')
+                if not post_ids or not isinstance(post_ids, list):
+                    return Response({
+                        'error': 'post_ids list required for batch'
+                    }, status=400)
+                if len(post_ids) > MAX_REQUEST_POSTS:
+                    return Response({
+                        'error': f'At most {MAX_REQUEST_POSTS} post_ids per batch request'
+                    }, status=400)
                 threshold = float(data.get('similarity_threshold', 0.75))
                 dry_run = data.get('dry_run', True)
 
@@ -1373,6 +1529,7 @@ class UnifiedCategoryNetworkView(APIView):
     Konfigurowalny 50/50 balans między podejściami
     """
     permission_classes = [AllowAny]
+    renderer_classes = VIZ_RENDERER_CLASSES  # ?format=columnar
 
     def get(self, request):
         """
@@ -1389,6 +1546,7 @@ class UnifiedCategoryNetworkView(APIView):
         - include_posts: true/false - czy dodać post nodes (default: false)
         - focus_post_id: ID posta do focus (opcjonalne)
         - max_posts: max liczba post nodes (default: 20)
+        - rollup: true/false - liczyć posty z podkategorii jako posty rodzica (default: false)
         """
         try:
             # === 🔧 PARAMETRY KONFIGURACJI ===
@@ -1399,6 +1557,7 @@ class UnifiedCategoryNetworkView(APIView):
             ai_weight = float(request.GET.get('ai_weight', 0.5))
             min_posts = int(request.GET.get('min_posts', 2))
             similarity_threshold = float(request.GET.get('similarity_threshold', 0.4))
+            rollup = request.GET.get('rollup', 'false').lower() == 'true'
 
             # === 📄 POST NODES PARAMETRY ===
             include_posts = request.GET.get('include_posts', 'false').lower() == 'true'
@@ -1409,8 +1568,6 @@ class UnifiedCategoryNetworkView(APIView):
                        f"weights=({shared_weight}/{ai_weight}), threshold={similarity_threshold}")
 
             from django.db.models import Count, Q
-            from collections import defaultdict
-            from gnn_models.integration import gnn_manager
             import numpy as np
 
             # === 📂 KROK 1: WYBÓR KATEGORII ===
@@ -1494,7 +1651,7 @@ class UnifiedCategoryNetworkView(APIView):
             logger.info(f"📊 Znaleziono {len(categories)} kategorii do analizy")
 
             # === 🎨 KROK 2: TWORZENIE WĘZŁÓW ===
-            nodes = []
+            graph = GraphBuilder()
             category_ids = []
 
             # Color palette for root categories (same as unified view)
@@ -1536,52 +1693,43 @@ class UnifiedCategoryNetworkView(APIView):
                     else:
                         node_type = 'connected'
 
-                nodes.append({
-                    'id': category.id,
-                    'label': category.name,
-                    'title': (f"📍 {category.get_full_path()}\n"
-                             f"📊 Level: {category.level}\n"
-                             f"📄 Posts: {category.post_count}\n"
-                             f"📝 {category.description or 'Bez opisu'}\n"
-                             f"{'💙 Ulubiona kategoria' if personalized and category.id in favorite_category_ids else '🔗 Powiązana kategoria' if personalized and favorite_category_ids else ''}\n"
-                             f"{'🔽 Dwuklik = rozwiń' if has_subcategories else ''}"),
-                    'value': category.post_count,  # Rozmiar = liczba postów
-                    'level': category.level,
-                    'parent_id': category.parent_id,
-                    'has_subcategories': has_subcategories,
-                    'full_path': category.get_full_path(),
-                    'color': {
+                added = graph.add_node(
+                    category.id,
+                    kind='category',
+                    label=category.name,
+                    title=(f"📍 {category.get_full_path()}\n"
+                           f"📊 Level: {category.level}\n"
+                           f"📄 Posts: {category.post_count}\n"
+                           f"📝 {category.description or 'Bez opisu'}\n"
+                           f"{'💙 Ulubiona kategoria' if personalized and category.id in favorite_category_ids else '🔗 Powiązana kategoria' if personalized and favorite_category_ids else ''}\n"
+                           f"{'🔽 Dwuklik = rozwiń' if has_subcategories else ''}"),
+                    value=category.post_count,  # Rozmiar = liczba postów
+                    level=category.level,
+                    parent_id=category.parent_id,
+                    has_subcategories=has_subcategories,
+                    full_path=category.get_full_path(),
+                    color={
                         'background': color,
                         'border': '#2c3e50',
                         'highlight': {'background': '#e74c3c', 'border': '#c0392b'}
                     },
-                    'font': {'size': 14 + (2 if level == 0 else 0)},
-                    'group': node_type,
-                    'node_type': node_type  # Metadata dla frontend
-                })
-                category_ids.append(category.id)
+                    font={'size': 14 + (2 if level == 0 else 0)},
+                    group=node_type,
+                    node_type=node_type  # Metadata dla frontend
+                )
+                if added:
+                    category_ids.append(category.id)
 
             # === 📊 KROK 3: KALKULACJA WSPÓLNYCH POSTÓW ===
             logger.info("📊 Obliczam połączenia wspólnych postów...")
 
-            edge_weights_shared = defaultdict(int)
-            posts = Post.objects.prefetch_related('primary_category', 'additional_categories').all()
-
-            for post in posts:
-                # 🔍 Zbieramy kategorie tego posta
-                post_categories = []
-                if post.primary_category and post.primary_category.id in category_ids:
-                    post_categories.append(post.primary_category.id)
-
-                for add_cat in post.additional_categories.all():
-                    if add_cat.id in category_ids:
-                        post_categories.append(add_cat.id)
-
-                # 🔗 Połączenia między wszystkimi parami
-                for i, cat1 in enumerate(post_categories):
-                    for cat2 in post_categories[i+1:]:
-                        edge_key = tuple(sorted([cat1, cat2]))  # Sortujemy = bez duplikatów
-                        edge_weights_shared[edge_key] += 1
+            # 🗄️ Pary liczone w SQL (self-join post_id x kategoria), wynik z cache
+            edge_weights_shared = {
+                (cat1, cat2): shared_count
+                for cat1, cat2, shared_count in category_cooccurrence(
+                    category_ids, rollup_level=level if rollup else None
+                )
+            }
 
             logger.info(f"📊 Znaleziono {len(edge_weights_shared)} połączeń wspólnych postów")
 
@@ -1590,39 +1738,30 @@ class UnifiedCategoryNetworkView(APIView):
 
             edge_weights_ai = {}
 
-            # 🤖 Sprawdzamy dostępność AI
-            if gnn_manager and gnn_manager.embedding_manager and gnn_manager.embedding_manager.available:
-                logger.info("🤖 AI embeddings dostępne!")
+            # 🗄️ Zapisane embeddingi tekstu kategorii - jedno zapytanie, bez modelu
+            from gnn_models.category_text_embeddings import load_text_embedding_matrix
+            embedded_ids, category_vectors = load_text_embedding_matrix(category_ids)
+            ai_available = len(embedded_ids) > 0
 
-                # 📊 Generujemy embeddingi kategorii
-                category_embeddings = {}
-                for category in categories:
-                    embedding = gnn_manager.generate_category_embedding(category.id)
-                    if embedding is not None:
-                        category_embeddings[category.id] = embedding
-
-                # 🧮 Similarity między wszystkimi parami
-                for i, cat1_id in enumerate(category_ids):
-                    for cat2_id in category_ids[i+1:]:
-                        if cat1_id in category_embeddings and cat2_id in category_embeddings:
-                            similarity = gnn_manager.calculate_semantic_similarity(
-                                category_embeddings[cat1_id],
-                                category_embeddings[cat2_id]
-                            )
-
-                            # ✅ Tylko powyżej progu
-                            if similarity >= similarity_threshold:
-                                edge_key = tuple(sorted([cat1_id, cat2_id]))
-                                edge_weights_ai[edge_key] = similarity
+            if len(embedded_ids) >= 2:
+                # 🧮 Cosine similarity wszystkich par jednym mnożeniem macierzy
+                similarities = category_vectors @ category_vectors.T
+                rows_a, rows_b = np.triu_indices(len(embedded_ids), k=1)
+                pair_similarities = similarities[rows_a, rows_b]
+
+                # ✅ Tylko powyżej progu
+                keep = pair_similarities >= similarity_threshold
+                for row_a, row_b, similarity in zip(rows_a[keep], rows_b[keep], pair_similarities[keep]):
+                    edge_key = tuple(sorted([embedded_ids[row_a], embedded_ids[row_b]]))
+                    edge_weights_ai[edge_key] = float(similarity)
 
                 logger.info(f"🧠 Znaleziono {len(edge_weights_ai)} AI połączeń")
             else:
-                logger.warning("⚠️ AI embeddings niedostępne - tylko wspólne posty")
+                logger.warning("⚠️ Brak zapisanych embeddingów kategorii (uruchom embed_categories) - tylko wspólne posty")
 
             # === ⚡ KROK 5: HYBRYDOWE ŁĄCZENIE ===
             logger.info("⚡ Łączę shared posts + AI semantic...")
 
-            edges = []
             final_connections = {}
 
             # 📐 Normalizacja wspólnych postów (0-1)
@@ -1647,42 +1786,46 @@ class UnifiedCategoryNetworkView(APIView):
                 if hybrid_strength > 0.1:
                     shared_count = edge_weights_shared.get(edge_key, 0)
 
-                    edges.append({
-                        'from': cat1_id,
-                        'to': cat2_id,
-                        'value': hybrid_strength,
-                        'width': min(hybrid_strength * 8, 12),
-                        'title': (f"🔗 Hybrydowa siła: {hybrid_strength:.2f}\n"
-                                 f"📊 Wspólne posty: {shared_count} (waga: {shared_normalized:.2f})\n"
-                                 f"🧠 AI similarity: {ai_similarity:.2f}\n"
-                                 f"📐 Formuła: ({shared_normalized:.2f} × {shared_weight}) + ({ai_similarity:.2f} × {ai_weight})"),
-                        'color': {
+                    added = graph.add_edge(
+                        cat1_id, cat2_id,
+                        value=hybrid_strength,
+                        width=min(hybrid_strength * 8, 12),
+                        title=(f"🔗 Hybrydowa siła: {hybrid_strength:.2f}\n"
+                               f"📊 Wspólne posty: {shared_count} (waga: {shared_normalized:.2f})\n"
+                               f"🧠 AI similarity: {ai_similarity:.2f}\n"
+                               f"📐 Formuła: ({shared_normalized:.2f} × {shared_weight}) + ({ai_similarity:.2f} × {ai_weight})"),
+                        color={
                             'color': '#95a5a6' if hybrid_strength < 0.5 else '#3498db',
                             'highlight': '#e74c3c'
                         },
-                        'smooth': {'type': 'continuous'},
+                        smooth={'type': 'continuous'},
                         # 🔧 Metadata debugowania
-                        'shared_posts': shared_count,
-                        'ai_similarity': ai_similarity,
-                        'hybrid_strength': hybrid_strength
-                    })
+                        shared_posts=shared_count,
+                        ai_similarity=ai_similarity,
+                        hybrid_strength=hybrid_strength
+                    )
 
-                    final_connections[edge_key] = hybrid_strength
+                    if added:
+                        final_connections[edge_key] = hybrid_strength
 
             # 📈 Sortowanie: najsilniejsze pierwsze
-            edges.sort(key=lambda x: x['value'], reverse=True)
+            graph.sort_edges(key=lambda edge: edge['value'], reverse=True)
+            category_connections = graph.edge_count()
 
-            logger.info(f"⚡ Wygenerowano {len(edges)} hybrydowych połączeń")
+            logger.info(f"⚡ Wygenerowano {category_connections} hybrydowych połączeń")
 
             # === 📄 KROK 6: POST NODES (jeśli włączone) ===
-            post_nodes = []
-            post_edges = []
 
             if include_posts:
                 logger.info(f"🔄 Adding post nodes to unified network...")
 
+                from gnn_models.centroids import DEFAULT_MODEL_NAME
+                from gnn_models.vector_index import get_post_vector_index
+
                 # Determine which posts to include
                 posts_query = Post.objects.select_related('primary_category', 'author')
+                # Stored post embeddings - similar posts never invoke the transformer model
+                post_index = get_post_vector_index(DEFAULT_MODEL_NAME)
 
                 if focus_post_id:
                     # Focus on specific post + similar posts
@@ -1690,20 +1833,21 @@ class UnifiedCategoryNetworkView(APIView):
                         focus_post = Post.objects.get(id=focus_post_id)
                         focus_posts = [focus_post]
 
-                        # Add similar posts if embeddings available
-                        if gnn_manager and gnn_manager.embedding_manager and gnn_manager.embedding_manager.available:
-                            try:
-                                similar_post_data = gnn_manager.find_similar_posts_by_embedding(
-                                    post_id=focus_post.id,
-                                    top_k=max_posts-1,
-                                    threshold=similarity_threshold
-                                )
-                                if similar_post_data:
-                                    similar_post_ids = [pid for pid, score in similar_post_data]
+                        # Add similar posts from the stored post embeddings (no model call)
+                        try:
+                            focus_vector = post_index.vector(focus_post.id)
+                            if focus_vector is not None:
+                                similar_post_ids = [
+                                    pid for pid, score in post_index.top_k(
+                                        focus_vector, max_posts - 1, exclude_post_ids=[focus_post.id]
+                                    )
+                                    if score >= similarity_threshold
+                                ]
+                                if similar_post_ids:
                                     similar_posts = Post.objects.filter(id__in=similar_post_ids)
                                     focus_posts.extend(similar_posts)
-                            except Exception as e:
-                                logger.warning(f"Similarity search failed: {e}")
+                        except Exception as e:
+                            logger.warning(f"Similarity search failed: {e}")
 
                         posts_query = Post.objects.filter(id__in=[p.id for p in focus_posts])
                     except Post.DoesNotExist:
@@ -1720,111 +1864,108 @@ class UnifiedCategoryNetworkView(APIView):
                 for post in posts:
                     is_focus = focus_post_id and str(post.id) == str(focus_post_id)
 
-                    post_nodes.append({
-                        'id': f'post_{post.id}',
-                        'label': post.title[:40] + ('...' if len(post.title) > 40 else ''),
-                        'type': 'post',
-                        'post_id': post.id,
-                        'category_id': post.primary_category_id,  # 🎯 Category ID for circular layout
-                        'title': f'📄 {post.title}\n👤 {post.author.username}\n📅 {post.created_at.strftime("%Y-%m-%d")}\n📂 {post.primary_category.name if post.primary_category else "No category"}',
-                        'shape': 'box',
-                        'size': 25 if is_focus else 18,
-                        'color': {
+                    graph.add_node(
+                        f'post_{post.id}',
+                        kind='post',
+                        label=post.title[:40] + ('...' if len(post.title) > 40 else ''),
+                        type='post',
+                        post_id=post.id,
+                        category_id=post.primary_category_id,  # 🎯 Category ID for circular layout
+                        title=f'📄 {post.title}\n👤 {post.author.username}\n📅 {post.created_at.strftime("%Y-%m-%d")}\n📂 {post.primary_category.name if post.primary_category else "No category"}',
+                        shape='box',
+                        size=25 if is_focus else 18,
+                        color={
                             'background': '#e74c3c' if is_focus else '#e67e22',
                             'border': '#c0392b' if is_focus else '#d35400'
                         },
-                        'font': {'size': 12, 'color': 'white'},
-                        'physics': True,
-                        'is_focus': is_focus,
-                        'level': 999  # Special level for posts
-                    })
-
-                # Create post-category connections
-                category_id_map = {cat.id: f'category_{cat.id}' for cat in categories}
+                        font={'size': 12, 'color': 'white'},
+                        physics=True,
+                        is_focus=is_focus,
+                        level=999  # Special level for posts
+                    )
 
+                # Create post-category connections (category nodes use the plain category id)
                 for post in posts:
                     post_node_id = f'post_{post.id}'
 
                     # Primary category connection
-                    if post.primary_category and post.primary_category.id in category_id_map:
-                        cat_node_id = category_id_map[post.primary_category.id]
-                        post_edges.append({
-                            'id': f'post_{post.id}_to_cat_{post.primary_category.id}',
-                            'from': post_node_id,
-                            'to': cat_node_id,
-                            'title': 'Primary category',
-                            'color': {'color': '#95a5a6'},
-                            'width': 2,
-                            'dashes': [5, 5],  # Dashed line
-                            'smooth': {'type': 'continuous'}
-                        })
+                    if post.primary_category_id:
+                        graph.add_edge(
+                            post_node_id, post.primary_category_id,
+                            id=f'post_{post.id}_to_cat_{post.primary_category_id}',
+                            title='Primary category',
+                            color={'color': '#95a5a6'},
+                            width=2,
+                            dashes=[5, 5],  # Dashed line
+                            smooth={'type': 'continuous'}
+                        )
 
                     # Additional categories connections
                     for additional_cat in post.additional_categories.all():
-                        if additional_cat.id in category_id_map:
-                            cat_node_id = category_id_map[additional_cat.id]
-                            post_edges.append({
-                                'id': f'post_{post.id}_to_cat_{additional_cat.id}',
-                                'from': post_node_id,
-                                'to': cat_node_id,
-                                'title': 'Additional category',
-                                'color': {'color': '#bdc3c7'},
-                                'width': 1,
-                                'dashes': [3, 3],  # Lighter dashed line
-                                'smooth': {'type': 'continuous'}
-                            })
+                        graph.add_edge(
+                            post_node_id, additional_cat.id,
+                            id=f'post_{post.id}_to_cat_{additional_cat.id}',
+                            title='Additional category',
+                            color={'color': '#bdc3c7'},
+                            width=1,
+                            dashes=[3, 3],  # Lighter dashed line
+                            smooth={'type': 'continuous'}
+                        )
 
                 # Create post-post similarity connections
-                if gnn_manager and gnn_manager.embedding_manager and gnn_manager.embedding_manager.available:
+                # 🧮 Stored vectors of the visible posts - one block product, no model call
+                embedded_posts = [
+                    post for post in posts
+                    if post.id in post_index.position and post_index.valid[post_index.position[post.id]]
+                ]
+                if len(embedded_posts) >= 2:
                     try:
-                        post_pairs_checked = set()
                         similarity_connections = 0
                         max_similarity_connections = 50  # Limit total similarity edges
 
-                        for post in posts:
+                        post_vectors = post_index.matrix[[post_index.position[post.id] for post in embedded_posts]]
+                        post_similarities = post_vectors @ post_vectors.T
+                        np.fill_diagonal(post_similarities, -np.inf)
+
+                        for row, post in enumerate(embedded_posts):
                             if similarity_connections >= max_similarity_connections:
                                 break
 
                             try:
-                                similar_post_data = gnn_manager.find_similar_posts_by_embedding(
-                                    post_id=post.id,
-                                    top_k=5,  # Max 5 similar posts per post
-                                    threshold=similarity_threshold
-                                )
+                                # Max 5 similar posts per post, above the threshold
+                                nearest = np.argsort(-post_similarities[row], kind='stable')[:5]
+                                similar_post_data = [
+                                    (embedded_posts[other].id, float(post_similarities[row, other]))
+                                    for other in nearest
+                                    if post_similarities[row, other] >= similarity_threshold
+                                ]
 
                                 if similar_post_data:
                                     for similar_post_id, similarity_score in similar_post_data:
-                                        # Check if both posts are in our nodes
-                                        if any(p.id == similar_post_id for p in posts):
-                                            # Avoid duplicate edges
-                                            pair_key = tuple(sorted([post.id, similar_post_id]))
-                                            if pair_key not in post_pairs_checked:
-                                                post_pairs_checked.add(pair_key)
-                                                similarity_connections += 1
-
-                                                # Color based on similarity strength
-                                                if similarity_score > 0.9:
-                                                    color = '#2ecc71'  # Strong green
-                                                    width = 4
-                                                elif similarity_score > 0.8:
-                                                    color = '#3498db'  # Blue
-                                                    width = 3
-                                                else:
-                                                    color = '#95a5a6'  # Gray
-                                                    width = 2
-
-                                                post_edges.append({
-                                                    'id': f'similarity_{post.id}_{similar_post_id}',
-                                                    'from': f'post_{post.id}',
-                                                    'to': f'post_{similar_post_id}',
-                                                    'title': f'Semantic similarity: {similarity_score:.3f}',
-                                                    'color': {'color': color},
-                                                    'width': width,
-                                                    'smooth': {'type': 'continuous'}
-                                                })
-
-                                                if similarity_connections >= max_similarity_connections:
-                                                    break
+                                        # Color based on similarity strength
+                                        if similarity_score > 0.9:
+                                            color = '#2ecc71'  # Strong green
+                                            width = 4
+                                        elif similarity_score > 0.8:
+                                            color = '#3498db'  # Blue
+                                            width = 3
+                                        else:
+                                            color = '#95a5a6'  # Gray
+                                            width = 2
+
+                                        # Both posts must be nodes; duplicates are skipped by the builder
+                                        if graph.add_edge(
+                                            f'post_{post.id}', f'post_{similar_post_id}',
+                                            id=f'similarity_{post.id}_{similar_post_id}',
+                                            title=f'Semantic similarity: {similarity_score:.3f}',
+                                            color={'color': color},
+                                            width=width,
+                                            smooth={'type': 'continuous'}
+                                        ):
+                                            similarity_connections += 1
+
+                                        if similarity_connections >= max_similarity_connections:
+                                            break
                             except Exception as e:
                                 logger.warning(f"Failed to get similarities for post {post.id}: {e}")
 
@@ -1833,23 +1974,19 @@ class UnifiedCategoryNetworkView(APIView):
                     except Exception as e:
                         logger.warning(f"Post similarity connections failed: {e}")
 
-                logger.info(f"📄 Added {len(post_nodes)} post nodes and {len(post_edges)} post edges")
-
-            # Combine category and post nodes/edges
-            all_nodes = nodes + post_nodes
-            all_edges = edges + post_edges
+                logger.info(f"📄 Added {graph.node_count('post')} post nodes and "
+                            f"{graph.edge_count() - category_connections} post edges")
 
             # === 📤 KROK 7: ODPOWIEDŹ ===
             return Response({
-                'nodes': all_nodes,
-                'edges': all_edges,
+                **graph.to_vis(),
                 'stats': {
-                    'total_nodes': len(all_nodes),
-                    'total_edges': len(all_edges),
-                    'category_nodes': len(nodes),
-                    'post_nodes': len(post_nodes),
-                    'category_connections': len(edges),
-                    'post_connections': len(post_edges),
+                    'total_nodes': graph.node_count(),
+                    'total_edges': graph.edge_count(),
+                    'category_nodes': graph.node_count('category'),
+                    'post_nodes': graph.node_count('post'),
+                    'category_connections': category_connections,
+                    'post_connections': graph.edge_count() - category_connections,
                     'level': level,
                     'parent_id': parent_id,
                     'personalized': personalized,
@@ -1869,7 +2006,7 @@ class UnifiedCategoryNetworkView(APIView):
                         'hybrid_connections': len(final_connections)
                     },
                     'strongest_connection': max(final_connections.values()) if final_connections else 0,
-                    'ai_available': bool(gnn_manager and gnn_manager.embedding_manager and gnn_manager.embedding_manager.available)
+                    'ai_available': ai_available
                 }
             })
 
@@ -1897,6 +2034,26 @@ class PostNetworkView(APIView):
     4. 🎯 Focus na specific post + jego connections
     """
     permission_classes = [AllowAny]
+    renderer_classes = VIZ_RENDERER_CLASSES  # ?format=columnar
+
+    # build_network() defaults - also the API defaults of get()
+    DEFAULT_PARAMETERS = {
+        'focus_post_id': None,
+        'category_id': None,
+        'include_posts': True,
+        'similarity_threshold': 0.7,
+        'max_posts': 20,
+        'max_connections': 5,
+        'method': 'fallback',
+        'personalized': False,
+        'layout_mode': 'precomputed',
+    }
+
+    # Parameter sets prebuilt by `warm_viz_caches` (API defaults and the unified view of the frontend)
+    WARM_PARAMETER_SETS = [
+        {},
+        {'max_posts': 200},
+    ]
 
     def get(self, request):
         """
@@ -1909,630 +2066,766 @@ class PostNetworkView(APIView):
         - similarity_threshold: próg similarity dla connections (default: 0.7)
         - max_posts: max liczba post nodes (default: 20)
         - max_connections: max connections per post (default: 5)
+        - layout: precomputed/physics - stored x/y with physics off, or vis.js physics (default: precomputed)
+        - collapse: clusters - 🫧 Louvain communities zamiast wszystkich postów (expand=<ids> rozwija)
+        - since: version token poprzedniej odpowiedzi - 🔄 zwraca tylko delta (added/removed nodes i edges)
         """
         try:
-            from django.core.cache import cache
-            import hashlib
+            from .graph_delta import versioned_graph_response
+
+            if request.GET.get('collapse') == 'clusters':
+                return self.collapsed_response(request.GET.get('expand'))
 
             # === 🔧 PARAMETRY ===
-            focus_post_id = request.GET.get('focus_post_id')
-            category_id = request.GET.get('category_id')
-            include_posts = request.GET.get('include_posts', 'true').lower() == 'true'
-            similarity_threshold = float(request.GET.get('similarity_threshold', 0.7))
-            max_posts = int(request.GET.get('max_posts', 20))
-            max_connections = int(request.GET.get('max_connections', 5))
-            method = request.GET.get('method', 'fallback')  # 🚀 OPTIMIZATION: 'gnn' or 'fallback'
-            personalized = request.GET.get('personalized', 'false').lower() == 'true'
+            params = {
+                'focus_post_id': request.GET.get('focus_post_id'),
+                'category_id': request.GET.get('category_id'),
+                'include_posts': request.GET.get('include_posts', 'true').lower() == 'true',
+                'similarity_threshold': float(request.GET.get('similarity_threshold', 0.7)),
+                'max_posts': int(request.GET.get('max_posts', 20)),
+                'max_connections': int(request.GET.get('max_connections', 5)),
+                'method': request.GET.get('method', 'fallback'),  # 🚀 OPTIMIZATION: 'gnn' or 'fallback'
+                'personalized': request.GET.get('personalized', 'false').lower() == 'true',
+                'layout_mode': request.GET.get('layout', 'precomputed'),
+            }
+            since = request.GET.get('since')
 
-            # === 🚀 CACHE KEY ===
-            # Generate cache key from parameters (skip if personalized - user-specific)
-            cache_key = None
-            if not personalized and not focus_post_id:  # Only cache non-personalized, non-focus views
-                cache_params = f"{category_id}:{include_posts}:{similarity_threshold}:{max_posts}:{max_connections}:{method}"
-                cache_hash = hashlib.md5(cache_params.encode()).hexdigest()
-                cache_key = f"post_network:{cache_hash}"
+            # Personalized and focus views are user/post specific - always built fresh
+            if params['personalized'] or params['focus_post_id']:
+                return Response(versioned_graph_response(self.build_network(user=request.user, **params), since))
 
-                # Try to get from cache
-                cached_response = cache.get(cache_key)
-                if cached_response:
-                    print(f"⚡ Cache HIT for post network: {cache_key}")
-                    logger.info(f"⚡ Cache HIT for post network: {cache_key}")
-                    cached_response['stats']['cached'] = True  # Mark as cached
-                    return Response(cached_response)
+            response_data, cache_state = self.get_cached_network(**params)
+            return Response(versioned_graph_response({
+                **response_data,
+                'stats': {
+                    **response_data['stats'],
+                    'cached': cache_state != 'built',
+                    'cache_state': cache_state,  # 🚀 fresh / stale (refreshing in background) / built
+                }
+            }, since))
 
-                print(f"💾 Cache MISS for post network: {cache_key}")
-                logger.info(f"💾 Cache MISS for post network: {cache_key}")
+        except Exception as e:
+            logger.error(f"💥 Post network generation failed: {e}")
+            import traceback
+            logger.error(traceback.format_exc())
 
-            logger.info(f"🎯 Post Network: focus={focus_post_id}, category={category_id}, "
-                       f"method={method}, threshold={similarity_threshold}, max_posts={max_posts}, personalized={personalized}")
+            return Response({
+                'error': 'Post network generation failed',
+                'details': str(e),
+                'nodes': [],
+                'edges': []
+            }, status=500)
 
-            from gnn_models.integration import gnn_manager
-            from django.db.models import Count, Q
+    def collapsed_response(self, expand):
+        """🫧 Community graph of posts (detect_communities) with selected communities expanded"""
+        from .communities import collapsed_network, parse_expand
 
-            nodes = []
-            edges = []
+        def member_nodes(post_ids):
+            return {
+                post_id: {
+                    'label': title[:30] + ('...' if len(title) > 30 else ''),
+                    'type': 'post',
+                    'post_id': post_id,
+                    'category_id': category_id,
+                    'title': f'📄 {title}',
+                    'shape': 'box',
+                }
+                for post_id, title, category_id in Post.objects.filter(id__in=post_ids).values_list(
+                    'id', 'title', 'primary_category_id'
+                )
+            }
 
-            # === 📂 KROK 1: CATEGORY NODES ===
-            # Get relevant categories
-            if category_id:
-                categories = Category.objects.filter(id=category_id)
-            elif focus_post_id:
-                # Get categories from focus post
-                focus_post = get_object_or_404(Post, id=focus_post_id)
-                category_ids = [focus_post.primary_category.id] if focus_post.primary_category else []
-                category_ids.extend(focus_post.additional_categories.values_list('id', flat=True))
-                categories = Category.objects.filter(id__in=category_ids)
-            else:
-                # 🎯 PERSONALIZED FILTER: Use favorite categories if personalized mode is enabled
-                if personalized and request.user.is_authenticated:
-                    try:
-                        user_profile = request.user.profile
-                        favorite_categories = user_profile.favorite_categories.all()
-                        if favorite_categories.exists():
-                            # Use only favorite categories
-                            categories = favorite_categories.annotate(
-                                post_count=Count('post', distinct=True) + Count('secondary_posts', distinct=True)
-                            ).filter(post_count__gte=1)
-                            logger.info(f"✅ Personalized mode: Using {categories.count()} favorite categories")
-                        else:
-                            # No favorites set, fall back to default
-                            categories = Category.objects.annotate(
-                                post_count=Count('post', distinct=True) + Count('secondary_posts', distinct=True)
-                            ).filter(post_count__gte=1).order_by('-post_count')[:20]
-                            logger.info(f"⚠️ No favorite categories found, using default top categories")
-                    except Exception as e:
-                        logger.warning(f"❌ Failed to get user favorites: {e}")
-                        # Fall back to default
+        data = collapsed_network('posts', parse_expand(expand), member_nodes, node_id=lambda post_id: f'post_{post_id}')
+        if data is None:
+            return Response({
+                'error': 'Communities not computed yet - run `python manage.py detect_communities`',
+                'nodes': [],
+                'edges': []
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
+    def get_cached_network(self, force=False, **params):
+        """
+        Cached build_network() result with stale-while-revalidate refresh
+
+        Args:
+            force: Rebuild now even if a fresh entry exists (cache warming)
+            **params: build_network() parameters (non-personalized, no focus post)
+
+        Returns:
+            (response_data, cache_state) - see api.viz_cache.cached_build
+        """
+        from .layout import get_layout_version
+        from .viz_cache import cached_build
+        import hashlib
+
+        params = {**self.DEFAULT_PARAMETERS, **params}
+        cache_params = (f"{params['category_id']}:{params['include_posts']}:{params['similarity_threshold']}:"
+                        f"{params['max_posts']}:{params['max_connections']}:{params['method']}:"
+                        f"{params['layout_mode']}:{get_layout_version()}")
+        cache_hash = hashlib.md5(cache_params.encode()).hexdigest()
+
+        return cached_build(
+            f"post_network:{cache_hash}",
+            lambda: self.build_network(**params),
+            name='post_network',
+            force=force,
+        )
+
+    def build_network(self, focus_post_id=None, category_id=None, include_posts=True, similarity_threshold=0.7,
+                      max_posts=20, max_connections=5, method='fallback', personalized=False,
+                      layout_mode='precomputed', user=None):
+        """
+        🚀 Buduje sieć postów i kategorii (parametry jak w get())
+
+        Args:
+            user: Request user - only needed for personalized=True
+
+        Returns:
+            vis.js response dict (nodes, edges, stats)
+        """
+        from .layout import get_layout_positions, apply_layout
+
+
+        logger.info(f"🎯 Post Network: focus={focus_post_id}, category={category_id}, "
+                   f"method={method}, threshold={similarity_threshold}, max_posts={max_posts}, personalized={personalized}")
+
+        from gnn_models.integration import gnn_manager
+        from django.db.models import Count, Q
+
+        graph = GraphBuilder(max_connections=max_connections)
+
+        # === 📂 KROK 1: CATEGORY NODES ===
+        # Get relevant categories
+        if category_id:
+            categories = Category.objects.filter(id=category_id)
+        elif focus_post_id:
+            # Get categories from focus post
+            focus_post = get_object_or_404(Post, id=focus_post_id)
+            category_ids = [focus_post.primary_category.id] if focus_post.primary_category else []
+            category_ids.extend(focus_post.additional_categories.values_list('id', flat=True))
+            categories = Category.objects.filter(id__in=category_ids)
+        else:
+            # 🎯 PERSONALIZED FILTER: Use favorite categories if personalized mode is enabled
+            if personalized and user is not None and user.is_authenticated:
+                try:
+                    user_profile = user.profile
+                    favorite_categories = user_profile.favorite_categories.all()
+                    if favorite_categories.exists():
+                        # Use only favorite categories
+                        categories = favorite_categories.annotate(
+                            post_count=Count('post', distinct=True) + Count('secondary_posts', distinct=True)
+                        ).filter(post_count__gte=1)
+                        logger.info(f"✅ Personalized mode: Using {categories.count()} favorite categories")
+                    else:
+                        # No favorites set, fall back to default
                         categories = Category.objects.annotate(
                             post_count=Count('post', distinct=True) + Count('secondary_posts', distinct=True)
                         ).filter(post_count__gte=1).order_by('-post_count')[:20]
-                else:
-                    # Get main categories with most posts (default behavior)
-                    # 🔧 FIX: Changed from post_count__gte=2 to post_count__gte=1 to show all categories with posts
+                        logger.info(f"⚠️ No favorite categories found, using default top categories")
+                except Exception as e:
+                    logger.warning(f"❌ Failed to get user favorites: {e}")
+                    # Fall back to default
                     categories = Category.objects.annotate(
                         post_count=Count('post', distinct=True) + Count('secondary_posts', distinct=True)
-                    ).filter(post_count__gte=1).order_by('-post_count')[:20]  # Increased from 10 to 20
-
-            # 🎯 ENSURE ALL L0 CATEGORIES ARE INCLUDED
-            # Main categories (L0) often have 0 direct posts but posts in subcategories
-            categories = list(categories)
-            category_ids = set(c.id for c in categories)
-
-            l0_categories = Category.objects.filter(parent__isnull=True)
-            l0_to_add = [c for c in l0_categories if c.id not in category_ids]
-            if l0_to_add:
-                categories.extend(l0_to_add)
-                category_ids.update(c.id for c in l0_to_add)
-                logger.info(f"🔵 Added {len(l0_to_add)} L0 categories for complete hierarchy")
-
-            # 🎯 ENSURE ALL PARENT CATEGORIES ARE INCLUDED (including intermediate L1)
-            # Add all parent categories to ensure proper circular layout grouping
-            parents_to_add = []
-            for category in list(categories):  # Use list() to avoid modifying during iteration
-                current = category.parent
-                while current and current.id not in category_ids:
-                    parents_to_add.append(current)
-                    category_ids.add(current.id)
-                    current = current.parent
-
-            if parents_to_add:
-                categories.extend(parents_to_add)
-                logger.info(f"🔗 Added {len(parents_to_add)} parent categories (including L1 intermediates) for proper hierarchy")
-
-            # Log category distribution by level
-            from collections import Counter
-            level_counts = Counter(cat.level for cat in categories)
-            logger.info(f"📊 Category distribution: {dict(level_counts)}")
-
-            # Color palette for categories - distinct, vibrant colors
-            category_colors = [
-                {'bg': '#3498db', 'border': '#2980b9'},  # Blue
-                {'bg': '#e74c3c', 'border': '#c0392b'},  # Red
-                {'bg': '#2ecc71', 'border': '#27ae60'},  # Green
-                {'bg': '#f39c12', 'border': '#e67e22'},  # Orange
-                {'bg': '#9b59b6', 'border': '#8e44ad'},  # Purple
-                {'bg': '#1abc9c', 'border': '#16a085'},  # Turquoise
-                {'bg': '#e91e63', 'border': '#c2185b'},  # Pink
-                {'bg': '#ff5722', 'border': '#e64a19'},  # Deep Orange
-                {'bg': '#00bcd4', 'border': '#0097a7'},  # Cyan
-                {'bg': '#8bc34a', 'border': '#689f38'},  # Light Green
-            ]
+                    ).filter(post_count__gte=1).order_by('-post_count')[:20]
+            else:
+                # Get main categories with most posts (default behavior)
+                # 🔧 FIX: Changed from post_count__gte=2 to post_count__gte=1 to show all categories with posts
+                categories = Category.objects.annotate(
+                    post_count=Count('post', distinct=True) + Count('secondary_posts', distinct=True)
+                ).filter(post_count__gte=1).order_by('-post_count')[:20]  # Increased from 10 to 20
+
+        # 🎯 ENSURE ALL L0 CATEGORIES ARE INCLUDED
+        # Main categories (L0) often have 0 direct posts but posts in subcategories
+        categories = list(categories)
+        category_ids = set(c.id for c in categories)
+
+        l0_categories = Category.objects.filter(parent__isnull=True)
+        l0_to_add = [c for c in l0_categories if c.id not in category_ids]
+        if l0_to_add:
+            categories.extend(l0_to_add)
+            category_ids.update(c.id for c in l0_to_add)
+            logger.info(f"🔵 Added {len(l0_to_add)} L0 categories for complete hierarchy")
+
+        # 🎯 ENSURE ALL PARENT CATEGORIES ARE INCLUDED (including intermediate L1)
+        # Add all parent categories to ensure proper circular layout grouping
+        parents_to_add = []
+        for category in list(categories):  # Use list() to avoid modifying during iteration
+            current = category.parent
+            while current and current.id not in category_ids:
+                parents_to_add.append(current)
+                category_ids.add(current.id)
+                current = current.parent
+
+        if parents_to_add:
+            categories.extend(parents_to_add)
+            logger.info(f"🔗 Added {len(parents_to_add)} parent categories (including L1 intermediates) for proper hierarchy")
+
+        # Log category distribution by level
+        from collections import Counter
+        level_counts = Counter(cat.level for cat in categories)
+        logger.info(f"📊 Category distribution: {dict(level_counts)}")
+
+        # Color palette for categories - distinct, vibrant colors
+        category_colors = [
+            {'bg': '#3498db', 'border': '#2980b9'},  # Blue
+            {'bg': '#e74c3c', 'border': '#c0392b'},  # Red
+            {'bg': '#2ecc71', 'border': '#27ae60'},  # Green
+            {'bg': '#f39c12', 'border': '#e67e22'},  # Orange
+            {'bg': '#9b59b6', 'border': '#8e44ad'},  # Purple
+            {'bg': '#1abc9c', 'border': '#16a085'},  # Turquoise
+            {'bg': '#e91e63', 'border': '#c2185b'},  # Pink
+            {'bg': '#ff5722', 'border': '#e64a19'},  # Deep Orange
+            {'bg': '#00bcd4', 'border': '#0097a7'},  # Cyan
+            {'bg': '#8bc34a', 'border': '#689f38'},  # Light Green
+        ]
+
+        # Map category IDs to colors (including subcategories)
+        # Build map of root_category_id -> color for all categories
+        category_color_map = {}
+        root_category_colors = {}  # root_category_id -> color
+
+        # First pass: identify all unique root categories and assign them colors
+        root_categories_found = []
+        for category in categories:
+            root_category = category.get_root_category()
+            if root_category.id not in root_category_colors:
+                root_categories_found.append(root_category)
+                root_category_colors[root_category.id] = category_colors[
+                    (len(root_categories_found) - 1) % len(category_colors)
+                ]
 
-            # Map category IDs to colors (including subcategories)
-            # Build map of root_category_id -> color for all categories
-            category_color_map = {}
-            root_category_colors = {}  # root_category_id -> color
+        # Second pass: assign colors to all categories based on their root
+        for category in categories:
+            root_category = category.get_root_category()
+            # All categories (including subcategories) get their root's color
+            category_color_map[category.id] = root_category_colors[root_category.id]
 
-            # First pass: identify all unique root categories and assign them colors
-            root_categories_found = []
-            for category in categories:
-                root_category = category.get_root_category()
-                if root_category.id not in root_category_colors:
-                    root_categories_found.append(root_category)
-                    root_category_colors[root_category.id] = category_colors[
-                        (len(root_categories_found) - 1) % len(category_colors)
-                    ]
+        # Create category nodes - size based on post count, level-aware
+        for category in categories:
+            color = category_color_map[category.id]
+
+            # 📊 Get recursive post count for size mapping
+            post_count = category.get_recursive_post_count(use_cache=True)
+
+            # 🎯 DYNAMIC LEVEL CALCULATION: Calculate level from parent hierarchy
+            # This ensures all categories have a level, even if not set in DB
+            current_level = 0
+            current_category = category
+            while current_category.parent:
+                current_level += 1
+                current_category = current_category.parent
+
+            # Override DB level with calculated level if DB level is missing or incorrect
+            category_level = current_level
+
+            # 📏 Size mapping: size proportional to post_count
+            # Formula: size = sqrt(post_count) * multiplier + base_size
+            # This makes size grow sublinearly (larger categories don't dominate too much)
+            base_size = 15  # Smaller base for better contrast
+            size_multiplier = 15  # Higher multiplier for more visible differences
+            node_size = int((post_count ** 0.5) * size_multiplier + base_size)
+            # Cap max size to avoid huge nodes
+            node_size = min(node_size, 150)
+
+            # 🔤 Font size based on category level (L1 larger, L2/L3 smaller)
+            if category_level == 0:  # L1 - main categories
+                font_size = 22
+                font_bold = True
+            elif category_level == 1:  # L2 - subcategories
+                font_size = 18
+                font_bold = False
+            else:  # L3+ - sub-subcategories
+                font_size = 16
+                font_bold = False
+
+            graph.add_node(
+                f'category_{category.id}',
+                kind='category',
+                label=category.name,
+                type='category',
+                category_id=category.id,
+                parent_id=category.parent_id,  # 🎯 Parent ID for circular layout
+                level=category_level,  # 🎯 Dynamically calculated level for progressive loading
+                post_count=post_count,  # 📊 Add post count
+                title=f'📂 {category.name}\n{category.description}\n📄 {post_count} posts',
+                shape='dot',
+                size=node_size,  # 📏 Dynamic size based on post count
+                color={
+                    'background': color['bg'],
+                    'border': color['border']
+                },
+                borderWidth=3 + category_level,  # Thicker border for higher levels
+                font={
+                    'size': font_size,
+                    'face': 'arial',
+                    'bold': font_bold
+                },
+                physics=True,
+                mass=3 + (post_count / 10)  # Mass proportional to content
+            )
 
-            # Second pass: assign colors to all categories based on their root
-            for category in categories:
-                root_category = category.get_root_category()
-                # All categories (including subcategories) get their root's color
-                category_color_map[category.id] = root_category_colors[root_category.id]
+        # === 📄 KROK 2: POST NODES (jeśli włączone) ===
+        additional_categories_for_posts = set()  # Track categories needed for posts
+        if include_posts:
+            posts_query = Post.objects.select_related('primary_category', 'author').prefetch_related('additional_categories')
 
-            # Create category nodes - size based on post count, level-aware
-            for category in categories:
-                color = category_color_map[category.id]
-
-                # 📊 Get recursive post count for size mapping
-                post_count = category.get_recursive_post_count(use_cache=True)
-
-                # 🎯 DYNAMIC LEVEL CALCULATION: Calculate level from parent hierarchy
-                # This ensures all categories have a level, even if not set in DB
-                current_level = 0
-                current_category = category
-                while current_category.parent:
-                    current_level += 1
-                    current_category = current_category.parent
-
-                # Override DB level with calculated level if DB level is missing or incorrect
-                category_level = current_level
-                # 🔍 DEBUG
-                print(f"🔍 Category: {category.name}, calculated level: {category_level}, DB level: {category.level}, parent: {category.parent}")
-
-                # 📏 Size mapping: size proportional to post_count
-                # Formula: size = sqrt(post_count) * multiplier + base_size
-                # This makes size grow sublinearly (larger categories don't dominate too much)
-                base_size = 15  # Smaller base for better contrast
-                size_multiplier = 15  # Higher multiplier for more visible differences
-                node_size = int((post_count ** 0.5) * size_multiplier + base_size)
-                # Cap max size to avoid huge nodes
-                node_size = min(node_size, 150)
-
-                # 🔤 Font size based on category level (L1 larger, L2/L3 smaller)
-                if category_level == 0:  # L1 - main categories
-                    font_size = 22
-                    font_bold = True
-                elif category_level == 1:  # L2 - subcategories
-                    font_size = 18
-                    font_bold = False
-                else:  # L3+ - sub-subcategories
-                    font_size = 16
-                    font_bold = False
+            if category_id:
+                # Posts from specific category
+                posts_query = posts_query.filter(
+                    Q(primary_category_id=category_id) |
+                    Q(additional_categories__id=category_id)
+                ).distinct().order_by('-created_at')[:max_posts]
+                posts = list(posts_query)
+                logger.info(f"📊 Loaded {len(posts)} posts from category_id={category_id}")
+            elif focus_post_id:
+                # Get focus post + similar posts
+                focus_post = get_object_or_404(Post, id=focus_post_id)
 
-                nodes.append({
-                    'id': f'category_{category.id}',
-                    'label': category.name,
-                    'type': 'category',
-                    'category_id': category.id,
-                    'parent_id': category.parent_id,  # 🎯 Parent ID for circular layout
-                    'level': category_level,  # 🎯 Dynamically calculated level for progressive loading
-                    'post_count': post_count,  # 📊 Add post count
-                    'title': f'📂 {category.name}\n{category.description}\n📄 {post_count} posts',
-                    'shape': 'dot',
-                    'size': node_size,  # 📏 Dynamic size based on post count
-                    'color': {
-                        'background': color['bg'],
-                        'border': color['border']
-                    },
-                    'borderWidth': 3 + category_level,  # Thicker border for higher levels
-                    'font': {
-                        'size': font_size,
-                        'face': 'arial',
-                        'bold': font_bold
-                    },
-                    'physics': True,
-                    'mass': 3 + (post_count / 10)  # Mass proportional to content
-                })
+                # Start with focus post
+                focus_posts = [focus_post]
 
-            # === 📄 KROK 2: POST NODES (jeśli włączone) ===
-            additional_categories_for_posts = set()  # Track categories needed for posts
-            if include_posts:
-                posts_query = Post.objects.select_related('primary_category', 'author').prefetch_related('additional_categories')
-
-                if category_id:
-                    # Posts from specific category
-                    posts_query = posts_query.filter(
-                        Q(primary_category_id=category_id) |
-                        Q(additional_categories__id=category_id)
-                    ).distinct().order_by('-created_at')[:max_posts]
-                    posts = list(posts_query)
-                    logger.info(f"📊 Loaded {len(posts)} posts from category_id={category_id}")
-                elif focus_post_id:
-                    # Get focus post + similar posts
-                    focus_post = get_object_or_404(Post, id=focus_post_id)
-
-                    # Start with focus post
-                    focus_posts = [focus_post]
-
-                    # Add similar posts if embeddings available AND method is 'gnn'
-                    if (method == 'gnn' and gnn_manager and gnn_manager.embedding_manager
-                        and gnn_manager.embedding_manager.available):
-                        try:
-                            similar_post_data = gnn_manager.find_similar_posts_by_embedding(
-                                post_id=focus_post.id,
-                                top_k=max_posts-1,  # -1 for focus post
-                                threshold=similarity_threshold
-                            )
-                            if similar_post_data:
-                                similar_post_ids = [pid for pid, score in similar_post_data]
-                                similar_posts = Post.objects.filter(id__in=similar_post_ids)
-                                focus_posts.extend(similar_posts)
-                        except Exception as e:
-                            logger.warning(f"Similarity search failed: {e}")
+                # Add similar posts if embeddings available AND method is 'gnn'
+                if (method == 'gnn' and gnn_manager and gnn_manager.embedding_manager
+                    and gnn_manager.embedding_manager.available):
+                    try:
+                        similar_post_data = gnn_manager.find_similar_posts_by_embedding(
+                            post_id=focus_post.id,
+                            top_k=max_posts-1,  # -1 for focus post
+                            threshold=similarity_threshold
+                        )
+                        if similar_post_data:
+                            similar_post_ids = [pid for pid, score in similar_post_data]
+                            similar_posts = Post.objects.filter(id__in=similar_post_ids)
+                            focus_posts.extend(similar_posts)
+                    except Exception as e:
+                        logger.warning(f"Similarity search failed: {e}")
 
-                    posts = focus_posts
-                    logger.info(f"📊 Loaded {len(posts)} posts for focus_post_id={focus_post_id}")
-                else:
-                    # 🎯 BALANCED DISTRIBUTION: Get posts from ALL visible categories
-                    # Ensure at least 2 posts per category, then distribute remaining slots
-                    posts_per_category = max(2, max_posts // len(categories)) if categories else max_posts
-
-                    posts_dict = {}  # Use dict to prevent duplicates (key = post.id)
-                    category_post_counts = {}
-
-                    # Round 1: Get minimum posts from each category (at least 2)
-                    for category in categories:
-                        # Get recent posts from this category
-                        category_posts = Post.objects.filter(
-                            Q(primary_category=category) | Q(additional_categories=category)
-                        ).select_related('primary_category', 'author').prefetch_related('additional_categories').distinct().order_by('-created_at')[:posts_per_category]
-
-                        added_count = 0
-                        for post in category_posts:
-                            if post.id not in posts_dict:  # Avoid duplicates
-                                posts_dict[post.id] = post
-                                added_count += 1
-
-                        category_post_counts[category.name] = added_count
-
-                    # Convert dict to list
-                    posts = list(posts_dict.values())
-
-                    # 🎯 PERSONALIZED MODE: Don't add posts from other categories
-                    # Only fill with additional posts if NOT in personalized mode
-                    if len(posts) < max_posts and not personalized:
-                        remaining = max_posts - len(posts)
-                        post_ids = list(posts_dict.keys())
-                        additional_posts = Post.objects.exclude(id__in=post_ids).select_related(
-                            'primary_category', 'author'
-                        ).prefetch_related('additional_categories').order_by('-created_at')[:remaining]
-                        posts.extend(list(additional_posts))
-
-                    # Limit to max_posts
-                    posts = posts[:max_posts]
-
-                    if personalized:
-                        logger.info(f"📊 Personalized mode: Loaded {len(posts)} posts from {len(categories)} favorite categories: {category_post_counts}")
-                    else:
-                        logger.info(f"📊 Loaded {len(posts)} unique posts distributed across {len(categories)} categories: {category_post_counts}")
-
-                # Helper function to lighten color (for post nodes)
-                def lighten_color(hex_color, factor=0.3):
-                    """Lighten a hex color by factor (0-1)"""
-                    hex_color = hex_color.lstrip('#')
-                    r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
-                    r = int(r + (255 - r) * factor)
-                    g = int(g + (255 - g) * factor)
-                    b = int(b + (255 - b) * factor)
-                    return f'#{r:02x}{g:02x}{b:02x}'
-
-                # Group posts by their primary category for circular positioning
-                import math
-                posts_by_category = {}
-                for post in posts:
-                    if post.primary_category:
-                        cat_id = post.primary_category.id
-                        if cat_id not in posts_by_category:
-                            posts_by_category[cat_id] = []
-                        posts_by_category[cat_id].append(post)
+                posts = focus_posts
+                logger.info(f"📊 Loaded {len(posts)} posts for focus_post_id={focus_post_id}")
+            else:
+                # 🎯 BALANCED DISTRIBUTION: Get posts from ALL visible categories
+                # Ensure at least 2 posts per category, then distribute remaining slots
+                posts_per_category = max(2, max_posts // len(categories)) if categories else max_posts
 
-                # Track position index for each category
-                category_post_index = {}
+                posts_dict = {}  # Use dict to prevent duplicates (key = post.id)
+                category_post_counts = {}
 
-                # Create post nodes with circular positioning around categories
-                for post in posts:
-                    # Determine if this is the focus post
-                    is_focus = focus_post_id and str(post.id) == str(focus_post_id)
+                # Round 1: Get minimum posts from each category (at least 2)
+                for category in categories:
+                    # Get recent posts from this category
+                    category_posts = Post.objects.filter(
+                        Q(primary_category=category) | Q(additional_categories=category)
+                    ).select_related('primary_category', 'author').prefetch_related('additional_categories').distinct().order_by('-created_at')[:posts_per_category]
+
+                    added_count = 0
+                    for post in category_posts:
+                        if post.id not in posts_dict:  # Avoid duplicates
+                            posts_dict[post.id] = post
+                            added_count += 1
+
+                    category_post_counts[category.name] = added_count
+
+                # Convert dict to list
+                posts = list(posts_dict.values())
+
+                # 🎯 PERSONALIZED MODE: Don't add posts from other categories
+                # Only fill with additional posts if NOT in personalized mode
+                if len(posts) < max_posts and not personalized:
+                    remaining = max_posts - len(posts)
+                    post_ids = list(posts_dict.keys())
+                    additional_posts = Post.objects.exclude(id__in=post_ids).select_related(
+                        'primary_category', 'author'
+                    ).prefetch_related('additional_categories').order_by('-created_at')[:remaining]
+                    posts.extend(list(additional_posts))
+
+                # Limit to max_posts
+                posts = posts[:max_posts]
+
+                if personalized:
+                    logger.info(f"📊 Personalized mode: Loaded {len(posts)} posts from {len(categories)} favorite categories: {category_post_counts}")
+                else:
+                    logger.info(f"📊 Loaded {len(posts)} unique posts distributed across {len(categories)} categories: {category_post_counts}")
+
+            # Helper function to lighten color (for post nodes)
+            def lighten_color(hex_color, factor=0.3):
+                """Lighten a hex color by factor (0-1)"""
+                hex_color = hex_color.lstrip('#')
+                r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
+                r = int(r + (255 - r) * factor)
+                g = int(g + (255 - g) * factor)
+                b = int(b + (255 - b) * factor)
+                return f'#{r:02x}{g:02x}{b:02x}'
+
+            # Group posts by their primary category for circular positioning
+            import math
+            posts_by_category = {}
+            for post in posts:
+                if post.primary_category:
+                    cat_id = post.primary_category.id
+                    if cat_id not in posts_by_category:
+                        posts_by_category[cat_id] = []
+                    posts_by_category[cat_id].append(post)
 
-                    # Calculate circular position around primary category
-                    x_pos = None
-                    y_pos = None
-                    if post.primary_category:
-                        cat_id = post.primary_category.id
-                        # Get index of this post within its category
-                        if cat_id not in category_post_index:
-                            category_post_index[cat_id] = 0
-
-                        post_index = category_post_index[cat_id]
-                        category_post_index[cat_id] += 1
-
-                        # Calculate total posts for this category
-                        total_posts_in_cat = len(posts_by_category.get(cat_id, []))
-
-                        if total_posts_in_cat > 0:
-                            # Circular distribution: angle = 360° / total_posts * index
-                            angle = (2 * math.pi * post_index) / total_posts_in_cat
-                            radius = 120  # Distance from category center
-
-                            # Calculate position (relative to category at 0,0)
-                            x_pos = radius * math.cos(angle)
-                            y_pos = radius * math.sin(angle)
-
-                    # Get color from primary category's ROOT category
-                    if post.primary_category:
-                        # Get root category to use its color
-                        root_category = post.primary_category.get_root_category()
-                        if root_category.id in root_category_colors:
-                            cat_color = root_category_colors[root_category.id]
-                        elif post.primary_category.id in category_color_map:
-                            cat_color = category_color_map[post.primary_category.id]
-                        else:
-                            cat_color = None
+            # Track position index for each category
+            category_post_index = {}
 
-                        if cat_color:
-                            # Use lighter shade of category color for posts
-                            post_bg = lighten_color(cat_color['bg'], 0.3)
-                            post_border = cat_color['bg']  # Use category bg as post border
-                        else:
-                            # Default gray for posts without category
-                            post_bg = '#95a5a6'
-                            post_border = '#7f8c8d'
+            # Create post nodes with circular positioning around categories
+            for post in posts:
+                # Determine if this is the focus post
+                is_focus = focus_post_id and str(post.id) == str(focus_post_id)
+
+                # Calculate circular position around primary category
+                x_pos = None
+                y_pos = None
+                if post.primary_category:
+                    cat_id = post.primary_category.id
+                    # Get index of this post within its category
+                    if cat_id not in category_post_index:
+                        category_post_index[cat_id] = 0
+
+                    post_index = category_post_index[cat_id]
+                    category_post_index[cat_id] += 1
+
+                    # Calculate total posts for this category
+                    total_posts_in_cat = len(posts_by_category.get(cat_id, []))
+
+                    if total_posts_in_cat > 0:
+                        # Circular distribution: angle = 360° / total_posts * index
+                        angle = (2 * math.pi * post_index) / total_posts_in_cat
+                        radius = 120  # Distance from category center
+
+                        # Calculate position (relative to category at 0,0)
+                        x_pos = radius * math.cos(angle)
+                        y_pos = radius * math.sin(angle)
+
+                # Get color from primary category's ROOT category
+                if post.primary_category:
+                    # Get root category to use its color
+                    root_category = post.primary_category.get_root_category()
+                    if root_category.id in root_category_colors:
+                        cat_color = root_category_colors[root_category.id]
+                    elif post.primary_category.id in category_color_map:
+                        cat_color = category_color_map[post.primary_category.id]
+                    else:
+                        cat_color = None
+
+                    if cat_color:
+                        # Use lighter shade of category color for posts
+                        post_bg = lighten_color(cat_color['bg'], 0.3)
+                        post_border = cat_color['bg']  # Use category bg as post border
                     else:
                         # Default gray for posts without category
                         post_bg = '#95a5a6'
                         post_border = '#7f8c8d'
+                else:
+                    # Default gray for posts without category
+                    post_bg = '#95a5a6'
+                    post_border = '#7f8c8d'
+
+                post_node = {
+                    'label': post.title[:30] + ('...' if len(post.title) > 30 else ''),
+                    'type': 'post',
+                    'post_id': post.id,
+                    'category_id': post.primary_category_id,  # 🎯 Category ID for circular layout
+                    'title': f'📄 {post.title}\n👤 {post.author.username}\n📅 {post.created_at.strftime("%Y-%m-%d")}\n📂 {post.primary_category.name if post.primary_category else "No category"}',
+                    'shape': 'box',
+                    'size': 30 if is_focus else 20,
+                    'color': {
+                        'background': post_bg,
+                        'border': post_border
+                    },
+                    'font': {'size': 14, 'color': '#2c3e50'},  # Dark text on light background
+                    'physics': True,
+                    'is_focus': is_focus,
+                    'mass': 2  # Add mass so posts repel each other
+                }
 
-                    post_node = {
-                        'id': f'post_{post.id}',
-                        'label': post.title[:30] + ('...' if len(post.title) > 30 else ''),
-                        'type': 'post',
-                        'post_id': post.id,
-                        'category_id': post.primary_category_id,  # 🎯 Category ID for circular layout
-                        'title': f'📄 {post.title}\n👤 {post.author.username}\n📅 {post.created_at.strftime("%Y-%m-%d")}\n📂 {post.primary_category.name if post.primary_category else "No category"}',
-                        'shape': 'box',
-                        'size': 30 if is_focus else 20,
-                        'color': {
-                            'background': post_bg,
-                            'border': post_border
-                        },
-                        'font': {'size': 14, 'color': '#2c3e50'},  # Dark text on light background
-                        'physics': True,
-                        'is_focus': is_focus,
-                        'mass': 2  # Add mass so posts repel each other
-                    }
+                # Add initial circular position if calculated
+                if x_pos is not None and y_pos is not None:
+                    post_node['x'] = x_pos
+                    post_node['y'] = y_pos
 
-                    # Add initial circular position if calculated
-                    if x_pos is not None and y_pos is not None:
-                        post_node['x'] = x_pos
-                        post_node['y'] = y_pos
+                graph.add_node(f'post_{post.id}', kind='post', **post_node)
 
-                    nodes.append(post_node)
+                # Track categories needed for post connections
+                if post.primary_category:
+                    additional_categories_for_posts.add(post.primary_category.id)
+                for additional_cat in post.additional_categories.all():
+                    additional_categories_for_posts.add(additional_cat.id)
 
-                    # Track categories needed for post connections
-                    if post.primary_category:
-                        additional_categories_for_posts.add(post.primary_category.id)
-                    for additional_cat in post.additional_categories.all():
-                        additional_categories_for_posts.add(additional_cat.id)
-
-                # === 🔧 ADD MISSING CATEGORY NODES ===
-                # Add category nodes for posts that don't have their categories in top 20
-                existing_category_ids = {int(n['category_id']) for n in nodes if n.get('type') == 'category'}
-                missing_category_ids = additional_categories_for_posts - existing_category_ids
-
-                if missing_category_ids:
-                    missing_categories = Category.objects.filter(id__in=missing_category_ids)
-                    logger.info(f"📂 Adding {len(missing_categories)} missing category nodes for post connections")
-
-                    # 🎯 Also add parents of missing categories
-                    parents_of_missing = []
-                    for category in missing_categories:
-                        current = category.parent
-                        while current and current.id not in category_ids and current.id not in missing_category_ids:
-                            if current.id not in {p.id for p in parents_of_missing}:
-                                parents_of_missing.append(current)
-                            category_ids.add(current.id)
-                            current = current.parent
-
-                    if parents_of_missing:
-                        missing_categories = list(missing_categories) + parents_of_missing
-                        logger.info(f"🔗 Added {len(parents_of_missing)} parent categories for missing categories")
-
-                    for category in missing_categories:
-                        # Determine color based on root category
-                        root_category = category.get_root_category()
-                        if root_category.id in root_category_colors:
+            # === 🔧 ADD MISSING CATEGORY NODES ===
+            # Add category nodes for posts that don't have their categories in top 20
+            missing_category_ids = {
+                cat_id for cat_id in additional_categories_for_posts
+                if not graph.has_node(f'category_{cat_id}')
+            }
+
+            if missing_category_ids:
+                missing_categories = Category.objects.filter(id__in=missing_category_ids)
+                logger.info(f"📂 Adding {len(missing_categories)} missing category nodes for post connections")
+
+                # 🎯 Also add parents of missing categories
+                parents_of_missing = []
+                for category in missing_categories:
+                    current = category.parent
+                    while current and current.id not in category_ids and current.id not in missing_category_ids:
+                        if current.id not in {p.id for p in parents_of_missing}:
+                            parents_of_missing.append(current)
+                        category_ids.add(current.id)
+                        current = current.parent
+
+                if parents_of_missing:
+                    missing_categories = list(missing_categories) + parents_of_missing
+                    logger.info(f"🔗 Added {len(parents_of_missing)} parent categories for missing categories")
+
+                for category in missing_categories:
+                    # Determine color based on root category
+                    root_category = category.get_root_category()
+                    if root_category.id in root_category_colors:
+                        color = root_category_colors[root_category.id]
+                    else:
+                        # Assign new color if needed
+                        if root_category.id not in root_category_colors:
+                            color_index = len(root_category_colors) % len(category_colors)
+                            root_category_colors[root_category.id] = category_colors[color_index]
                             color = root_category_colors[root_category.id]
                         else:
-                            # Assign new color if needed
-                            if root_category.id not in root_category_colors:
-                                color_index = len(root_category_colors) % len(category_colors)
-                                root_category_colors[root_category.id] = category_colors[color_index]
-                                color = root_category_colors[root_category.id]
-                            else:
-                                color = root_category_colors[root_category.id]
-
-                        category_color_map[category.id] = color
-
-                        # 📊 Get recursive post count for size mapping (same as main loop)
-                        post_count = category.get_recursive_post_count(use_cache=True)
-
-                        # 🎯 DYNAMIC LEVEL CALCULATION (same as main loop)
-                        current_level = 0
-                        current_category = category
-                        while current_category.parent:
-                            current_level += 1
-                            current_category = current_category.parent
-                        category_level = current_level
-
-                        # 📏 Size mapping (same as main loop)
-                        base_size = 15
-                        size_multiplier = 15
-                        node_size = int((post_count ** 0.5) * size_multiplier + base_size)
-                        node_size = min(node_size, 150)
-
-                        # 🔤 Font size based on category level (same as main loop)
-                        if category_level == 0:
-                            font_size = 22
-                            font_bold = True
-                        elif category_level == 1:
-                            font_size = 18
-                            font_bold = False
-                        else:
-                            font_size = 16
-                            font_bold = False
-
-                        nodes.append({
-                            'id': f'category_{category.id}',
-                            'label': category.name,
-                            'type': 'category',
-                            'category_id': category.id,
-                            'parent_id': category.parent_id,  # 🎯 Parent ID for circular layout
-                            'level': category_level,  # 🎯 Add level!
-                            'post_count': post_count,  # 📊 Add post count!
-                            'title': f'📂 {category.name}\n{category.description}\n📄 {post_count} posts',
-                            'shape': 'dot',
-                            'size': node_size,  # 📏 Dynamic size!
-                            'color': {
-                                'background': color['bg'],
-                                'border': color['border']
-                            },
-                            'borderWidth': 3 + category_level,  # Dynamic border!
-                            'font': {
-                                'size': font_size,  # Dynamic font!
-                                'face': 'arial',
-                                'bold': font_bold
-                            },
-                            'physics': True,
-                            'mass': 3 + (post_count / 10)  # Dynamic mass!
-                        })
-
-                # === 🔗 KROK 3: POST-CATEGORY CONNECTIONS ===
-                # Connect posts to their categories (avoid duplicates)
-                added_edges = set()  # Track added edges to prevent duplicates
-
-                for post in posts:
-                    # Collect all categories for this post (primary + additional)
-                    post_categories = {}  # category_id -> is_primary
+                            color = root_category_colors[root_category.id]
 
-                    # Primary category
-                    if post.primary_category:
-                        post_categories[post.primary_category.id] = True
+                    category_color_map[category.id] = color
+
+                    # 📊 Get recursive post count for size mapping (same as main loop)
+                    post_count = category.get_recursive_post_count(use_cache=True)
+
+                    # 🎯 DYNAMIC LEVEL CALCULATION (same as main loop)
+                    current_level = 0
+                    current_category = category
+                    while current_category.parent:
+                        current_level += 1
+                        current_category = current_category.parent
+                    category_level = current_level
+
+                    # 📏 Size mapping (same as main loop)
+                    base_size = 15
+                    size_multiplier = 15
+                    node_size = int((post_count ** 0.5) * size_multiplier + base_size)
+                    node_size = min(node_size, 150)
+
+                    # 🔤 Font size based on category level (same as main loop)
+                    if category_level == 0:
+                        font_size = 22
+                        font_bold = True
+                    elif category_level == 1:
+                        font_size = 18
+                        font_bold = False
+                    else:
+                        font_size = 16
+                        font_bold = False
+
+                    graph.add_node(
+                        f'category_{category.id}',
+                        kind='category',
+                        label=category.name,
+                        type='category',
+                        category_id=category.id,
+                        parent_id=category.parent_id,  # 🎯 Parent ID for circular layout
+                        level=category_level,  # 🎯 Add level!
+                        post_count=post_count,  # 📊 Add post count!
+                        title=f'📂 {category.name}\n{category.description}\n📄 {post_count} posts',
+                        shape='dot',
+                        size=node_size,  # 📏 Dynamic size!
+                        color={
+                            'background': color['bg'],
+                            'border': color['border']
+                        },
+                        borderWidth=3 + category_level,  # Dynamic border!
+                        font={
+                            'size': font_size,  # Dynamic font!
+                            'face': 'arial',
+                            'bold': font_bold
+                        },
+                        physics=True,
+                        mass=3 + (post_count / 10)  # Dynamic mass!
+                    )
 
-                    # Additional categories
-                    for additional_cat in post.additional_categories.all():
-                        if additional_cat.id not in post_categories:  # Don't override primary
-                            post_categories[additional_cat.id] = False
-
-                    # Create edges for all categories
-                    for cat_id, is_primary in post_categories.items():
-                        edge_key = (post.id, cat_id)
-                        if edge_key not in added_edges:
-                            cat_node_id = f'category_{cat_id}'
-                            if any(n['id'] == cat_node_id for n in nodes):
-                                edges.append({
-                                    'id': f'post_{post.id}_to_cat_{cat_id}',
-                                    'from': f'post_{post.id}',
-                                    'to': cat_node_id,
-                                    'title': 'Primary category' if is_primary else 'Additional category',
-                                    'color': {'color': '#95a5a6' if is_primary else '#bdc3c7'},
-                                    'width': 2 if is_primary else 1,
-                                    'dashes': [5, 5] if is_primary else [3, 3]
-                                })
-                                added_edges.add(edge_key)
-
-                # === 🔗 KROK 4: POST-POST SIMILARITY CONNECTIONS ===
-                # 🚀 OPTIMIZATION: Only use GNN for similarity connections when method='gnn'
-                if (method == 'gnn' and gnn_manager and gnn_manager.embedding_manager
-                    and gnn_manager.embedding_manager.available):
-                    try:
-                        # Create similarity connections between posts
-                        post_pairs_checked = set()
+            # === 🔗 KROK 3: POST-CATEGORY CONNECTIONS ===
+            # Connect posts to their categories (duplicates are skipped by the builder)
+            for post in posts:
+                # Collect all categories for this post (primary + additional)
+                post_categories = {}  # category_id -> is_primary
+
+                # Primary category
+                if post.primary_category:
+                    post_categories[post.primary_category.id] = True
+
+                # Additional categories
+                for additional_cat in post.additional_categories.all():
+                    if additional_cat.id not in post_categories:  # Don't override primary
+                        post_categories[additional_cat.id] = False
+
+                # Create edges for all categories
+                for cat_id, is_primary in post_categories.items():
+                    graph.add_edge(
+                        f'post_{post.id}', f'category_{cat_id}',
+                        id=f'post_{post.id}_to_cat_{cat_id}',
+                        title='Primary category' if is_primary else 'Additional category',
+                        color={'color': '#95a5a6' if is_primary else '#bdc3c7'},
+                        width=2 if is_primary else 1,
+                        dashes=[5, 5] if is_primary else [3, 3]
+                    )
 
-                        for post in posts:
-                            if len(edges) > 100:  # Limit total edges
-                                break
+            # === 🔗 KROK 4: POST-POST SIMILARITY CONNECTIONS ===
+            # 🚀 OPTIMIZATION: Only use GNN for similarity connections when method='gnn'
+            if (method == 'gnn' and gnn_manager and gnn_manager.embedding_manager
+                and gnn_manager.embedding_manager.available):
+                try:
+                    # Create similarity connections between posts
+                    # (each post keeps its max_connections strongest links)
+                    for post in posts:
+                        if graph.edge_count() > 100:  # Limit total edges
+                            break
+
+                        similar_post_data = gnn_manager.find_similar_posts_by_embedding(
+                            post_id=post.id,
+                            top_k=max_connections,
+                            threshold=similarity_threshold
+                        )
 
-                            similar_post_data = gnn_manager.find_similar_posts_by_embedding(
-                                post_id=post.id,
-                                top_k=max_connections,
-                                threshold=similarity_threshold
-                            )
-
-                            if similar_post_data:
-                                for similar_post_id, similarity_score in similar_post_data:
-                                    # Check if both posts are in our nodes
-                                    target_post_node = f'post_{similar_post_id}'
-                                    source_post_node = f'post_{post.id}'
-
-                                    if (any(n['id'] == target_post_node for n in nodes) and
-                                        any(n['id'] == source_post_node for n in nodes)):
-
-                                        # Avoid duplicate edges
-                                        pair_key = tuple(sorted([post.id, similar_post_id]))
-                                        if pair_key not in post_pairs_checked:
-                                            post_pairs_checked.add(pair_key)
-
-                                            # Color based on similarity strength
-                                            if similarity_score > 0.9:
-                                                color = '#2ecc71'  # Strong green
-                                                width = 4
-                                            elif similarity_score > 0.8:
-                                                color = '#3498db'  # Blue
-                                                width = 3
-                                            else:
-                                                color = '#95a5a6'  # Gray
-                                                width = 2
-
-                                            edges.append({
-                                                'id': f'similarity_{post.id}_{similar_post_id}',
-                                                'from': source_post_node,
-                                                'to': target_post_node,
-                                                'title': f'Semantic similarity: {similarity_score:.3f}',
-                                                'color': {'color': color},
-                                                'width': width,
-                                                'smooth': {'type': 'continuous'}
-                                            })
+                        if similar_post_data:
+                            for similar_post_id, similarity_score in similar_post_data:
+                                # Color based on similarity strength
+                                if similarity_score > 0.9:
+                                    color = '#2ecc71'  # Strong green
+                                    width = 4
+                                elif similarity_score > 0.8:
+                                    color = '#3498db'  # Blue
+                                    width = 3
+                                else:
+                                    color = '#95a5a6'  # Gray
+                                    width = 2
+
+                                # Both posts must be nodes; duplicates are skipped by the builder
+                                graph.add_edge(
+                                    f'post_{post.id}', f'post_{similar_post_id}',
+                                    weight=similarity_score,
+                                    capped=True,
+                                    id=f'similarity_{post.id}_{similar_post_id}',
+                                    title=f'Semantic similarity: {similarity_score:.3f}',
+                                    color={'color': color},
+                                    width=width,
+                                    smooth={'type': 'continuous'}
+                                )
 
-                    except Exception as e:
-                        logger.warning(f"Post similarity connections failed: {e}")
+                except Exception as e:
+                    logger.warning(f"Post similarity connections failed: {e}")
+
+        # === 📍 KROK 5: PRECOMPUTED LAYOUT ===
+        # Coordinates from `compute_graph_layouts` - pinned nodes skip browser physics
+        placed_nodes = 0
+        if layout_mode == 'precomputed':
+            positions = get_layout_positions()
+            placed_nodes = apply_layout(graph.nodes, positions)
+
+            # Posts added since the last layout run: circle offsets around their category
+            for node in graph.nodes:
+                if node.get('physics') is False or 'x' not in node:
+                    continue
+                category_position = positions.get(f"category_{node.get('category_id')}")
+                if category_position is not None:
+                    node['x'] += category_position[0]
+                    node['y'] += category_position[1]
+
+        if placed_nodes and placed_nodes == graph.node_count():
+            layout_used = 'precomputed'
+        elif placed_nodes:
+            layout_used = 'partial'
+        else:
+            layout_used = 'physics'
 
-            # === 📤 RESPONSE ===
-            response_data = {
-                'nodes': nodes,
-                'edges': edges,
-                'stats': {
-                    'total_nodes': len(nodes),
-                    'total_edges': len(edges),
-                    'category_nodes': len([n for n in nodes if n['type'] == 'category']),
-                    'post_nodes': len([n for n in nodes if n['type'] == 'post']),
-                    'focus_post_id': focus_post_id,
-                    'category_id': category_id,
-                    'similarity_threshold': similarity_threshold,
-                    'max_posts': max_posts,
-                    'method_used': method,  # 🚀 OPTIMIZATION: Track which method was requested
-                    'gnn_used': method == 'gnn',  # 🚀 OPTIMIZATION: Track if GNN was actually used
-                    'embeddings_available': bool(gnn_manager and gnn_manager.embedding_manager and gnn_manager.embedding_manager.available),
-                    'cached': False  # Indicate this was freshly generated
-                }
+        # === 📤 RESPONSE ===
+        response_data = {
+            **graph.to_vis(),
+            'stats': {
+                'total_nodes': graph.node_count(),
+                'total_edges': graph.edge_count(),
+                'category_nodes': graph.node_count('category'),
+                'post_nodes': graph.node_count('post'),
+                'focus_post_id': focus_post_id,
+                'category_id': category_id,
+                'similarity_threshold': similarity_threshold,
+                'max_posts': max_posts,
+                'method_used': method,  # 🚀 OPTIMIZATION: Track which method was requested
+                'gnn_used': method == 'gnn',  # 🚀 OPTIMIZATION: Track if GNN was actually used
+                'embeddings_available': bool(gnn_manager and gnn_manager.embedding_manager and gnn_manager.embedding_manager.available),
+                'layout': layout_used,  # 📍 precomputed / partial / physics
+                'positioned_nodes': placed_nodes,
+                'cached': False  # Indicate this was freshly generated
             }
+        }
 
-            # === 🚀 SAVE TO CACHE ===
-            if cache_key:
-                # Cache for 5 minutes (300 seconds)
-                cache.set(cache_key, response_data, 300)
-                print(f"💾 Saved to cache: {cache_key}")
-                logger.info(f"💾 Saved to cache: {cache_key}")
+        return response_data
 
-            return Response(response_data)
+class NetworkTileView(APIView):
+    """
+    🗺️ NETWORK TILES - Progressive disclosure na precomputed layout
 
-        except Exception as e:
-            logger.error(f"💥 Post network generation failed: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+    Zamiast pobierać całą sieć przy każdym zoomie, klient pobiera tylko
+    kafelki (z/x/y) widoczne w viewporcie:
+    1. 📍 Pozycje z GraphLayout (compute_graph_layouts)
+    2. 🔍 Zoom = level of detail - głębsze kategorie i posty jako cluster nodes
+    3. 🏷️ ETag per kafelek - 304 gdy nic się nie zmieniło
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = VIZ_RENDERER_CLASSES  # ?format=columnar
 
+    def get(self, request, z, x, y):
+        """
+        Parametry URL:
+        - graph: klucz layoutu - posts/categories (default: posts)
+        """
+        from .layout import LAYOUT_GRAPHS, DEFAULT_GRAPH_KEY
+        from .tiles import get_tile_index, tile_etag, MAX_ZOOM, POST_MIN_ZOOM
+
+        graph_key = request.GET.get('graph', DEFAULT_GRAPH_KEY)
+        if graph_key not in LAYOUT_GRAPHS:
+            return Response({'error': f'Unknown graph: {graph_key}'}, status=status.HTTP_400_BAD_REQUEST)
+        if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            return Response({'error': f'Tile {z}/{x}/{y} out of range (max zoom {MAX_ZOOM})'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        # 🏷️ Revalidation - answered without touching the index
+        etag = tile_etag(graph_key, z, x, y)
+        # (compression middleware turns the ETag into a weak one - compare without W/)
+        client_etags = [tag.strip().removeprefix('W/') for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]
+        if etag in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        index = get_tile_index(graph_key)
+        if index is None:
             return Response({
-                'error': 'Post network generation failed',
-                'details': str(e),
+                'error': 'Layout not computed yet - run `python manage.py compute_graph_layouts`',
                 'nodes': [],
                 'edges': []
-            }, status=500)
\ No newline at end of file
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        tile = index.tile(z, x, y)
+        response = Response({
+            **tile,
+            'tile': {'z': z, 'x': x, 'y': y},
+            'world': index.bounds,
+            'stats': {
+                'graph': graph_key,
+                'max_zoom': MAX_ZOOM,
+                'post_min_zoom': POST_MIN_ZOOM,
+                'total_nodes': len(tile['nodes']),
+                'total_edges': len(tile['edges']),
+                'cluster_nodes': sum(1 for node in tile['nodes'] if node['type'] == 'cluster'),
+            }
+        })
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'  # 🏷️ Always revalidate - cheap thanks to the ETag
+        return response
@@ -0,0 +1,137 @@
+"""
+Stale-while-revalidate cache for expensive visualization responses
+
+A plain cache.get/cache.set with a 300 s timeout makes the first visitor
+after expiry pay the whole rebuild, and every visitor arriving during that
+rebuild starts one of their own. cached_build() instead:
+
+- serves entries younger than `fresh_for` as they are
+- serves older entries for another `grace` seconds while one background
+  thread rebuilds them
+- on a cold cache lets one caller build while the others wait briefly
+  for its result
+
+Single flight relies on cache.add() of a lock key, which holds across
+processes with the shared backend configured in settings.CACHES (database
+cache or Redis) - so entries written by `warm_viz_caches` are the ones the
+web workers serve.
+
+Rebuild durations are recorded per name (see get_rebuild_stats()).
+`python manage.py warm_viz_caches` prebuilds the default parameter sets.
+"""
+
+import logging
+import threading
+import time
+from django.core.cache import cache
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRESH_FOR = 300
+DEFAULT_GRACE = 3600
+# Longest expected rebuild - a crashed builder's lock expires after this
+LOCK_TIMEOUT = 300
+# How long a cold-cache request waits for another caller's build
+WAIT_FOR_BUILD = 10
+WAIT_INTERVAL = 0.1
+
+STATS_KEY_PREFIX = 'viz_cache_stats'
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _record_duration(name, duration):
+    stats_key = f'{STATS_KEY_PREFIX}:{name}'
+    stats = cache.get(stats_key) or {'builds': 0, 'total_seconds': 0.0, 'max_seconds': 0.0}
+    stats['builds'] += 1
+    stats['total_seconds'] += duration
+    stats['max_seconds'] = max(stats['max_seconds'], duration)
+    stats['last_seconds'] = duration
+    stats['last_built_at'] = time.time()
+    cache.set(stats_key, stats, None)
+
+
+def get_rebuild_stats(name):
+    """
+    Rebuild timings recorded for a cached view
+
+    Returns:
+        Dict with builds, total/max/last/avg seconds (None if never built)
+    """
+    stats = cache.get(f'{STATS_KEY_PREFIX}:{name}')
+    if stats is None:
+        return None
+    return {**stats, 'avg_seconds': stats['total_seconds'] / stats['builds']}
+
+
+def _rebuild(key, build, name, fresh_for, grace, owns_lock=True):
+    started = time.time()
+    try:
+        value = build()
+        duration = time.time() - started
+        cache.set(key, {'value': value, 'built_at': time.time()}, fresh_for + grace)
+        _record_duration(name, duration)
+        logger.info(f"Rebuilt {name} cache entry in {duration:.2f}s")
+        return value
+    finally:
+        if owns_lock:
+            cache.delete(_lock_key(key))
+
+
+def _rebuild_in_background(key, build, name, fresh_for, grace):
+    def run():
+        try:
+            _rebuild(key, build, name, fresh_for, grace)
+        except Exception:
+            logger.exception(f"Background refresh of {name} failed")
+        finally:
+            # The thread got its own DB connection - do not leak it
+            close_old_connections()
+
+    threading.Thread(target=run, name=f'viz-refresh-{name}', daemon=True).start()
+
+
+def cached_build(key, build, name, fresh_for=DEFAULT_FRESH_FOR, grace=DEFAULT_GRACE, force=False):
+    """
+    Return a cached value, rebuilding it with single flight when needed
+
+    Args:
+        key: Cache key of the value
+        build: Zero-argument callable producing the value
+        name: Label for logs and rebuild statistics
+        fresh_for: Seconds an entry is served without refreshing
+        grace: Extra seconds a stale entry is served while it is refreshed
+        force: Rebuild synchronously now (cache warming)
+
+    Returns:
+        (value, state) - state is 'fresh', 'stale' or 'built'
+    """
+    if force:
+        owns_lock = cache.add(_lock_key(key), True, LOCK_TIMEOUT)
+        return _rebuild(key, build, name, fresh_for, grace, owns_lock=owns_lock), 'built'
+
+    entry = cache.get(key)
+    if entry is not None:
+        if time.time() - entry['built_at'] < fresh_for:
+            return entry['value'], 'fresh'
+        if cache.add(_lock_key(key), True, LOCK_TIMEOUT):
+            _rebuild_in_background(key, build, name, fresh_for, grace)
+        return entry['value'], 'stale'
+
+    # Cold cache - one caller builds, the rest wait for its result
+    if cache.add(_lock_key(key), True, LOCK_TIMEOUT):
+        return _rebuild(key, build, name, fresh_for, grace), 'built'
+
+    deadline = time.time() + WAIT_FOR_BUILD
+    while time.time() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value'], 'fresh'
+
+    # The other build is taking too long - answer this request ourselves
+    logger.warning(f"Waited {WAIT_FOR_BUILD}s for {name} rebuild - building without the lock")
+    return _rebuild(key, build, name, fresh_for, grace, owns_lock=False), 'built'
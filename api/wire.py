@@ -0,0 +1,126 @@
+"""
+Compact wire format for the visualization endpoints
+
+Network responses repeat the same colour/font/style dicts and flags on
+every node and edge. With `?format=columnar` a viz endpoint returns the
+same graph as parallel arrays instead:
+
+    {
+        "format": "columnar", "version": 1,
+        "nodes": {"length": n, "columns": {"id": [...], "label": [...], "color": {...}}},
+        "edges": {"length": m, "columns": {"from": {"node": [...]}, ...}},
+        "stats": {...}                      # other keys are passed through
+    }
+
+A column is either a plain array (one value per row) or a lookup table
+{"table": [distinct values], "index": [row -> table position, -1 = field
+absent]}. Repetitive fields (styles, types, groups) and fields missing on
+some rows use the table form. Edge endpoints are stored as positions in the
+node id column ({"node": [...]}) when every endpoint is a node.
+
+`decodeColumnar()` in frontend/src/services/api.js rebuilds the original
+node/edge objects. Compression (gzip/brotli) is negotiated separately by
+api.middleware.VizCompressionMiddleware.
+"""
+
+import json
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+COLUMNAR_VERSION = 1
+
+# A complete scalar column stays a plain array unless values repeat this much
+PLAIN_COLUMN_MIN_DISTINCT_RATIO = 0.5
+
+_MISSING = object()
+
+
+def _is_scalar(value):
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _lookup_key(value):
+    if _is_scalar(value):
+        # bool/int/float of equal value must not share a slot
+        return (type(value).__name__, value)
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _encode_column(values):
+    """Encode one field of all rows (_MISSING marks rows without the field)"""
+    complete = all(value is not _MISSING for value in values)
+    if complete and all(_is_scalar(value) for value in values):
+        distinct = len({_lookup_key(value) for value in values})
+        if distinct >= len(values) * PLAIN_COLUMN_MIN_DISTINCT_RATIO:
+            return list(values)
+
+    table = []
+    positions = {}
+    index = []
+    for value in values:
+        if value is _MISSING:
+            index.append(-1)
+            continue
+        key = _lookup_key(value)
+        position = positions.get(key)
+        if position is None:
+            position = positions[key] = len(table)
+            table.append(value)
+        index.append(position)
+    return {'table': table, 'index': index}
+
+
+def _encode_rows(rows, node_positions=None):
+    keys = list(dict.fromkeys(key for row in rows for key in row))
+    columns = {}
+    for key in keys:
+        values = [row.get(key, _MISSING) for row in rows]
+        if node_positions is not None and key in ('from', 'to'):
+            columns[key] = {'node': [node_positions[value] for value in values]}
+        else:
+            columns[key] = _encode_column(values)
+    return {'length': len(rows), 'columns': columns}
+
+
+def to_columnar(payload):
+    """
+    Convert a {'nodes': [...], 'edges': [...], ...} payload to the columnar format
+
+    Returns:
+        New dict; the input (which may be cached) is not modified
+    """
+    nodes = payload.get('nodes') or []
+    edges = payload.get('edges') or []
+
+    node_positions = {}
+    for position, node in enumerate(nodes):
+        node_positions.setdefault(node.get('id'), position)
+    endpoints_are_nodes = all(
+        edge.get('from') in node_positions and edge.get('to') in node_positions
+        for edge in edges
+    )
+
+    result = {key: value for key, value in payload.items() if key not in ('nodes', 'edges')}
+    result.update({
+        'format': 'columnar',
+        'version': COLUMNAR_VERSION,
+        'nodes': _encode_rows(nodes),
+        'edges': _encode_rows(edges, node_positions if endpoints_are_nodes else None),
+    })
+    return result
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """JSON renderer selected with ?format=columnar on graph endpoints"""
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        is_graph = isinstance(data, dict) and 'nodes' in data and 'edges' in data
+        if is_graph and response is not None and not response.exception:
+            data = to_columnar(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+# renderer_classes for viz views: the defaults plus ?format=columnar
+VIZ_RENDERER_CLASSES = list(api_settings.DEFAULT_RENDERER_CLASSES) + [ColumnarJSONRenderer]
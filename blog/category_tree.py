@@ -0,0 +1,93 @@
+"""
+In-memory snapshot of the category hierarchy
+
+Walking `category.parent` or `get_all_subcategories()` costs one query per
+level/node. Features that need ancestors or descendants of many categories
+at once (feeds, facet rollups, graph aggregation, classifiers) use this
+snapshot instead: one query loads (id, parent_id, level, name) for the
+whole tree, and it is reused until the categories generation changes.
+"""
+
+from collections import defaultdict
+from topicsloop.cache import get_generation
+
+_snapshot = None
+
+
+class CategoryTree:
+    """Parent/children maps for the whole category tree"""
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows: Iterable of (id, parent_id, level, name) tuples
+        """
+        self.parent = {}
+        self.level = {}
+        self.name = {}
+        self.children = defaultdict(list)
+
+        for category_id, parent_id, level, name in rows:
+            self.parent[category_id] = parent_id
+            self.level[category_id] = level
+            self.name[category_id] = name
+            if parent_id is not None:
+                self.children[parent_id].append(category_id)
+
+    @property
+    def roots(self):
+        return [cid for cid, parent_id in self.parent.items() if parent_id is None]
+
+    def path(self, category_id):
+        """Ids from the root down to category_id (inclusive)"""
+        path = []
+        current = category_id
+        while current is not None and current not in path:
+            path.append(current)
+            current = self.parent.get(current)
+        path.reverse()
+        return path
+
+    def ancestors(self, category_ids, include_self=True):
+        """All ancestors of the given categories"""
+        result = set()
+        for category_id in category_ids:
+            current = category_id if include_self else self.parent.get(category_id)
+            while current is not None and current not in result:
+                result.add(current)
+                current = self.parent.get(current)
+        return result
+
+    def descendants(self, category_ids, include_self=True):
+        """All categories below the given ones (breadth-first)"""
+        result = set(category_ids) if include_self else set()
+        queue = list(category_ids)
+        while queue:
+            current = queue.pop()
+            for child_id in self.children.get(current, ()):
+                if child_id not in result:
+                    result.add(child_id)
+                    queue.append(child_id)
+        return result
+
+    def ancestor_at_level(self, category_id, level):
+        """Ancestor of category_id at the given level (or the category itself if shallower)"""
+        path = self.path(category_id)
+        if not path:
+            return None
+        return path[min(level, len(path) - 1)]
+
+    def root_of(self, category_id):
+        return self.ancestor_at_level(category_id, 0)
+
+
+def get_category_tree():
+    """Return the current CategoryTree, reloading after category changes"""
+    global _snapshot
+    from blog.models import Category
+
+    generation = get_generation('categories')
+    if _snapshot is None or _snapshot[0] != generation:
+        rows = Category.objects.values_list('id', 'parent_id', 'level', 'name')
+        _snapshot = (generation, CategoryTree(rows))
+    return _snapshot[1]
@@ -0,0 +1,264 @@
+"""
+Materialized per-user feeds for favorite-category filtering
+
+A user's feed is every post filed under one of their favorite categories or
+any descendant of one, newest first. Two strategies keep reads cheap:
+
+- Fan-out on write: when a post is saved, a FeedEntry row is written for each
+  user following one of the post's categories or their ancestors.
+- Merge on read: categories followed by more than FANOUT_MAX_AUDIENCE users
+  ("hot" categories) are skipped at write time; their recent posts are merged
+  into the feed when it is read, so one popular category never turns a
+  single post save into a huge insert.
+
+When unfollows bring a hot category back under the threshold, its posts are
+no longer merged on read, so its remaining followers' feeds are backfilled
+with the category's newest posts (see backfill_category_followers).
+
+Feeds are capped at FEED_MAX_LENGTH entries per user. `manage.py
+rebuild_feeds` backfills feeds, trims old entries and repairs any feed that
+drifted from the current favorites.
+"""
+
+import heapq
+import logging
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from topicsloop.cache import get_generation
+from .category_tree import get_category_tree
+
+logger = logging.getLogger(__name__)
+
+FEED_MAX_LENGTH = 500
+FANOUT_MAX_AUDIENCE = 1000
+
+_hot_categories = None
+
+
+def _favorites_through():
+    from accounts.models import UserProfile
+    return UserProfile.favorite_categories.through
+
+
+def get_hot_category_ids():
+    """Categories followed by more than FANOUT_MAX_AUDIENCE users"""
+    global _hot_categories
+
+    generation = get_generation('favorites')
+    if _hot_categories is None or _hot_categories[0] != generation:
+        hot_ids = set(
+            _favorites_through().objects.values('category_id').annotate(
+                audience=Count('id')
+            ).filter(audience__gt=FANOUT_MAX_AUDIENCE).values_list('category_id', flat=True)
+        )
+        _hot_categories = (generation, hot_ids)
+    return _hot_categories[1]
+
+
+def _post_category_ids(post):
+    category_ids = set(post.additional_categories.values_list('id', flat=True))
+    if post.primary_category_id:
+        category_ids.add(post.primary_category_id)
+    return category_ids
+
+
+def _posts_in_categories(category_ids):
+    from .models import Post
+    return Post.objects.filter(
+        Q(primary_category_id__in=category_ids) |
+        Q(additional_categories__id__in=category_ids)
+    ).distinct()
+
+
+def fan_out_post(post, replace=False):
+    """
+    Write feed rows for everyone following one of the post's categories
+
+    Args:
+        post: Saved Post instance
+        replace: Drop the post's existing rows first (categories may have changed)
+
+    Returns:
+        Number of users the post was delivered to
+    """
+    from accounts.models import UserProfile
+    from .models import FeedEntry
+
+    tree = get_category_tree()
+    target_category_ids = tree.ancestors(_post_category_ids(post)) - get_hot_category_ids()
+
+    with transaction.atomic():
+        if replace:
+            FeedEntry.objects.filter(post_id=post.id).delete()
+
+        if not target_category_ids:
+            return 0
+
+        user_ids = UserProfile.objects.filter(
+            favorite_categories__in=target_category_ids
+        ).values_list('user_id', flat=True).distinct()
+
+        entries = [
+            FeedEntry(user_id=user_id, post_id=post.id, post_created_at=post.created_at)
+            for user_id in user_ids
+        ]
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True, batch_size=1000)
+
+    return len(entries)
+
+
+def cooled_category_ids(removed_followers):
+    """
+    Categories that stopped being hot because followers were removed
+
+    Args:
+        removed_followers: {category_id: number of followers just removed},
+            read after the removal (inside its transaction)
+
+    Returns:
+        Set of category ids whose audience went from above FANOUT_MAX_AUDIENCE to at most it
+    """
+    removed_followers = {category_id: count for category_id, count in removed_followers.items() if count}
+    if not removed_followers:
+        return set()
+
+    audience = dict(
+        _favorites_through().objects.filter(category_id__in=list(removed_followers)).values(
+            'category_id'
+        ).annotate(audience=Count('id')).values_list('category_id', 'audience')
+    )
+    return {
+        category_id for category_id, count in removed_followers.items()
+        if audience.get(category_id, 0) <= FANOUT_MAX_AUDIENCE < audience.get(category_id, 0) + count
+    }
+
+
+def backfill_category_followers(category_ids):
+    """
+    Write the newest posts of (formerly hot) categories into their followers' feeds
+
+    Posts published while a category was hot were only merged on read. Once
+    it is cold they would disappear from its followers' feeds, so each
+    follower gets feed rows for the category subtree's FEED_MAX_LENGTH newest
+    posts. One INSERT ... SELECT per category; existing rows are kept.
+
+    Returns:
+        Number of feed rows written
+    """
+    from accounts.models import UserProfile
+    from .models import FeedEntry
+
+    table = FeedEntry._meta.db_table
+    tree = get_category_tree()
+    written = 0
+    for category_id in category_ids:
+        followers_sql, followers_params = UserProfile.objects.filter(
+            favorite_categories=category_id
+        ).values('user_id').query.sql_with_params()
+        posts_sql, posts_params = _posts_in_categories(tree.descendants([category_id])).order_by(
+            '-created_at'
+        ).values('id', 'created_at')[:FEED_MAX_LENGTH].query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {table} (user_id, post_id, post_created_at)
+                SELECT followers.user_id, latest.id, latest.created_at
+                FROM ({followers_sql}) followers
+                CROSS JOIN ({posts_sql}) latest
+                ON CONFLICT (user_id, post_id) DO NOTHING
+            """, [*followers_params, *posts_params])
+            written += cursor.rowcount
+
+    if written:
+        logger.info(f"Backfilled {written} feed rows for categories no longer hot: {sorted(category_ids)}")
+    return written
+
+
+def rebuild_user_feed(user_id):
+    """Recreate a user's feed rows from their current favorites"""
+    from .models import FeedEntry
+
+    favorite_ids = set(
+        _favorites_through().objects.filter(userprofile__user_id=user_id).values_list('category_id', flat=True)
+    )
+    cold_favorite_ids = favorite_ids - get_hot_category_ids()
+
+    with transaction.atomic():
+        FeedEntry.objects.filter(user_id=user_id).delete()
+        if not cold_favorite_ids:
+            return 0
+
+        category_ids = get_category_tree().descendants(cold_favorite_ids)
+        latest_posts = _posts_in_categories(category_ids).order_by('-created_at').values_list(
+            'id', 'created_at'
+        )[:FEED_MAX_LENGTH]
+
+        entries = [
+            FeedEntry(user_id=user_id, post_id=post_id, post_created_at=created_at)
+            for post_id, created_at in latest_posts
+        ]
+        FeedEntry.objects.bulk_create(entries, ignore_conflicts=True, batch_size=1000)
+
+    return len(entries)
+
+
+def trim_feeds(max_length=FEED_MAX_LENGTH):
+    """Delete feed rows beyond each user's newest max_length entries"""
+    from .models import FeedEntry
+
+    table = FeedEntry._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            DELETE FROM {table} WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY user_id ORDER BY post_created_at DESC, post_id DESC
+                    ) AS position
+                    FROM {table}
+                ) ranked
+                WHERE ranked.position > %s
+            )
+        """, [max_length])
+        return cursor.rowcount
+
+
+def read_feed(user_id, favorite_ids, limit=FEED_MAX_LENGTH):
+    """
+    Newest post ids from the user's favorites feed
+
+    Args:
+        user_id: Feed owner
+        favorite_ids: The user's favorite category ids
+        limit: Number of ids to return
+
+    Returns:
+        List of post ids, newest first
+    """
+    from .models import FeedEntry
+
+    streams = [
+        FeedEntry.objects.filter(user_id=user_id).order_by(
+            '-post_created_at', '-post_id'
+        ).values_list('post_created_at', 'post_id')[:limit]
+    ]
+
+    # Hot favorites were not fanned out - read their newest posts directly
+    hot_favorite_ids = set(favorite_ids) & get_hot_category_ids()
+    if hot_favorite_ids:
+        category_ids = get_category_tree().descendants(hot_favorite_ids)
+        streams.append(
+            _posts_in_categories(category_ids).order_by('-created_at', '-id').values_list(
+                'created_at', 'id'
+            )[:limit]
+        )
+
+    post_ids = []
+    seen = set()
+    merged = heapq.merge(*(list(stream) for stream in streams), reverse=True)
+    for _, post_id in merged:
+        if post_id not in seen:
+            seen.add(post_id)
+            post_ids.append(post_id)
+            if len(post_ids) >= limit:
+                break
+    return post_ids
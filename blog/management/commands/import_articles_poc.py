@@ -13,7 +13,9 @@ import logging
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from blog.models import Category, Post
+from blog.category_tree import get_category_tree
 from gnn_models.embeddings import get_embedding_manager
+from gnn_models.auto_categorization import HierarchicalCategoryClassifier
 import numpy as np
 
 logger = logging.getLogger(__name__)
@@ -28,6 +30,12 @@ class ArticleImporter:
         self.embedding_manager = get_embedding_manager()
         self.category_embeddings = {}
         self._prepare_category_embeddings()
+        # Coarse-to-fine: only the best branches of each level are scored
+        self.classifier = HierarchicalCategoryClassifier(
+            list(self.category_embeddings),
+            [cat_data['embedding'] for cat_data in self.category_embeddings.values()],
+            get_category_tree()
+        )
 
     def _prepare_category_embeddings(self):
         """Generate embeddings for all categories (name + description)"""
@@ -62,34 +70,38 @@ class ArticleImporter:
         Find best matching categories for article using AI embeddings
 
         Returns:
-            List of (category, similarity_score) tuples
+            List of dicts (category, similarity, name, path, levels) - one per
+            root-to-category path, best first
         """
-        # Combine title and abstract
-        combined_text = f"{title} {abstract}"
-
-        # Generate embedding for article
-        article_embedding = self.embedding_manager.encode_texts([combined_text])[0]
-
-        # Calculate similarities with all categories
-        similarities = []
-        for cat_id, cat_data in self.category_embeddings.items():
-            similarity = self.embedding_manager.calculate_similarity(
-                article_embedding,
-                cat_data['embedding']
-            )
+        return self._find_best_categories_batch([(title, abstract)], top_k, min_similarity)[0]
 
-            if similarity >= min_similarity:
-                similarities.append({
-                    'category': cat_data['category'],
-                    'similarity': float(similarity),
-                    'name': cat_data['name'],
-                    'path': cat_data['full_path']
-                })
-
-        # Sort by similarity (highest first)
-        similarities.sort(key=lambda x: x['similarity'], reverse=True)
+    def _find_best_categories_batch(self, texts, top_k=3, min_similarity=0.25):
+        """
+        Classify many (title, abstract) pairs with one encode call
 
-        return similarities[:top_k]
+        Returns:
+            Per text, the list described in _find_best_categories
+        """
+        if not texts:
+            return []
+
+        # Combine title and abstract, one embedding per article
+        article_embeddings = self.embedding_manager.encode_texts([f"{title} {abstract}" for title, abstract in texts])
+
+        results = []
+        for paths in self.classifier.classify(article_embeddings, top_k=top_k, min_similarity=min_similarity):
+            results.append([
+                {
+                    'category': self.category_embeddings[found['category_id']]['category'],
+                    'similarity': found['similarity'],
+                    'name': found['category_name'],
+                    'path': self.category_embeddings[found['category_id']]['full_path'],
+                    # Similarity/confidence at every level of the path
+                    'levels': found['path']
+                }
+                for found in paths
+            ])
+        return results
 
     def import_from_arxiv(self, queries, max_results_per_query=5):
         """Import articles from arXiv"""
@@ -312,20 +324,31 @@ class ArticleImporter:
             'details': []
         }
 
+        # Skip duplicates before encoding (one query for all titles)
+        seen_titles = set(Post.objects.filter(
+            title__in=[article['title'] for article in articles]
+        ).values_list('title', flat=True))
+        new_articles = []
         for article in articles:
-            try:
-                # Check if already exists
-                if Post.objects.filter(title=article['title']).exists():
-                    logger.info(f"Skipping duplicate: {article['title'][:50]}...")
-                    results['skipped'] += 1
-                    continue
-
-                # Find best categories using AI
-                categories = self._find_best_categories(
-                    article['title'],
-                    article['content']
-                )
+            if article['title'] in seen_titles:
+                logger.info(f"Skipping duplicate: {article['title'][:50]}...")
+                results['skipped'] += 1
+                continue
+            seen_titles.add(article['title'])
+            new_articles.append(article)
+
+        # Find best categories using AI (all new articles in one batch)
+        try:
+            categories_per_article = self._find_best_categories_batch(
+                [(article['title'], article['content']) for article in new_articles]
+            )
+        except Exception as e:
+            logger.error(f"Failed to categorize {len(new_articles)} articles: {e}")
+            results['failed'] += len(new_articles)
+            return results
 
+        for article, categories in zip(new_articles, categories_per_article):
+            try:
                 if not categories:
                     logger.warning(f"No suitable categories found for: {article['title'][:50]}...")
                     results['failed'] += 1
@@ -0,0 +1,51 @@
+"""
+Django management command to rebuild materialized favorites feeds
+
+Usage:
+    python manage.py rebuild_feeds               # All users with favorites
+    python manage.py rebuild_feeds --user-id 42  # A single user
+    python manage.py rebuild_feeds --trim-only   # Just cap feed lengths
+"""
+
+from django.core.management.base import BaseCommand
+from accounts.models import UserProfile
+from blog.feeds import rebuild_user_feed, trim_feeds, FEED_MAX_LENGTH
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user favorites feeds and trim them to the maximum length'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Only rebuild the feed of this user'
+        )
+        parser.add_argument(
+            '--trim-only',
+            action='store_true',
+            help='Do not rebuild, only delete entries beyond the feed length'
+        )
+
+    def handle(self, *args, **options):
+        if not options['trim_only']:
+            if options['user_id']:
+                user_ids = [options['user_id']]
+            else:
+                user_ids = list(
+                    UserProfile.objects.filter(
+                        favorite_categories__isnull=False
+                    ).values_list('user_id', flat=True).distinct()
+                )
+
+            self.stdout.write(f'Rebuilding feeds for {len(user_ids)} users...')
+            total_entries = 0
+            for index, user_id in enumerate(user_ids, start=1):
+                total_entries += rebuild_user_feed(user_id)
+                if index % 100 == 0:
+                    self.stdout.write(f'  {index}/{len(user_ids)} users, {total_entries} entries')
+
+            self.stdout.write(self.style.SUCCESS(f'Feeds rebuilt: {total_entries} entries written'))
+
+        trimmed = trim_feeds()
+        self.stdout.write(self.style.SUCCESS(f'Trimmed {trimmed} entries beyond {FEED_MAX_LENGTH} per user'))
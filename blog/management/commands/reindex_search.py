@@ -0,0 +1,88 @@
+"""
+Django management command to backfill Post.search_vector
+
+New writes are covered by the database trigger (blog migration 0008); this
+command repairs rows that were loaded before the trigger existed or that
+have NULL / outdated vectors. Work is done in id-range batches so each
+UPDATE touches a bounded number of rows.
+
+Usage:
+    python manage.py reindex_search
+    python manage.py reindex_search --batch-size 5000
+    python manage.py reindex_search --only-missing  # Skip the outdated-vector check
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from blog.models import Post
+
+# Must stay in sync with blog_post_search_vector_update() from migration 0008
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector(COALESCE(title, '')), 'A') || "
+    "setweight(to_tsvector(COALESCE(content, '')), 'B')"
+)
+
+
+class Command(BaseCommand):
+    help = 'Backfill NULL or outdated post search vectors in batched id ranges'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Width of each id range processed in one UPDATE (default: 1000)'
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only fill NULL vectors, do not compare existing ones'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        only_missing = options['only_missing']
+
+        bounds = Post.objects.aggregate(min_id=Min('id'), max_id=Max('id'))
+        if bounds['min_id'] is None:
+            self.stdout.write('No posts to index.')
+            return
+
+        if only_missing:
+            stale_condition = "search_vector IS NULL"
+        else:
+            stale_condition = f"search_vector IS DISTINCT FROM ({SEARCH_VECTOR_EXPRESSION})"
+
+        sql = (
+            f"UPDATE {Post._meta.db_table} "
+            f"SET search_vector = {SEARCH_VECTOR_EXPRESSION} "
+            f"WHERE id BETWEEN %s AND %s AND {stale_condition}"
+        )
+
+        min_id, max_id = bounds['min_id'], bounds['max_id']
+        total_batches = (max_id - min_id) // batch_size + 1
+        total_updated = 0
+        started = time.monotonic()
+
+        self.stdout.write(f'Reindexing posts {min_id}..{max_id} in {total_batches} batches...')
+
+        for batch_number, start_id in enumerate(range(min_id, max_id + 1, batch_size), start=1):
+            end_id = min(start_id + batch_size - 1, max_id)
+
+            # One short transaction per batch keeps row locks brief
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [start_id, end_id])
+                updated = cursor.rowcount
+
+            total_updated += updated
+            self.stdout.write(
+                f'Batch {batch_number}/{total_batches}: ids {start_id}-{end_id}, '
+                f'updated {updated} (total {total_updated})'
+            )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Search reindex completed: {total_updated} posts updated in {elapsed:.1f}s')
+        )
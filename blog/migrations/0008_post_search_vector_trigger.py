@@ -0,0 +1,43 @@
+"""
+Maintain Post.search_vector inside PostgreSQL.
+
+A BEFORE INSERT/UPDATE trigger recomputes the vector whenever title or
+content is written, so bulk_create(), queryset.update() and raw imports
+stay searchable without the extra UPDATE that Post.save() used to issue.
+Existing rows are backfilled with `manage.py reindex_search`.
+"""
+
+from django.db import migrations
+
+
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION blog_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector(COALESCE(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS blog_post_search_vector_trigger ON blog_post;
+CREATE TRIGGER blog_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, content ON blog_post
+    FOR EACH ROW EXECUTE FUNCTION blog_post_search_vector_update();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS blog_post_search_vector_trigger ON blog_post;
+DROP FUNCTION IF EXISTS blog_post_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_alter_post_options_post_search_vector_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+    ]
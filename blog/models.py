@@ -1,6 +1,12 @@
-from django.db import models
-from django.contrib.postgres.search import SearchVector, SearchVectorField
+import logging
+from django.db import models, transaction
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.postgres.indexes import GinIndex
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from topicsloop.cache import bump_generation
+
+logger = logging.getLogger(__name__)
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -176,11 +182,9 @@ class Post(models.Model):
         return self.title
 
     def save(self, *args, **kwargs):
-        # Update search vector when saving
+        # search_vector is maintained by a database trigger (migration 0008),
+        # so there is no extra UPDATE here - bulk loads stay searchable too.
         super().save(*args, **kwargs)
-        self.__class__.objects.filter(pk=self.pk).update(
-            search_vector=SearchVector('title', weight='A') + SearchVector('content', weight='B')
-        )
 
         # Clear category post count cache when post is saved
         # (affects primary category and all its parents)
@@ -209,3 +213,107 @@ class Comment(models.Model):
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post}'
+
+
+class FeedEntry(models.Model):
+    """
+    Materialized favorites feed: one row per (user, post) the user should see
+    Written by fan-out when posts are saved (see blog.feeds); posts in very
+    popular categories are merged in at read time instead.
+    """
+    user = models.ForeignKey('accounts.CustomUser', on_delete=models.CASCADE, related_name='feed_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='feed_entries')
+    post_created_at = models.DateTimeField(help_text="Copy of post.created_at for index-only feed reads")
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-post_created_at']),
+        ]
+
+    def __str__(self):
+        return f'Feed entry for user {self.user_id}: post {self.post_id}'
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver(m2m_changed, sender=Post.additional_categories.through)
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_caches(sender, **kwargs):
+    """Bump the posts generation so cached listings and facets are rebuilt"""
+    if kwargs.get('action', 'post_').startswith('post_'):
+        bump_generation('posts')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_saved_post(sender, instance, **kwargs):
+    """Push new/edited posts into followers' feeds"""
+    from .feeds import fan_out_post
+    fan_out_post(instance, replace=not kwargs.get('created', False))
+
+
+@receiver(m2m_changed, sender=Post.additional_categories.through)
+def fan_out_recategorized_post(sender, instance, action, reverse, pk_set, **kwargs):
+    """Additional categories change after save - refresh the post's feed rows"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    from .feeds import fan_out_post
+    if reverse:
+        # category.secondary_posts.add(...) - instance is the category
+        for post in Post.objects.filter(id__in=pk_set or []):
+            fan_out_post(post, replace=True)
+    else:
+        fan_out_post(instance, replace=action != 'post_add')
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_primary_category(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the stored primary category so post_save can tell a recategorization"""
+    if raw or instance.pk is None or (update_fields is not None and 'primary_category' not in update_fields):
+        return
+    instance._previous_primary_category_id = Post.objects.filter(pk=instance.pk).values_list(
+        'primary_category_id', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Post)
+def move_recategorized_post_centroids(sender, instance, created, **kwargs):
+    """Primary category changed - move the post's vectors between category centroids after commit"""
+    previous_id = instance.__dict__.pop('_previous_primary_category_id', instance.primary_category_id)
+    if created or previous_id == instance.primary_category_id:
+        return
+
+    def move():
+        try:
+            from ai_models.models import PostEmbedding
+            from gnn_models.centroids import apply_centroid_changes
+            for model_name, vector in PostEmbedding.objects.filter(post_id=instance.pk).values_list(
+                'model_name', 'embedding_vector'
+            ):
+                apply_centroid_changes(
+                    [(previous_id, vector, -1), (instance.primary_category_id, vector, 1)],
+                    model_name=model_name
+                )
+        except Exception as e:
+            logger.warning(f"Centroid update failed for recategorized post {instance.pk}: {e}")
+
+    transaction.on_commit(move)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_caches(sender, **kwargs):
+    """Bump the categories generation when the tree changes"""
+    bump_generation('categories')
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_text_embedding(sender, instance, **kwargs):
+    """Re-encode the category (and children, whose text includes its name) after commit"""
+    def refresh():
+        try:
+            from gnn_models.category_text_embeddings import refresh_category_text_embeddings
+            category_ids = [instance.id] + list(instance.subcategories.values_list('id', flat=True))
+            refresh_category_text_embeddings(category_ids)
+        except Exception as e:
+            logger.warning(f"Category text embedding refresh failed for {instance.id}: {e}")
+
+    transaction.on_commit(refresh)
@@ -1,3 +1,175 @@
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import CustomUser
+from blog import feeds
+from blog.models import Category, FeedEntry, Post
+
+
+def _create_user(name):
+    return CustomUser.objects.create_user(username=name, email=f'{name}@example.com')
+
+
+def _feed_post_ids(user):
+    return set(FeedEntry.objects.filter(user=user).values_list('post_id', flat=True))
+
+
+class FeedTestCase(TestCase):
+    """Feed tests run with a hot threshold of one follower"""
+
+    def setUp(self):
+        patcher = mock.patch.object(feeds, 'FANOUT_MAX_AUDIENCE', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # The hot set is memoized per favorites generation - start from the patched threshold
+        feeds._hot_categories = None
+
+        self.author = _create_user('author')
+        self.science = Category.objects.create(name='Science')
+        self.physics = Category.objects.create(name='Physics', parent=self.science)
+
+    def follow(self, user, *categories):
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile.favorite_categories.add(*categories)
+
+    def unfollow(self, user, *categories):
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile.favorite_categories.remove(*categories)
+
+    def publish(self, title, category, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(title=title, content='text', author=self.author,
+                                       primary_category=category, **kwargs)
+
+
+class HotCategoryTransitionTests(FeedTestCase):
+
+    def test_cooled_category_is_backfilled_for_remaining_followers(self):
+        alice, bob = _create_user('alice'), _create_user('bob')
+        self.follow(alice, self.science)
+        self.follow(bob, self.science)
+        self.assertEqual(feeds.get_hot_category_ids(), {self.science.id})
+
+        # Hot: not fanned out, only merged on read
+        post = self.publish('While hot', self.physics)
+        self.assertNotIn(post.id, _feed_post_ids(alice))
+        self.assertIn(post.id, feeds.read_feed(alice.id, [self.science.id]))
+
+        # Bob leaves - Science is cold again and Alice must keep the post
+        self.unfollow(bob, self.science)
+        self.assertEqual(feeds.get_hot_category_ids(), set())
+        self.assertIn(post.id, _feed_post_ids(alice))
+        self.assertEqual(feeds.read_feed(alice.id, [self.science.id]), [post.id])
+        self.assertEqual(_feed_post_ids(bob), set())
+
+    def test_reverse_remove_cools_category(self):
+        alice, bob = _create_user('alice'), _create_user('bob')
+        self.follow(alice, self.science)
+        self.follow(bob, self.science)
+        post = self.publish('While hot', self.science)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.science.interested_users.remove(bob.profile)
+        self.assertIn(post.id, _feed_post_ids(alice))
+
+    def test_category_still_hot_is_not_backfilled(self):
+        alice, bob, carol = _create_user('alice'), _create_user('bob'), _create_user('carol')
+        for user in (alice, bob, carol):
+            self.follow(user, self.science)
+        post = self.publish('While hot', self.science)
+
+        self.unfollow(carol, self.science)
+        self.assertEqual(feeds.get_hot_category_ids(), {self.science.id})
+        self.assertNotIn(post.id, _feed_post_ids(alice))
+        self.assertIn(post.id, feeds.read_feed(alice.id, [self.science.id]))
+
+
+class FanOutTests(FeedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.art = Category.objects.create(name='Art')
+        self.alice, self.bob, self.carol = _create_user('alice'), _create_user('bob'), _create_user('carol')
+        self.follow(self.alice, self.science)
+        self.follow(self.bob, self.physics)
+        self.follow(self.carol, self.art)
+
+    def test_followers_of_ancestor_categories_receive_post(self):
+        post = self.publish('Quarks', self.physics)
+        self.assertIn(post.id, _feed_post_ids(self.alice))
+        self.assertIn(post.id, _feed_post_ids(self.bob))
+        self.assertNotIn(post.id, _feed_post_ids(self.carol))
+
+    def test_additional_categories_are_fanned_out(self):
+        post = self.publish('Painted atoms', self.art)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.additional_categories.add(self.physics)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(post=post).values_list('user_id', flat=True)),
+            {self.alice.id, self.bob.id, self.carol.id}
+        )
+
+    def test_recategorized_post_replaces_feed_rows(self):
+        post = self.publish('Quarks', self.physics)
+        post.primary_category = self.art
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertNotIn(post.id, _feed_post_ids(self.alice))
+        self.assertNotIn(post.id, _feed_post_ids(self.bob))
+        self.assertIn(post.id, _feed_post_ids(self.carol))
+
+    def test_removed_additional_category_replaces_feed_rows(self):
+        post = self.publish('Painted atoms', self.art)
+        post.additional_categories.add(self.physics)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.additional_categories.remove(self.physics)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(post=post).values_list('user_id', flat=True)), {self.carol.id}
+        )
+
+    def test_hot_category_is_merged_on_read(self):
+        # A second Science follower makes it hot (threshold is one follower)
+        dave = _create_user('dave')
+        self.follow(dave, self.science, self.art)
+        older = self.publish('Older painting', self.art)
+        hot = self.publish('Hot physics', self.physics)
+
+        self.assertNotIn(hot.id, _feed_post_ids(dave))
+        self.assertIn(hot.id, _feed_post_ids(self.bob))   # Physics itself is still cold
+        self.assertEqual(feeds.read_feed(dave.id, [self.science.id, self.art.id]), [hot.id, older.id])
+        self.assertEqual(feeds.read_feed(dave.id, [self.science.id, self.art.id], limit=1), [hot.id])
+
+
+class FavoritesFeedRebuildTests(FeedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.alice = _create_user('alice')
+        self.post = self.publish('Quarks', self.physics)
+
+    def test_add_favorite_backfills_feed(self):
+        self.follow(self.alice, self.science)
+        self.assertEqual(_feed_post_ids(self.alice), {self.post.id})
+
+    def test_remove_favorite_empties_feed(self):
+        self.follow(self.alice, self.science)
+        self.unfollow(self.alice, self.science)
+        self.assertEqual(_feed_post_ids(self.alice), set())
+
+    def test_clear_favorites_empties_feed(self):
+        self.follow(self.alice, self.science)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.profile.favorite_categories.clear()
+        self.assertEqual(_feed_post_ids(self.alice), set())
+
+    def test_category_side_clear_empties_followers_feeds(self):
+        self.follow(self.alice, self.physics)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.physics.interested_users.clear()
+        self.assertEqual(_feed_post_ids(self.alice), set())
+
+    def test_category_side_add_backfills_feed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.science.interested_users.add(self.alice.profile)
+        self.assertEqual(_feed_post_ids(self.alice), {self.post.id})
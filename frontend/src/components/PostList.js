@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
-import { useSearchParams, useNavigate } from 'react-router-dom';
-import { fetchPosts, fetchUserProfile } from '../services/api';
+import { useSearchParams, useNavigate, Link } from 'react-router-dom';
+import { fetchPosts, fetchUserProfile, fetchRecommendations, trackEvent } from '../services/api';
 import { useAuth } from '../contexts/AuthContext';
 import PostCard from './PostCard';
 import Pagination from './Pagination';
@@ -109,6 +109,43 @@ const PostsSearchComponent = () => {
   );
 };
 
+// Recommended posts for logged-in users (two-stage recommender)
+const RecommendedPosts = () => {
+  const [recommendations, setRecommendations] = useState([]);
+
+  useEffect(() => {
+    fetchRecommendations({ limit: 5 })
+      .then(data => setRecommendations(data.recommendations || []))
+      .catch(err => console.warn('Recommendations unavailable:', err));
+  }, []);
+
+  if (!recommendations.length) return null;
+
+  return (
+    <div style={{
+      marginBottom: '1rem',
+      padding: '0.75rem 1rem',
+      borderRadius: '6px',
+      border: '1px solid #e9ecef'
+    }}>
+      <div style={{ fontWeight: '600', color: '#2c3e50', marginBottom: '0.5rem' }}>✨ Recommended for you</div>
+      <ul style={{ margin: 0, paddingLeft: '1.25rem' }}>
+        {recommendations.map(item => (
+          <li key={item.post.id} style={{ marginBottom: '0.25rem' }}>
+            <Link
+              to={`/posts/${item.post.id}`}
+              onClick={() => trackEvent('recommendation_click', item.post.id, { source: 'post_list' })}
+            >
+              {item.post.title}
+            </Link>
+            <span style={{ marginLeft: '0.5rem', color: '#6c757d', fontSize: '0.85rem' }}>{item.reason}</span>
+          </li>
+        ))}
+      </ul>
+    </div>
+  );
+};
+
 const PostList = () => {
   const [searchParams] = useSearchParams();
   const navigate = useNavigate();
@@ -272,6 +309,9 @@ const PostList = () => {
         </div>
       </div>
 
+      {/* Recommendations - clicks are recorded as interaction events */}
+      {isAuthenticated && <RecommendedPosts />}
+
       {/* Search Component - only show if user has favorite categories */}
       {isAuthenticated && userProfile?.favorite_categories?.length > 0 && (
         <PostsSearchComponent />
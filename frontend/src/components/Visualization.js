@@ -2,7 +2,7 @@ import React, { useState, useEffect, useRef, useCallback, useMemo } from 'react'
 import { Network } from 'vis-network';
 import { DataSet } from 'vis-data';
 import axios from '../api/axios';
-import { fetchPostNetwork, fetchSimilarPosts, fetchSimilarCategories } from '../services/api';
+import { fetchPostNetwork, fetchSimilarPosts, fetchSimilarCategories, trackEvent } from '../services/api';
 
 const Visualization = () => {
   const networkRef = useRef(null);
@@ -59,9 +59,16 @@ const Visualization = () => {
 
   // Removed node menu state - using overlay buttons instead
 
+  // Post whose similar posts are highlighted, and their ids (for similar_click events)
+  const similarContext = useRef({ sourcePostId: null, postIds: new Set() });
+
   // Handle post node click
   const handlePostNodeClick = useCallback((node) => {
     console.log('🎯 Opening post details for:', node.label);
+    const { sourcePostId, postIds } = similarContext.current;
+    if (postIds.has(String(node.post_id))) {
+      trackEvent('similar_click', node.post_id, { context_post_id: sourcePostId, source: 'graph' });
+    }
     setSelectedPost(node);
     setShowPostModal(true);
   }, []);
@@ -74,6 +81,7 @@ const Visualization = () => {
 
   // Clear similarity highlighting
   const clearSimilarityHighlighting = useCallback(() => {
+    similarContext.current = { sourcePostId: null, postIds: new Set() };
     if (networkInstance.current) {
       const nodes = networkInstance.current.body.data.nodes;
       const edges = networkInstance.current.body.data.edges;
@@ -212,6 +220,7 @@ const Visualization = () => {
   const handleFindSimilarPosts = async (postId) => {
     try {
       console.log('🚀 Starting similarity search for post ID:', postId);
+      trackEvent('graph_focus', postId, { source: 'find_similar' });
       // Don't set loading state to prevent re-renders that destroy the network
 
       const similarPostsData = await fetchSimilarPosts(postId, {
@@ -260,6 +269,7 @@ const Visualization = () => {
 
           // Extract similar post IDs and prepare highlights
           const similarPostIds = similarPostsData.similar_posts.map(sp => sp.post.id);
+          similarContext.current = { sourcePostId: postId, postIds: new Set(similarPostIds.map(String)) };
           console.log('🎯 Looking for similar post IDs:', similarPostIds);
 
           let highlightedCount = 0;
@@ -831,7 +841,9 @@ const Visualization = () => {
     const renderStart = performance.now();
 
     // 🎯 Apply circular layout before creating DataSet
-    const arrangedNodes = arrangeNodesInCircles([...graphData.nodes]);
+    // 📍 Server-side layout: nodes already carry fixed x/y (physics off), keep them as is
+    const precomputedLayout = graphData.stats?.layout === 'precomputed';
+    const arrangedNodes = precomputedLayout ? graphData.nodes : arrangeNodesInCircles([...graphData.nodes]);
 
     const nodes = new DataSet(arrangedNodes);
     const edges = new DataSet(graphData.edges);
@@ -94,6 +94,109 @@ export const fetchUserProfile = async () => {
   return response.data;
 };
 
+// === COLUMNAR GRAPH DECODING ===
+// Viz endpoints called with ?format=columnar send nodes/edges as parallel
+// arrays (see api/wire.py). A column is a plain array, a lookup table
+// {table, index} (-1 = field absent) or node positions {node} for edge ends.
+const decodeColumn = (column, nodeIds) => {
+  if (Array.isArray(column)) return column;
+  if (column.node) return column.node.map((position) => nodeIds[position]);
+  return column.index.map((position) => {
+    if (position === -1) return undefined;
+    const value = column.table[position];
+    // Table entries are shared between rows - copy objects so vis.js updates stay per-row
+    return value !== null && typeof value === 'object' ? structuredClone(value) : value;
+  });
+};
+
+const decodeRows = (block, nodeIds) => {
+  const rows = Array.from({ length: block.length }, () => ({}));
+  Object.entries(block.columns).forEach(([field, column]) => {
+    decodeColumn(column, nodeIds).forEach((value, row) => {
+      if (value !== undefined) rows[row][field] = value;
+    });
+  });
+  return rows;
+};
+
+export const decodeColumnar = (data) => {
+  if (!data || data.format !== 'columnar') return data;
+
+  const { format, version, nodes: nodeBlock, edges: edgeBlock, ...rest } = data;
+  const nodes = decodeRows(nodeBlock, []);
+  const edges = decodeRows(edgeBlock, nodes.map((node) => node.id));
+  return { ...rest, nodes, edges };
+};
+
+// === NETWORK TILES (zoom-based progressive disclosure) ===
+// Tiles already loaded in this session: 'z/x/y' -> { etag, data }
+const tileCache = new Map();
+
+export const fetchNetworkTile = async (z, x, y, graph = 'posts') => {
+  const key = `${graph}:${z}/${x}/${y}`;
+  const cached = tileCache.get(key);
+  const response = await publicAPI.get(`/api/viz/tiles/${z}/${x}/${y}/`, {
+    params: { graph, format: 'columnar' },
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+    validateStatus: (code) => code === 200 || code === 304,
+  });
+
+  if (response.status === 304 && cached) return cached.data;
+
+  const data = decodeColumnar(response.data);
+  tileCache.set(key, { etag: response.headers.etag, data });
+  return data;
+};
+
+// Tile coordinates covering a viewport box (layout coordinates) at zoom z
+export const tilesForViewport = (world, z, viewport) => {
+  const tilesPerSide = 2 ** z;
+  const tileSize = (world.max_x - world.min_x) / tilesPerSide;
+  const clamp = (value) => Math.min(tilesPerSide - 1, Math.max(0, value));
+  const fromX = clamp(Math.floor((viewport.minX - world.min_x) / tileSize));
+  const toX = clamp(Math.floor((viewport.maxX - world.min_x) / tileSize));
+  const fromY = clamp(Math.floor((viewport.minY - world.min_y) / tileSize));
+  const toY = clamp(Math.floor((viewport.maxY - world.min_y) / tileSize));
+
+  const tiles = [];
+  for (let x = fromX; x <= toX; x += 1) {
+    for (let y = fromY; y <= toY; y += 1) tiles.push([x, y]);
+  }
+  return tiles;
+};
+
+// Fetch the tiles of a viewport that are not on screen yet (`loaded` = Set of 'z/x/y')
+export const fetchViewportTiles = async (world, z, viewport, loaded = new Set(), graph = 'posts') => {
+  const missing = tilesForViewport(world, z, viewport).filter(([x, y]) => !loaded.has(`${z}/${x}/${y}`));
+  const tiles = await Promise.all(missing.map(([x, y]) => fetchNetworkTile(z, x, y, graph)));
+  missing.forEach(([x, y]) => loaded.add(`${z}/${x}/${y}`));
+  return {
+    nodes: tiles.flatMap((tile) => tile.nodes),
+    edges: tiles.flatMap((tile) => tile.edges),
+  };
+};
+
+// === GRAPH DELTAS ===
+// Last post network received ({ version, data }) - base for ?since= requests,
+// so refocusing or changing thresholds only downloads what changed
+let lastPostNetwork = null;
+
+export const applyGraphDelta = (base, response) => {
+  const { delta, base_version: baseVersion, ...rest } = response;
+  const removedNodes = new Set(delta.removed_nodes);
+  const updatedNodes = new Map(delta.updated_nodes.map((node) => [node.id, node]));
+  const removedEdges = new Set(delta.removed_edges);
+
+  return {
+    ...rest,
+    nodes: [
+      ...base.nodes.filter((node) => !removedNodes.has(node.id)).map((node) => updatedNodes.get(node.id) || node),
+      ...delta.added_nodes,
+    ],
+    edges: [...base.edges.filter((edge) => !removedEdges.has(edge.id)), ...delta.added_edges],
+  };
+};
+
 // === POST NETWORK API FUNCTIONS ===
 export const fetchPostNetwork = async (params = {}) => {
   const queryParams = new URLSearchParams();
@@ -112,6 +215,12 @@ export const fetchPostNetwork = async (params = {}) => {
   // 🎯 PERSONALIZATION: Add personalized parameter for favorite categories filtering
   if (params.personalized !== undefined) queryParams.append('personalized', params.personalized);
 
+  // 📦 Compact columnar payload (decoded below) unless explicitly disabled
+  if (params.columnar !== false) queryParams.append('format', 'columnar');
+
+  // 🔄 Only changes against the previous network (unless disabled)
+  if (params.delta !== false && lastPostNetwork) queryParams.append('since', lastPostNetwork.version);
+
   const url = `/api/viz/post-network/${queryParams.toString() ? `?${queryParams.toString()}` : ''}`;
 
   // Use authenticated API if personalized mode is enabled and token is available
@@ -119,7 +228,19 @@ export const fetchPostNetwork = async (params = {}) => {
   const token = localStorage.getItem('access_token');
   const apiInstance = (params.personalized && token) ? axios : publicAPI;
   const response = await apiInstance.get(url);
-  return response.data;
+  let data = decodeColumnar(response.data);
+
+  if (data.delta) {
+    // Another request replaced the base meanwhile - fetch the full network instead
+    if (!lastPostNetwork || data.base_version !== lastPostNetwork.version) {
+      return fetchPostNetwork({ ...params, delta: false });
+    }
+    data = applyGraphDelta(lastPostNetwork.data, data);
+  }
+
+  // Keep a private copy - the visualization mutates node objects (x/y)
+  if (data.version) lastPostNetwork = { version: data.version, data: structuredClone(data) };
+  return data;
 };
 
 export const fetchSimilarPosts = async (postId, params = {}) => {
@@ -136,6 +257,16 @@ export const fetchSimilarPosts = async (postId, params = {}) => {
   return response.data;
 };
 
+export const fetchRecommendations = async (params = {}) => {
+  const queryParams = new URLSearchParams();
+  if (params.limit) queryParams.append('limit', params.limit);
+  if (params.diversity !== undefined) queryParams.append('diversity', params.diversity);
+
+  const url = `/api/recommendations/${queryParams.toString() ? `?${queryParams.toString()}` : ''}`;
+  const response = await axios.get(url);
+  return response.data;
+};
+
 export const fetchSimilarCategories = async (categoryId, params = {}) => {
   const queryParams = new URLSearchParams();
 
@@ -146,4 +277,41 @@ export const fetchSimilarCategories = async (categoryId, params = {}) => {
   const url = `/api/categories/${categoryId}/similar/${queryParams.toString() ? `?${queryParams.toString()}` : ''}`;
   const response = await publicAPI.get(url);
   return response.data;
-};
\ No newline at end of file
+};
+
+// Interaction events - queued and sent in batches to /api/events/
+const EVENT_BATCH_SIZE = 20;
+const EVENT_FLUSH_MS = 5000;
+let eventQueue = [];
+let eventTimer = null;
+
+export const flushEvents = (onUnload = false) => {
+  clearTimeout(eventTimer);
+  eventTimer = null;
+  if (!eventQueue.length) return;
+  const events = eventQueue;
+  eventQueue = [];
+
+  if (onUnload) {
+    // keepalive lets the request outlive the page
+    const token = localStorage.getItem('access_token');
+    fetch(`${publicAPI.defaults.baseURL}/api/events/`, {
+      method: 'POST',
+      keepalive: true,
+      headers: { 'Content-Type': 'application/json', ...(token ? { Authorization: `Bearer ${token}` } : {}) },
+      body: JSON.stringify({ events }),
+    }).catch(() => {});
+    return;
+  }
+  axios.post('/api/events/', { events }).catch((error) => console.warn('Dropped interaction events:', error));
+};
+
+export const trackEvent = (type, postId, extra = {}) => {
+  eventQueue.push({ type, post_id: postId, ts: Date.now(), ...extra });
+  if (eventQueue.length >= EVENT_BATCH_SIZE) flushEvents();
+  else if (!eventTimer) eventTimer = setTimeout(flushEvents, EVENT_FLUSH_MS);
+};
+
+if (typeof window !== 'undefined') {
+  window.addEventListener('pagehide', () => flushEvents(true));
+}
@@ -1,6 +1,17 @@
 """
 Auto-categorization system using sentence transformers
 Analyzes post content and suggests additional categories based on semantic similarity
+
+Posts are scored in batches: stored PostEmbedding vectors are loaded for the
+whole batch (only posts without one are encoded, together), all of them are
+classified together by HierarchicalCategoryClassifier (one matrix product
+per tree level), and accepted suggestions are written with a single bulk_create on the
+additional_categories through table.
+
+Centroids come from the shared store in gnn_models.centroids
+(CategoryEmbedding rows, kept current incrementally by model signals).
+Every worker reloads its matrix lazily when the embeddings or categories
+generation changes, instead of querying each category itself.
 """
 
 import numpy as np
@@ -10,6 +21,180 @@ from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# Posts scored (and written) per batch in batch_auto_categorize
+BATCH_SIZE = 500
+# Posts accepted by one API batch request; full-corpus runs go through the auto_categorize command
+MAX_REQUEST_POSTS = 100
+# Categories with fewer embedded posts are not suggested
+MIN_CATEGORY_POSTS = 2
+
+
+# Branches kept per level by the hierarchical classifier
+BEAM_WIDTH = 3
+# Similarity needed to descend into a category when suggesting; ancestors are broad
+# and score lower than the specific category a text belongs to
+BEAM_MIN_SIMILARITY = 0.3
+# Softmax temperature turning per-level similarities into confidences
+CONFIDENCE_TEMPERATURE = 0.05
+_PAD = -2
+
+
+class HierarchicalCategoryClassifier:
+    """
+    Coarse-to-fine classification over the category tree (beam search)
+
+    Level 0 is scored first; each following level only scores the children
+    of the beam_width best branches so far. All texts of a batch are scored
+    with one matrix product per level against the union of their candidate
+    children, so the cost grows with beam width x depth instead of the
+    number of categories.
+
+    A branch ends at a leaf, or at the deepest category whose children all
+    fall below beam_min_similarity. Its result is the deepest category on
+    the branch that reaches min_similarity, so a broad ancestor may score
+    below the threshold its descendant clears. Results are whole
+    root-to-category paths with the similarity and confidence (softmax over
+    that level's candidates) of every step.
+    """
+
+    def __init__(self, category_ids, vectors, tree):
+        """
+        Args:
+            category_ids: Categories with a vector
+            vectors: One row per category id (normalized here)
+            tree: CategoryTree snapshot (blog.category_tree)
+        """
+        self.category_ids = list(category_ids)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True) if len(vectors) else 1
+        self.vectors = vectors / np.where(norms == 0, 1, norms)
+        self.names = [tree.name.get(category_id, '') for category_id in self.category_ids]
+
+        row = {category_id: index for index, category_id in enumerate(self.category_ids)}
+        # Categories whose parent has no vector are treated as roots (-1)
+        self.parent_row = np.asarray(
+            [row.get(tree.parent.get(category_id), -1) for category_id in self.category_ids], dtype=np.int64
+        )
+        children = {}
+        for index, parent in enumerate(self.parent_row.tolist()):
+            children.setdefault(parent, []).append(index)
+        self.children = {parent: np.asarray(rows, dtype=np.int64) for parent, rows in children.items()}
+
+    def __len__(self):
+        return len(self.category_ids)
+
+    @property
+    def dimension(self):
+        return self.vectors.shape[1] if len(self) else 0
+
+    def classify(self, query_vectors, beam_width=BEAM_WIDTH, top_k=3, min_similarity=0.0,
+                 beam_min_similarity=None):
+        """
+        Best category paths for each query vector
+
+        Args:
+            query_vectors: Text embeddings [n, dim]
+            beam_width: Branches kept per level
+            top_k: Paths returned per text
+            min_similarity: Minimum similarity of the returned category
+            beam_min_similarity: Categories below this similarity are not
+                entered (default: min_similarity)
+
+        Returns:
+            Per text, up to top_k dicts sorted by final similarity: category_id,
+            category_name, similarity, confidence (product over levels) and
+            path - a list of {category_id, category_name, similarity,
+            confidence} from the root down
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        n = len(queries)
+        if beam_min_similarity is None:
+            beam_min_similarity = min_similarity
+        if not len(self) or not n:
+            return [[] for _ in range(n)]
+
+        steps = [{} for _ in range(n)]      # per text: row -> (similarity, confidence)
+        finished = [[] for _ in range(n)]   # per text: final rows of complete paths
+        frontier = np.full((n, 1), -1, dtype=np.int64)
+
+        while (frontier != _PAD).any():
+            parents = np.unique(frontier[frontier != _PAD])
+            candidates = np.concatenate(
+                [self.children.get(parent, np.zeros(0, dtype=np.int64)) for parent in parents.tolist()]
+            )
+            if not len(candidates):
+                for text in range(n):
+                    finished[text].extend(row for row in frontier[text].tolist() if row >= 0)
+                break
+
+            similarities = queries @ self.vectors[candidates].T
+            owner = self.parent_row[candidates]
+            # [n, candidates]: child of one of this text's branches and similar enough
+            valid = (owner[None, :, None] == frontier[:, None, :]).any(axis=2) & (similarities >= beam_min_similarity)
+            masked = np.where(valid, similarities, -np.inf)
+
+            # Softmax over each text's candidates at this level
+            best = masked.max(axis=1, keepdims=True)
+            best = np.where(np.isfinite(best), best, 0)
+            weights = np.where(valid, np.exp((masked - best) / CONFIDENCE_TEMPERATURE), 0)
+            totals = weights.sum(axis=1, keepdims=True)
+            confidences = weights / np.where(totals == 0, 1, totals)
+
+            k = min(beam_width, len(candidates))
+            picked = np.argpartition(-masked, k - 1, axis=1)[:, :k]
+            picked_valid = np.take_along_axis(valid, picked, axis=1)
+
+            # Branches without any entered child end here
+            for column in range(frontier.shape[1]):
+                branch = frontier[:, column]
+                has_child = (valid & (owner[None, :] == branch[:, None])).any(axis=1)
+                for text in np.flatnonzero((branch >= 0) & ~has_child).tolist():
+                    finished[text].append(int(branch[text]))
+
+            for text, column in zip(*np.nonzero(picked_valid)):
+                col = picked[text, column]
+                steps[text][int(candidates[col])] = (float(similarities[text, col]), float(confidences[text, col]))
+            frontier = np.where(picked_valid, candidates[picked], _PAD)
+
+        return [self._paths(finished[text], steps[text], top_k, min_similarity) for text in range(n)]
+
+    def _paths(self, final_rows, steps, top_k, min_similarity):
+        # Each branch yields its deepest category that clears min_similarity
+        accepted = set()
+        for row in final_rows:
+            while row >= 0 and steps[row][0] < min_similarity:
+                row = int(self.parent_row[row])
+            if row >= 0:
+                accepted.add(row)
+        final_rows = sorted(accepted, key=lambda row: -steps[row][0])[:top_k]
+        results = []
+        for final in final_rows:
+            rows = [final]
+            while self.parent_row[rows[-1]] >= 0:
+                rows.append(int(self.parent_row[rows[-1]]))
+            rows.reverse()
+            path = [
+                {
+                    'category_id': self.category_ids[row],
+                    'category_name': self.names[row],
+                    'similarity': steps[row][0],
+                    'confidence': steps[row][1],
+                }
+                for row in rows
+            ]
+            results.append({
+                'category_id': self.category_ids[final],
+                'category_name': self.names[final],
+                'similarity': steps[final][0],
+                'confidence': float(np.prod([step['confidence'] for step in path])),
+                'path': path,
+            })
+        return results
+
 
 class AutoCategorizationEngine:
     """
@@ -20,7 +205,10 @@ class AutoCategorizationEngine:
     def __init__(self):
         self.embedding_manager = None
         self.category_embeddings = {}
-        self.category_cache_valid = False
+        # Coarse-to-fine classifier over the rolled-up centroids
+        self.classifier = None
+        # load_centroid_matrix() result the matrix was built from
+        self._centroid_source = None
         self._initialize()
 
     def _initialize(self):
@@ -34,37 +222,51 @@ class AutoCategorizationEngine:
             self.embedding_manager = None
 
     def _update_category_embeddings(self):
-        """Update cached category embeddings"""
+        """
+        Refresh the centroid cache from the shared CategoryEmbedding store
+
+        load_centroid_matrix() is validated against the stored centroids, so
+        this is a cheap stamp check unless centroids or the tree changed (in
+        any process). The normalized matrix is rebuilt only then.
+        """
         if not self.embedding_manager or not self.embedding_manager.available:
             return False
 
         try:
-            from blog.models import Category
-            from ai_models.models import PostEmbedding
+            from .centroids import load_centroid_matrix, ensure_fresh_centroids
+            from blog.category_tree import get_category_tree
+
+            model_name = self.embedding_manager.model_name
+            # Rolled up: a parent's centroid covers the posts of its whole subtree
+            loaded = load_centroid_matrix(model_name, rollup=True)
+            if not loaded[0]:
+                # Nothing stored yet - compute all centroids in one streaming pass
+                ensure_fresh_centroids(model_name)
+                loaded = load_centroid_matrix(model_name, rollup=True)
+            if loaded is self._centroid_source:
+                return True
 
             logger.info("Updating category embeddings cache...")
-            self.category_embeddings = {}
-
-            for category in Category.objects.all():
-                # Get all post embeddings for this category
-                embeddings = PostEmbedding.objects.filter(
-                    post__primary_category=category,
-                    model_name=self.embedding_manager.model_name
-                ).values_list('embedding_vector', flat=True)
-
-                if len(embeddings) >= 2:  # Need at least 2 posts for meaningful average
-                    # Calculate average embedding for category
-                    embedding_vectors = [np.array(emb, dtype=np.float32) for emb in embeddings]
-                    avg_embedding = np.mean(embedding_vectors, axis=0)
-
-                    self.category_embeddings[category.id] = {
-                        'embedding': avg_embedding,
-                        'name': category.name,
-                        'description': category.description,
-                        'post_count': len(embeddings)
-                    }
-
-            self.category_cache_valid = True
+            category_ids, centroids, counts = loaded
+            tree = get_category_tree()
+            # Need at least MIN_CATEGORY_POSTS posts for a meaningful average
+            rows = [
+                row for row, cat_id in enumerate(category_ids)
+                if cat_id in tree.parent and counts[row] >= MIN_CATEGORY_POSTS
+            ]
+
+            self.category_embeddings = {
+                category_ids[row]: {
+                    'name': tree.name[category_ids[row]],
+                    'post_count': int(counts[row])
+                }
+                for row in rows
+            }
+            self.classifier = HierarchicalCategoryClassifier(
+                [category_ids[row] for row in rows], centroids[rows], tree
+            )
+
+            self._centroid_source = loaded
             logger.info(f"Category embeddings updated: {len(self.category_embeddings)} categories")
             return True
 
@@ -72,6 +274,108 @@ class AutoCategorizationEngine:
             logger.error(f"Failed to update category embeddings: {e}")
             return False
 
+    def _ensure_category_embeddings(self) -> bool:
+        """Load the centroid cache if needed; False when there is nothing to score against"""
+        if not self.embedding_manager or not self.embedding_manager.available:
+            logger.warning("Embedding manager not available for auto-categorization")
+            return False
+
+        # Reload category embeddings if they changed
+        if not self._update_category_embeddings():
+            return False
+
+        if not self.category_embeddings or not len(self.classifier):
+            logger.warning("No category embeddings available")
+            return False
+        return True
+
+    def _post_vectors(self, posts: List[Tuple[int, str, str]]) -> np.ndarray:
+        """
+        Normalized embeddings for a batch of posts
+
+        Stored PostEmbedding vectors are used where they exist; the remaining
+        posts are encoded together in one encode_texts call.
+
+        Args:
+            posts: List of (post_id, title, content)
+
+        Returns:
+            Array [len(posts), embedding_dim], rows aligned with posts
+        """
+        from ai_models.models import PostEmbedding
+
+        stored = dict(
+            PostEmbedding.objects.filter(
+                post_id__in=[post_id for post_id, _, _ in posts],
+                model_name=self.embedding_manager.model_name
+            ).values_list('post_id', 'embedding_vector')
+        )
+        dimension = self.classifier.dimension
+        vectors = np.zeros((len(posts), dimension), dtype=np.float32)
+
+        missing = []
+        for row, (post_id, title, content) in enumerate(posts):
+            vector = stored.get(post_id)
+            if vector is not None and len(vector) == dimension:
+                vectors[row] = vector
+            else:
+                missing.append((row, f"{title or ''} {content or ''}"))
+
+        if missing:
+            encoded = self.embedding_manager.encode_texts([text for _, text in missing])
+            vectors[[row for row, _ in missing]] = encoded
+            logger.info(f"Encoded {len(missing)} of {len(posts)} posts without a stored embedding")
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _rank_categories(
+        self,
+        vectors: np.ndarray,
+        excluded: List[set],
+        top_k: int,
+        similarity_threshold: float
+    ) -> List[List[Dict]]:
+        """
+        Top categories for each row of `vectors` (hierarchical beam search for the whole batch)
+
+        Args:
+            vectors: Normalized embeddings [n, dim]
+            excluded: Per row, category ids never to suggest (primary/already assigned)
+            top_k: Suggestions per row
+            similarity_threshold: Minimum cosine similarity of a suggested category
+                (its ancestors only need BEAM_MIN_SIMILARITY to be searched)
+
+        Returns:
+            Per row, suggestion dicts sorted by similarity; 'path' holds the
+            root-to-category steps with per-level confidence
+        """
+        # Excluded categories may take some of the top paths - ask for enough to cover them
+        extra = max((len(category_ids) for category_ids in excluded), default=0)
+        ranked = self.classifier.classify(
+            vectors, beam_width=max(BEAM_WIDTH, top_k), top_k=top_k + extra,
+            min_similarity=similarity_threshold, beam_min_similarity=min(BEAM_MIN_SIMILARITY, similarity_threshold)
+        )
+
+        results = []
+        for paths, category_ids in zip(ranked, excluded):
+            suggestions = []
+            for found in paths:
+                if found['category_id'] in category_ids:
+                    continue
+                cat_data = self.category_embeddings[found['category_id']]
+                similarity = found['similarity']
+                suggestions.append({
+                    'category_id': found['category_id'],
+                    'category_name': found['category_name'],
+                    'similarity_score': similarity,
+                    'confidence': self._calculate_confidence(similarity, cat_data['post_count']),
+                    'reason': f"Semantic similarity: {similarity:.3f} (based on {cat_data['post_count']} posts)",
+                    'path': found['path']
+                })
+            results.append(suggestions[:top_k])
+        return results
+
     def suggest_categories_for_text(
         self,
         title: str,
@@ -93,80 +397,117 @@ class AutoCategorizationEngine:
         Returns:
             List of category suggestions with similarity scores
         """
-        if not self.embedding_manager or not self.embedding_manager.available:
-            logger.warning("Embedding manager not available for auto-categorization")
-            return []
-
-        # Update category embeddings if needed
-        if not self.category_cache_valid:
-            if not self._update_category_embeddings():
-                return []
-
-        if not self.category_embeddings:
-            logger.warning("No category embeddings available")
+        if not self._ensure_category_embeddings():
             return []
 
         try:
             # Generate embedding for the text
             combined_text = f"{title} {content}"
-            text_embedding = self.embedding_manager.encode_texts([combined_text])[0]
-
-            # Calculate similarities with all categories
-            suggestions = []
-            for cat_id, cat_data in self.category_embeddings.items():
-                # Skip current primary category
-                if cat_id == current_primary_category_id:
-                    continue
-
-                # Calculate cosine similarity
-                similarity = self.embedding_manager.calculate_similarity(
-                    text_embedding, cat_data['embedding']
-                )
-
-                if similarity >= similarity_threshold:
-                    suggestions.append({
-                        'category_id': cat_id,
-                        'category_name': cat_data['name'],
-                        'similarity_score': float(similarity),
-                        'confidence': self._calculate_confidence(similarity, cat_data['post_count']),
-                        'reason': f"Semantic similarity: {similarity:.3f} (based on {cat_data['post_count']} posts)"
-                    })
+            text_embedding = np.asarray(self.embedding_manager.encode_texts([combined_text])[0], dtype=np.float32)
+            norm = np.linalg.norm(text_embedding)
+            if norm > 0:
+                text_embedding = text_embedding / norm
 
-            # Sort by similarity and return top_k
-            suggestions.sort(key=lambda x: x['similarity_score'], reverse=True)
-            return suggestions[:top_k]
+            excluded = {current_primary_category_id} if current_primary_category_id else set()
+            return self._rank_categories(text_embedding[None, :], [excluded], top_k, similarity_threshold)[0]
 
         except Exception as e:
             logger.error(f"Failed to suggest categories: {e}")
             return []
 
+    def suggest_categories_for_posts(
+        self,
+        post_ids: List[int],
+        top_k: int = 3,
+        similarity_threshold: float = 0.7,
+        skip_assigned: bool = False
+    ) -> Dict[int, List[Dict]]:
+        """
+        Suggest additional categories for many existing posts at once
+
+        Args:
+            post_ids: Post IDs
+            top_k: Suggestions per post
+            similarity_threshold: Minimum similarity score
+            skip_assigned: Also exclude categories the post already has
+
+        Returns:
+            Dict post_id -> list of category suggestions
+        """
+        from blog.models import Post
+
+        if not post_ids or not self._ensure_category_embeddings():
+            return {}
+
+        posts = list(Post.objects.filter(id__in=post_ids).values_list('id', 'title', 'content', 'primary_category_id'))
+        if not posts:
+            return {}
+
+        excluded = {post_id: {primary_id} if primary_id else set() for post_id, _, _, primary_id in posts}
+        if skip_assigned:
+            for post_id, category_id in Post.additional_categories.through.objects.filter(
+                post_id__in=list(excluded)
+            ).values_list('post_id', 'category_id'):
+                excluded[post_id].add(category_id)
+
+        vectors = self._post_vectors([(post_id, title, content) for post_id, title, content, _ in posts])
+        ranked = self._rank_categories(
+            vectors, [excluded[post_id] for post_id, _, _, _ in posts], top_k, similarity_threshold
+        )
+        return {post[0]: suggestions for post, suggestions in zip(posts, ranked)}
+
     def suggest_categories_for_post(self, post_id: int, **kwargs) -> List[Dict]:
         """
         Suggest additional categories for an existing post
 
         Args:
             post_id: Post ID
-            **kwargs: Additional parameters for suggest_categories_for_text
+            **kwargs: top_k / similarity_threshold (see suggest_categories_for_posts)
 
         Returns:
             List of category suggestions
         """
         try:
-            from blog.models import Post
-
-            post = Post.objects.get(id=post_id)
-
-            return self.suggest_categories_for_text(
-                title=post.title or "",
-                content=post.content or "",
-                current_primary_category_id=post.primary_category.id if post.primary_category else None,
-                **kwargs
-            )
+            return self.suggest_categories_for_posts([post_id], **kwargs).get(post_id, [])
 
         except Exception as e:
             logger.error(f"Failed to suggest categories for post {post_id}: {e}")
             return []
 
+    def _assign_suggestions(self, suggestions_by_post: Dict[int, List[Dict]]) -> int:
+        """
+        Add suggested categories to posts with one bulk insert on the through table
+
+        Returns:
+            Number of post-category rows written (pairs already assigned are not counted)
+        """
+        from blog.models import Post
+        from blog.feeds import fan_out_post
+        from topicsloop.cache import bump_generation
+
+        Through = Post.additional_categories.through
+        existing = set(Through.objects.filter(post_id__in=list(suggestions_by_post)).values_list(
+            'post_id', 'category_id'
+        ))
+        rows = [
+            Through(post_id=post_id, category_id=suggestion['category_id'])
+            for post_id, suggestions in suggestions_by_post.items()
+            for suggestion in suggestions
+            if (post_id, suggestion['category_id']) not in existing
+        ]
+        if not rows:
+            return 0
+
+        # ignore_conflicts: a category assigned concurrently is simply kept
+        Through.objects.bulk_create(rows, ignore_conflicts=True, batch_size=1000)
+
+        # bulk_create sends no m2m_changed - do what its receivers would
+        bump_generation('posts')
+        changed_ids = {row.post_id for row in rows}
+        for post in Post.objects.filter(id__in=changed_ids).only('id', 'created_at', 'primary_category_id'):
+            fan_out_post(post)
+        return len(rows)
+
     def auto_assign_categories(
         self,
         post_id: int,
@@ -185,13 +526,12 @@ class AutoCategorizationEngine:
             Dictionary with assignment results
         """
         try:
-            from blog.models import Post, Category
-
-            suggestions = self.suggest_categories_for_post(
-                post_id,
+            suggestions = self.suggest_categories_for_posts(
+                [post_id],
                 similarity_threshold=similarity_threshold,
-                top_k=max_categories
-            )
+                top_k=max_categories,
+                skip_assigned=True
+            ).get(post_id, [])
 
             if not suggestions:
                 return {
@@ -200,24 +540,15 @@ class AutoCategorizationEngine:
                     'assigned_categories': []
                 }
 
-            post = Post.objects.get(id=post_id)
-            assigned = []
-
-            for suggestion in suggestions:
-                try:
-                    category = Category.objects.get(id=suggestion['category_id'])
-
-                    # Check if not already assigned
-                    if not post.additional_categories.filter(id=category.id).exists():
-                        post.additional_categories.add(category)
-                        assigned.append({
-                            'category_name': category.name,
-                            'similarity_score': suggestion['similarity_score'],
-                            'reason': suggestion['reason']
-                        })
-
-                except Category.DoesNotExist:
-                    continue
+            self._assign_suggestions({post_id: suggestions})
+            assigned = [
+                {
+                    'category_name': suggestion['category_name'],
+                    'similarity_score': suggestion['similarity_score'],
+                    'reason': suggestion['reason']
+                }
+                for suggestion in suggestions
+            ]
 
             return {
                 'success': True,
@@ -261,30 +592,30 @@ class AutoCategorizationEngine:
         self,
         post_ids: List[int] = None,
         similarity_threshold: float = 0.75,
-        dry_run: bool = True
+        dry_run: bool = True,
+        max_categories: int = 2,
+        batch_size: int = BATCH_SIZE
     ) -> Dict:
         """
         Auto-categorize multiple posts in batch
 
+        Posts are processed BATCH_SIZE at a time: one embedding query, one
+        encode call for posts without a stored embedding, one matrix product
+        and one bulk insert per batch.
+
         Args:
             post_ids: List of post IDs (if None, process all posts without additional categories)
             similarity_threshold: Minimum similarity threshold
             dry_run: If True, don't actually assign categories
+            max_categories: Maximum categories suggested/assigned per post
+            batch_size: Posts per batch
 
         Returns:
-            Batch processing results
+            Batch processing results (details only for posts with suggestions)
         """
         try:
             from blog.models import Post
 
-            if post_ids is None:
-                # Get posts that have only primary category (no additional categories)
-                posts = Post.objects.filter(
-                    additional_categories__isnull=True,
-                    primary_category__isnull=False
-                )[:50]  # Limit for performance
-                post_ids = [post.id for post in posts]
-
             results = {
                 'processed': 0,
                 'assigned': 0,
@@ -292,37 +623,65 @@ class AutoCategorizationEngine:
                 'details': []
             }
 
-            for post_id in post_ids:
+            if post_ids is None:
+                # Posts that have only primary category (no additional categories) - keyset
+                # pagination by id, because assigning removes posts from this set as we go
+                candidates = Post.objects.filter(
+                    additional_categories__isnull=True,
+                    primary_category__isnull=False
+                ).order_by('id').values_list('id', flat=True)
+
+                def batches():
+                    last_id = 0
+                    while True:
+                        batch = list(candidates.filter(id__gt=last_id)[:batch_size])
+                        if not batch:
+                            return
+                        last_id = batch[-1]
+                        yield batch
+            else:
+                def batches():
+                    for start in range(0, len(post_ids), batch_size):
+                        yield post_ids[start:start + batch_size]
+
+            for batch in batches():
                 try:
+                    suggestions = self.suggest_categories_for_posts(
+                        batch,
+                        top_k=max_categories,
+                        similarity_threshold=similarity_threshold,
+                        skip_assigned=True
+                    )
+                    suggestions = {post_id: found for post_id, found in suggestions.items() if found}
+                    if not dry_run:
+                        results['assigned'] += self._assign_suggestions(suggestions)
+                    results['processed'] += len(batch)
+                except Exception as e:
+                    logger.error(f"Auto-categorization batch failed: {e}")
+                    results['failed'] += len(batch)
+                    results['details'].append({'post_ids': batch, 'error': str(e)})
+                    continue
+
+                for post_id, found in suggestions.items():
                     if dry_run:
-                        suggestions = self.suggest_categories_for_post(
-                            post_id,
-                            similarity_threshold=similarity_threshold
-                        )
-                        result = {
+                        results['details'].append({
                             'post_id': post_id,
-                            'would_assign': len(suggestions),
-                            'suggestions': suggestions
-                        }
+                            'would_assign': len(found),
+                            'suggestions': found
+                        })
                     else:
-                        result = self.auto_assign_categories(
-                            post_id,
-                            similarity_threshold=similarity_threshold
-                        )
-                        result['post_id'] = post_id
-
-                    results['details'].append(result)
-                    results['processed'] += 1
-
-                    if not dry_run and result.get('success', False):
-                        results['assigned'] += len(result.get('assigned_categories', []))
-
-                except Exception as e:
-                    results['failed'] += 1
-                    results['details'].append({
-                        'post_id': post_id,
-                        'error': str(e)
-                    })
+                        results['details'].append({
+                            'post_id': post_id,
+                            'success': True,
+                            'assigned_categories': [
+                                {
+                                    'category_name': suggestion['category_name'],
+                                    'similarity_score': suggestion['similarity_score'],
+                                    'reason': suggestion['reason']
+                                }
+                                for suggestion in found
+                            ]
+                        })
 
             return results
 
@@ -342,8 +701,7 @@ class AutoCategorizationEngine:
             from ai_models.models import PostEmbedding
 
             # Ensure category embeddings are up to date
-            if not self.category_cache_valid:
-                self._update_category_embeddings()
+            self._update_category_embeddings()
 
             stats = {
                 'embedding_manager_available': self.embedding_manager.available if self.embedding_manager else False,
@@ -0,0 +1,125 @@
+"""
+Batch recommender: precomputed per-user recommendation lists
+
+Instead of scoring the whole corpus on every /api/recommendations/ request,
+users are scored in blocks. Each block is one users x posts GEMM between the
+normalized interest vectors and the post vector index. The user's own posts
+are masked, and argpartition keeps the top STORED_LIST_LENGTH per row. The
+ranked ids are stored in UserRecommendation.
+
+Lists are refreshed by `python manage.py refresh_recommendations` (on a
+schedule: lists older than REFRESH_INTERVAL, or whose UserEmbedding changed
+since). A changed UserEmbedding also triggers an immediate refresh of that
+user's list on commit.
+"""
+
+import logging
+from datetime import timedelta
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from .centroids import DEFAULT_MODEL_NAME
+from .vector_index import get_post_vector_index
+
+logger = logging.getLogger(__name__)
+
+STORED_LIST_LENGTH = 100
+USER_BLOCK_SIZE = 256
+REFRESH_INTERVAL = timedelta(hours=6)
+
+
+def stale_user_ids(model_name, max_age=REFRESH_INTERVAL):
+    """
+    Users whose stored list is missing, older than max_age, or predates their UserEmbedding
+
+    Returns:
+        List of user ids
+    """
+    from ai_models.models import UserEmbedding, UserRecommendation
+
+    stored = {
+        user_id: (source_updated_at, computed_at)
+        for user_id, source_updated_at, computed_at in UserRecommendation.objects.filter(
+            model_name=model_name
+        ).values_list('user_id', 'source_updated_at', 'computed_at')
+    }
+    cutoff = timezone.now() - max_age
+
+    stale = []
+    for user_id, updated_at in UserEmbedding.objects.filter(model_name=model_name).values_list('user_id', 'updated_at'):
+        current = stored.get(user_id)
+        if current is None or current[0] < updated_at or current[1] < cutoff:
+            stale.append(user_id)
+    return stale
+
+
+def _score_block(index, vectors, user_ids, length):
+    """Top `length` (rows, scores) per user for one block of interest vectors"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+
+    scores = vectors @ index.matrix.T
+    scores[:, ~index.valid] = -np.inf
+    # Own posts are never recommended
+    scores[index.author_ids[None, :] == user_ids[:, None]] = -np.inf
+
+    k = min(length, scores.shape[1])
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return np.take_along_axis(best, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def refresh_user_recommendations(user_ids=None, model_name=DEFAULT_MODEL_NAME, length=STORED_LIST_LENGTH):
+    """
+    Recompute and store recommendation lists
+
+    Args:
+        user_ids: Users to refresh (None = all with a UserEmbedding for model_name)
+        model_name: Embedding model of the user and post vectors
+        length: Posts kept per user
+
+    Returns:
+        Number of lists written
+    """
+    from ai_models.models import UserEmbedding, UserRecommendation
+
+    index = get_post_vector_index(model_name)
+    if len(index) == 0:
+        return 0
+
+    embeddings = UserEmbedding.objects.filter(model_name=model_name, vector_dimension=index.matrix.shape[1])
+    if user_ids is not None:
+        embeddings = embeddings.filter(user_id__in=user_ids)
+    rows = list(embeddings.values_list('user_id', 'interest_vector', 'updated_at'))
+
+    written = 0
+    for start in range(0, len(rows), USER_BLOCK_SIZE):
+        block = rows[start:start + USER_BLOCK_SIZE]
+        block_user_ids = np.asarray([user_id for user_id, _, _ in block], dtype=np.int64)
+        vectors = np.asarray([vector for _, vector, _ in block], dtype=np.float32)
+        best, best_scores = _score_block(index, vectors, block_user_ids, length)
+
+        lists = []
+        for (user_id, _, updated_at), rows_of_user, scores_of_user in zip(block, best, best_scores):
+            finite = np.isfinite(scores_of_user)
+            lists.append(UserRecommendation(
+                user_id=user_id,
+                model_name=model_name,
+                post_ids=index.post_ids[rows_of_user[finite]].tolist(),
+                scores=[round(float(score), 4) for score in scores_of_user[finite]],
+                source_updated_at=updated_at,
+                computed_at=timezone.now(),
+            ))
+
+        with transaction.atomic():
+            UserRecommendation.objects.bulk_create(
+                lists,
+                update_conflicts=True,
+                unique_fields=['user', 'model_name'],
+                update_fields=['post_ids', 'scores', 'source_updated_at', 'computed_at'],
+            )
+        written += len(lists)
+
+    logger.info(f"Stored recommendation lists for {written} users ({model_name})")
+    return written
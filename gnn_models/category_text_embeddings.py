@@ -0,0 +1,147 @@
+"""
+Persisted text embeddings for categories
+
+Category text (name, description, parent name, level) is encoded once and
+stored in CategoryEmbedding with source='text', together with a hash of the
+encoded text. refresh_category_text_embeddings() re-encodes only categories
+whose text changed, in one batched encode call; it runs from the
+`embed_categories` command and after a category is saved.
+
+Readers (network views) call load_text_embedding_matrix(), which loads all
+stored vectors with one query into a normalized matrix, memoized per
+embeddings generation - they never invoke the transformer model.
+"""
+
+import hashlib
+import logging
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from topicsloop.cache import get_generation, bump_generation
+from .centroids import DEFAULT_MODEL_NAME
+
+logger = logging.getLogger(__name__)
+
+_matrix_cache = {}
+
+
+def _text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def refresh_category_text_embeddings(category_ids=None, force=False):
+    """
+    Encode categories whose text changed and store the vectors
+
+    Args:
+        category_ids: Limit to these categories (None = all)
+        force: Re-encode even if the stored text hash matches
+
+    Returns:
+        Number of categories (re-)encoded
+    """
+    from blog.models import Category
+    from ai_models.models import CategoryEmbedding
+    from .embeddings import get_embedding_manager
+
+    manager = get_embedding_manager()
+    if not manager.available:
+        # Fallback TF-IDF vectors are not comparable between calls - store nothing
+        logger.warning("Sentence transformers not available - category text embeddings not refreshed")
+        return 0
+
+    categories = Category.objects.values_list('id', 'name', 'description', 'level', 'parent__name')
+    if category_ids is not None:
+        categories = categories.filter(id__in=category_ids)
+
+    existing = {
+        embedding.category_id: embedding
+        for embedding in CategoryEmbedding.objects.filter(
+            model_name=manager.model_name, source='text'
+        ).only('id', 'category_id', 'content_hash')
+    }
+
+    changed = []
+    for category_id, name, description, level, parent_name in categories:
+        text = manager.combine_category_text(name, description or '', parent_name or '', level)
+        text_hash = _text_hash(text)
+        stored = existing.get(category_id)
+        if force or stored is None or stored.content_hash != text_hash:
+            changed.append((category_id, text, text_hash))
+
+    if not changed:
+        return 0
+
+    vectors = manager.encode_texts([text for _, text, _ in changed], batch_size=64)
+
+    to_create = []
+    to_update = []
+    now = timezone.now()
+    for (category_id, _, text_hash), vector in zip(changed, vectors):
+        vector = np.asarray(vector, dtype=np.float32).tolist()
+        embedding = existing.get(category_id)
+        if embedding is None:
+            to_create.append(CategoryEmbedding(
+                category_id=category_id,
+                model_name=manager.model_name,
+                source='text',
+                aggregated_vector=vector,
+                vector_dimension=len(vector),
+                content_hash=text_hash,
+            ))
+        else:
+            embedding.aggregated_vector = vector
+            embedding.vector_dimension = len(vector)
+            embedding.content_hash = text_hash
+            embedding.updated_at = now
+            to_update.append(embedding)
+
+    with transaction.atomic():
+        CategoryEmbedding.objects.bulk_create(to_create, batch_size=500)
+        CategoryEmbedding.objects.bulk_update(
+            to_update, ['aggregated_vector', 'vector_dimension', 'content_hash', 'updated_at'], batch_size=500
+        )
+
+    # Bulk operations skip model signals
+    bump_generation('embeddings')
+    logger.info(f"Encoded {len(changed)} category texts ({manager.model_name})")
+    return len(changed)
+
+
+def load_text_embedding_matrix(category_ids=None, model_name=DEFAULT_MODEL_NAME):
+    """
+    Stored category text vectors as L2-normalized matrix rows
+
+    Args:
+        category_ids: Return only these categories (in this order, skipping
+            ones without a stored vector); None returns all
+        model_name: Model the vectors were encoded with
+
+    Returns:
+        (category_ids, matrix) - one row per returned id
+    """
+    from ai_models.models import CategoryEmbedding
+
+    generation = get_generation('embeddings')
+    cached = _matrix_cache.get(model_name)
+    if cached is None or cached[0] != generation:
+        rows = list(CategoryEmbedding.objects.filter(
+            model_name=model_name, source='text'
+        ).values_list('category_id', 'aggregated_vector'))
+
+        if rows:
+            matrix = np.asarray([vector for _, vector in rows], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        index = {category_id: row for row, (category_id, _) in enumerate(rows)}
+        cached = (generation, index, matrix)
+        _matrix_cache[model_name] = cached
+
+    _, index, matrix = cached
+    if category_ids is None:
+        return list(index), matrix
+
+    found_ids = [category_id for category_id in category_ids if category_id in index]
+    return found_ids, matrix[[index[category_id] for category_id in found_ids]]
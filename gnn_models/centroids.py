@@ -0,0 +1,324 @@
+"""
+Category centroids from post embeddings
+
+A category's centroid is the mean embedding of the posts whose primary
+category it is. Centroids are stored in CategoryEmbedding.aggregated_vector
+(with post_count), so readers never touch PostEmbedding:
+
+- refresh_category_centroids() streams (primary_category_id, vector) for the
+  affected posts in one query and accumulates sums/counts with np.add.at.
+  Only categories whose posts or embeddings changed since their centroid was
+  written are recomputed.
+- apply_centroid_changes() keeps stored centroids current between refreshes:
+  when a post is embedded, re-embedded, recategorized or deleted, its vector
+  is subtracted from / added to the stored sums (centroid * post_count) of
+  the affected categories instead of re-reading their posts.
+- load_centroid_matrix() returns all stored centroids as one matrix,
+  optionally rolled up so that each category also covers the posts of its
+  subcategories. It is memoized per process and validated against the
+  CategoryEmbedding table (row count and latest updated_at), so centroids
+  refreshed by a command or another worker are picked up.
+- centroid_similarities() computes every pairwise cosine with one normalized
+  matrix product and returns the pairs above a threshold.
+"""
+
+import logging
+import time
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.functions import Greatest
+from topicsloop.cache import get_generation, bump_generation, StampedMemo
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+# Seconds between staleness checks when no posts/embeddings bump was seen in this process
+FRESHNESS_CHECK_INTERVAL = 300
+
+_matrices = StampedMemo()
+_freshness_checked = {}
+
+
+def stale_category_ids(model_name=DEFAULT_MODEL_NAME):
+    """
+    Categories whose stored centroid no longer matches their posts
+
+    A centroid is stale when the number of embedded posts differs from its
+    post_count, or a post/embedding was modified after it was written.
+    """
+    from ai_models.models import PostEmbedding, CategoryEmbedding
+
+    current = PostEmbedding.objects.filter(
+        model_name=model_name, post__primary_category__isnull=False
+    ).values('post__primary_category_id').annotate(
+        embedded_posts=Count('id'),
+        last_change=Greatest(Max('updated_at'), Max('post__updated_at'))
+    ).values_list('post__primary_category_id', 'embedded_posts', 'last_change')
+
+    stored = {
+        category_id: (post_count, updated_at)
+        for category_id, post_count, updated_at in CategoryEmbedding.objects.filter(
+            model_name=model_name, source='posts'
+        ).values_list('category_id', 'post_count', 'updated_at')
+    }
+
+    stale = set()
+    for category_id, embedded_posts, last_change in current:
+        stored_entry = stored.pop(category_id, None)
+        if stored_entry is None or stored_entry[0] != embedded_posts or stored_entry[1] < last_change:
+            stale.add(category_id)
+
+    # Categories that lost all their embedded posts
+    stale.update(category_id for category_id, (post_count, _) in stored.items() if post_count)
+    return stale
+
+
+def _accumulate(rows):
+    """Sum vectors per category from (category_id, vector) rows"""
+    category_index = {}
+    row_categories = []
+    vectors = []
+    for category_id, vector in rows:
+        if category_id not in category_index:
+            category_index[category_id] = len(category_index)
+        row_categories.append(category_index[category_id])
+        vectors.append(vector)
+
+    if not vectors:
+        return {}, None, None
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    row_categories = np.asarray(row_categories)
+    sums = np.zeros((len(category_index), vectors.shape[1]), dtype=np.float64)
+    counts = np.zeros(len(category_index), dtype=np.int64)
+    np.add.at(sums, row_categories, vectors)
+    np.add.at(counts, row_categories, 1)
+    return category_index, sums, counts
+
+
+def refresh_category_centroids(category_ids=None, model_name=DEFAULT_MODEL_NAME):
+    """
+    Recompute and store centroids
+
+    Args:
+        category_ids: Categories to refresh; None refreshes only stale ones
+        model_name: Embedding model whose vectors are averaged
+
+    Returns:
+        Number of centroids written or removed
+    """
+    from ai_models.models import PostEmbedding, CategoryEmbedding
+
+    if category_ids is None:
+        category_ids = stale_category_ids(model_name)
+    category_ids = set(category_ids)
+    if not category_ids:
+        return 0
+
+    rows = PostEmbedding.objects.filter(
+        model_name=model_name, post__primary_category_id__in=category_ids
+    ).values_list('post__primary_category_id', 'embedding_vector').iterator(chunk_size=2000)
+    category_index, sums, counts = _accumulate(rows)
+
+    with transaction.atomic():
+        # Categories without embedded posts keep no centroid
+        CategoryEmbedding.objects.filter(
+            model_name=model_name, source='posts', category_id__in=category_ids - set(category_index)
+        ).delete()
+
+        existing = {
+            embedding.category_id: embedding
+            for embedding in CategoryEmbedding.objects.filter(
+                model_name=model_name, source='posts', category_id__in=category_index
+            )
+        }
+        for category_id, row in category_index.items():
+            centroid = (sums[row] / counts[row]).astype(np.float32).tolist()
+            embedding = existing.get(category_id) or CategoryEmbedding(
+                category_id=category_id, model_name=model_name, source='posts'
+            )
+            embedding.aggregated_vector = centroid
+            embedding.post_count = int(counts[row])
+            embedding.save()
+
+    bump_generation('embeddings')
+    logger.info(f"Refreshed {len(category_ids)} category centroids ({model_name})")
+    return len(category_ids)
+
+
+def apply_centroid_changes(changes, model_name=DEFAULT_MODEL_NAME):
+    """
+    Adjust stored centroids by adding/removing single post vectors
+
+    Categories without a stored centroid are computed from scratch instead,
+    since a centroid built from one delta would ignore their other posts.
+
+    Args:
+        changes: Iterable of (category_id, vector, sign) - sign +1 adds the
+            vector to the category, -1 removes it
+        model_name: Embedding model of the vectors
+
+    Returns:
+        Number of centroids changed
+    """
+    from ai_models.models import CategoryEmbedding
+
+    added = [(category_id, vector) for category_id, vector, sign in changes if category_id and sign > 0]
+    removed = [(category_id, vector) for category_id, vector, sign in changes if category_id and sign < 0]
+    deltas = {}
+    for rows, sign in ((added, 1), (removed, -1)):
+        category_index, sums, counts = _accumulate(rows)
+        for category_id, row in category_index.items():
+            delta_sum, delta_count = deltas.get(category_id, (0, 0))
+            deltas[category_id] = (delta_sum + sign * sums[row], delta_count + sign * int(counts[row]))
+    if not deltas:
+        return 0
+
+    with transaction.atomic():
+        existing = {
+            embedding.category_id: embedding
+            for embedding in CategoryEmbedding.objects.select_for_update().filter(
+                model_name=model_name, source='posts', category_id__in=deltas
+            )
+        }
+        for category_id, embedding in existing.items():
+            delta_sum, delta_count = deltas[category_id]
+            count = embedding.post_count + delta_count
+            if count <= 0:
+                embedding.delete()
+                continue
+            centroid = np.asarray(embedding.aggregated_vector, dtype=np.float64)
+            if centroid.shape != delta_sum.shape:
+                # Dimension changed (model swap) - recompute below
+                continue
+            embedding.aggregated_vector = ((centroid * embedding.post_count + delta_sum) / count).astype(
+                np.float32
+            ).tolist()
+            embedding.post_count = count
+            embedding.save()
+
+        # Not stored yet, or not adjustable: one streaming pass over their posts
+        recompute = {
+            category_id for category_id, (delta_sum, _) in deltas.items()
+            if category_id not in existing
+            or np.asarray(existing[category_id].aggregated_vector).shape != delta_sum.shape
+        }
+
+    if recompute:
+        refresh_category_centroids(recompute, model_name=model_name)
+    logger.debug(f"Adjusted {len(deltas)} category centroids ({model_name})")
+    return len(deltas)
+
+
+def ensure_fresh_centroids(model_name=DEFAULT_MODEL_NAME):
+    """
+    Refresh stale centroids
+
+    Checks once per posts/embeddings generation, and at least every
+    FRESHNESS_CHECK_INTERVAL seconds for changes this process was not told about.
+    """
+    generation = (get_generation('posts'), get_generation('embeddings'))
+    checked = _freshness_checked.get(model_name)
+    if checked is not None and checked[0] == generation and time.monotonic() - checked[1] < FRESHNESS_CHECK_INTERVAL:
+        return 0
+
+    refreshed = refresh_category_centroids(model_name=model_name)
+    # Refreshing bumps the embeddings generation - remember the new one
+    _freshness_checked[model_name] = ((get_generation('posts'), get_generation('embeddings')), time.monotonic())
+    return refreshed
+
+
+def _roll_up(category_ids, sums, counts):
+    """Add every category's sums/counts to all of its ancestors"""
+    from blog.category_tree import get_category_tree
+
+    tree = get_category_tree()
+    index = {category_id: row for row, category_id in enumerate(category_ids)}
+
+    # Ancestors missing from the matrix (no own posts) still get a row
+    extra_ids = sorted(tree.ancestors(category_ids) - set(index))
+    for category_id in extra_ids:
+        index[category_id] = len(index)
+    all_ids = list(category_ids) + extra_ids
+    sums = np.vstack([sums, np.zeros((len(extra_ids), sums.shape[1]))])
+    counts = np.concatenate([counts, np.zeros(len(extra_ids), dtype=counts.dtype)])
+
+    # Deepest level first, so totals flow up one level at a time
+    for level in sorted({tree.level.get(cid, 0) for cid in all_ids}, reverse=True):
+        children = [cid for cid in all_ids if tree.level.get(cid) == level and tree.parent.get(cid) in index]
+        if not children:
+            continue
+        child_rows = np.asarray([index[cid] for cid in children])
+        parent_rows = np.asarray([index[tree.parent[cid]] for cid in children])
+        np.add.at(sums, parent_rows, sums[child_rows])
+        np.add.at(counts, parent_rows, counts[child_rows])
+
+    return all_ids, sums, counts
+
+
+def load_centroid_matrix(model_name=DEFAULT_MODEL_NAME, rollup=False):
+    """
+    All stored centroids as one matrix
+
+    The same object is returned until the stored centroids (or, for rollup,
+    the category tree) change.
+
+    Returns:
+        (category_ids, centroids, post_counts) - centroids has one row per id
+    """
+    from ai_models.models import CategoryEmbedding
+
+    stored = CategoryEmbedding.objects.filter(model_name=model_name, source='posts', post_count__gt=0)
+
+    def stamp():
+        state = stored.aggregate(rows=Count('id'), last_change=Max('updated_at'))
+        # The roll-up follows the tree of this process
+        tree_generation = get_generation('categories') if rollup else None
+        return state['rows'], state['last_change'], tree_generation
+
+    return _matrices.get(
+        (model_name, rollup), stamp, lambda: _build_centroid_matrix(stored, rollup),
+        generations=('embeddings', 'categories')
+    )
+
+
+def _build_centroid_matrix(stored, rollup):
+    rows = list(stored.values_list('category_id', 'aggregated_vector', 'post_count'))
+
+    if rows:
+        category_ids = [row[0] for row in rows]
+        counts = np.asarray([row[2] for row in rows], dtype=np.int64)
+        sums = np.asarray([row[1] for row in rows], dtype=np.float64) * counts[:, None]
+        if rollup:
+            category_ids, sums, counts = _roll_up(category_ids, sums, counts)
+        centroids = (sums / np.maximum(counts, 1)[:, None]).astype(np.float32)
+        result = (category_ids, centroids, counts)
+    else:
+        result = ([], np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64))
+    return result
+
+
+def centroid_similarities(centroids, threshold):
+    """
+    Cosine similarity of every pair of centroids above a threshold
+
+    Returns:
+        List of (row_a, row_b, similarity) with row_a < row_b, strongest first
+    """
+    if len(centroids) < 2:
+        return []
+
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    normalized = centroids / np.where(norms == 0, 1, norms)
+    similarities = normalized @ normalized.T
+
+    rows_a, rows_b = np.triu_indices(len(centroids), k=1)
+    values = similarities[rows_a, rows_b]
+    keep = values >= threshold
+    rows_a, rows_b, values = rows_a[keep], rows_b[keep], values[keep]
+    order = np.argsort(-values)
+    return [
+        (int(rows_a[i]), int(rows_b[i]), float(values[i]))
+        for i in order
+    ]
@@ -190,6 +190,13 @@ class EmbeddingManager:
         Returns:
             Category embedding vector
         """
+        combined_text = self.combine_category_text(name, description, parent_name, level)
+
+        embeddings = self.encode_texts([combined_text])
+        return embeddings[0]
+
+    def combine_category_text(self, name: str, description: str = "", parent_name: str = "", level: int = 0) -> str:
+        """Text encoded for a category (shared by single and batch category embeddings)"""
         # Build hierarchical context
         combined_text = f"{name}"
 
@@ -206,8 +213,7 @@ class EmbeddingManager:
         else:
             combined_text += " main category"
 
-        embeddings = self.encode_texts([combined_text])
-        return embeddings[0]
+        return combined_text
 
     def generate_user_embedding(self, favorite_categories: List[str], interaction_history: List[str] = None) -> np.ndarray:
         """
@@ -224,58 +224,25 @@ class GNNIntegrationManager:
         return self._get_fallback_recommendations(user_id, num_recommendations)
 
     def _get_fallback_recommendations(self, user_id: int, num_recommendations: int) -> List[Dict[str, Any]]:
-        """Get recommendations using traditional methods"""
+        """Get recommendations from the two-stage recommender (candidate sources + re-ranking)"""
         try:
             from blog.models import Post
-            from accounts.models import CustomUser
-            from ai_models.models import PostSimilarity
-            from django.db.models import Q, Avg
-
-            user = CustomUser.objects.get(id=user_id)
-
-            # Get user's posts to understand their interests
-            user_posts = Post.objects.filter(author=user)
-
-            if not user_posts.exists():
-                # For new users, return most popular posts
-                popular_posts = Post.objects.annotate(
-                    avg_similarity=Avg('similarities_as_post1__similarity_score')
-                ).order_by('-avg_similarity')[:num_recommendations]
-
-                return [
-                    {
-                        'post_id': post.id,
-                        'title': post.title,
-                        'score': 0.5,
-                        'reason': 'Popular content'
-                    }
-                    for post in popular_posts
-                ]
-
-            # Find posts similar to user's posts
-            similar_posts = []
-
-            for user_post in user_posts:
-                similarities = PostSimilarity.objects.filter(
-                    Q(post1=user_post) | Q(post2=user_post),
-                    similarity_score__gte=0.3
-                ).select_related('post1', 'post2')
+            from .recommender import recommend, SOURCE_REASONS
 
-                for similarity in similarities:
-                    recommended_post = similarity.post2 if similarity.post1 == user_post else similarity.post1
-
-                    # Don't recommend user's own posts
-                    if recommended_post.author != user:
-                        similar_posts.append({
-                            'post_id': recommended_post.id,
-                            'title': recommended_post.title,
-                            'score': similarity.similarity_score,
-                            'reason': f'Similar to your post: {user_post.title[:50]}...'
-                        })
+            recommendations, _ = recommend(user_id, limit=num_recommendations)
+            titles = dict(
+                Post.objects.filter(id__in=[item['post_id'] for item in recommendations]).values_list('id', 'title')
+            )
 
-            # Sort by score and return top recommendations
-            similar_posts.sort(key=lambda x: x['score'], reverse=True)
-            return similar_posts[:num_recommendations]
+            return [
+                {
+                    'post_id': item['post_id'],
+                    'title': titles.get(item['post_id'], ''),
+                    'score': item['score'],
+                    'reason': SOURCE_REASONS[item['sources'][0]]
+                }
+                for item in recommendations
+            ]
 
         except Exception as e:
             logger.error(f"Fallback recommendations failed: {e}")
@@ -444,12 +411,22 @@ class GNNIntegrationManager:
         """
         Generate semantic embedding for a user based on preferences
 
+        Users with interaction history already have an incrementally updated
+        interest vector (gnn_models.interest_vectors) - it is returned as is.
+        The transformer only encodes favorites/own posts for users without one.
+
         Args:
             user_id: User ID to generate embedding for
 
         Returns:
             Embedding vector or None if failed
         """
+        from ai_models.models import UserEmbedding
+
+        stored = UserEmbedding.objects.filter(user_id=user_id).values_list('interest_vector', flat=True).first()
+        if stored:
+            return np.asarray(stored, dtype=np.float32)
+
         if not self.embedding_manager or not self.embedding_manager.available:
             logger.warning("Embedding manager not available")
             return None
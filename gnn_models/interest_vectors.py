@@ -0,0 +1,221 @@
+"""
+Incremental user interest vectors from the interaction event stream
+
+A user's interest vector is the exponentially decayed sum of the stored
+(normalized) embeddings of posts they interacted with:
+
+    v(t) = sum_i  w(type_i) * 2^(-(t - t_i) / HALF_LIFE) * e(post_i)
+
+Its direction is the decayed weighted average of those embeddings, which
+is all cosine scoring uses. The sum can be advanced from the stored vector
+alone, so new events are folded in without the transformer and without
+rereading history:
+
+    v(t_new) = 2^(-(t_new - t_last) / HALF_LIFE) * v(t_last) + contributions
+
+update_interest_vectors() reads events after a StreamCursor in batches.
+Each batch becomes one sparse (users x posts) weight matrix times the post
+vector index, so a batch of any size is a single sparse GEMM. It then
+writes UserEmbedding rows with bulk_update/bulk_create and advances the
+cursor in the same transaction.
+
+Event ids are read only up to a settled horizon (see streams), so buffer
+flushes from several web processes committing out of order are not
+skipped. The `update_interest_vectors --rebuild` command replays the
+whole log.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from django.utils import timezone
+from . import streams
+from .centroids import DEFAULT_MODEL_NAME
+from .vector_index import get_post_vector_index
+
+logger = logging.getLogger(__name__)
+
+HALF_LIFE = timedelta(days=14)
+EVENT_BATCH_SIZE = 50000
+
+# How strongly each interaction signals interest
+EVENT_WEIGHTS = {
+    'view': 1.0,
+    'similar_click': 1.5,
+    'recommendation_click': 2.0,
+    'graph_focus': 0.5,
+}
+
+
+def cursor_name(model_name):
+    return f'interest_vectors:{model_name}'
+
+
+def _decay(age_seconds):
+    return np.exp2(-np.asarray(age_seconds, dtype=np.float64) / HALF_LIFE.total_seconds())
+
+
+def fold_events(index, user_ids, post_ids, event_types, timestamps):
+    """
+    Decayed contribution of a batch of events per user
+
+    Args:
+        index: PostVectorIndex of the embedding model
+        user_ids, post_ids, event_types, timestamps: Aligned event columns
+            (timestamps as epoch seconds)
+
+    Returns:
+        (users, contributions, latest, counts) - unique user ids, their
+        contribution vectors decayed to `latest` (their newest event time)
+        and the number of events used per user
+    """
+    rows = np.asarray([index.position.get(post_id, -1) for post_id in post_ids], dtype=np.int64)
+    weights = np.asarray([EVENT_WEIGHTS.get(event_type, 0.0) for event_type in event_types])
+    # Events on posts without an embedding (or with a zero vector) carry no direction
+    usable = rows >= 0
+    usable[usable] &= index.valid[rows[usable]]
+    usable &= weights > 0
+
+    user_ids = np.asarray(user_ids, dtype=np.int64)[usable]
+    rows, weights = rows[usable], weights[usable]
+    timestamps = np.asarray(timestamps, dtype=np.float64)[usable]
+    if not len(user_ids):
+        return np.zeros(0, dtype=np.int64), np.zeros((0, index.matrix.shape[1]), dtype=np.float32), \
+            np.zeros(0), np.zeros(0, dtype=np.int64)
+
+    users, slot = np.unique(user_ids, return_inverse=True)
+    latest = np.full(len(users), -np.inf)
+    np.maximum.at(latest, slot, timestamps)
+    counts = np.bincount(slot, minlength=len(users))
+
+    coefficients = weights * _decay(latest[slot] - timestamps)
+    weight_matrix = sparse.csr_matrix((coefficients, (slot, rows)), shape=(len(users), len(index)))
+    contributions = np.asarray(weight_matrix @ index.matrix, dtype=np.float32)
+    return users, contributions, latest, counts
+
+
+def update_interest_vectors(model_name=DEFAULT_MODEL_NAME, batch_size=EVENT_BATCH_SIZE, max_batches=None):
+    """
+    Apply interaction events after the stream cursor to UserEmbedding
+
+    Args:
+        model_name: Embedding model whose post vectors are aggregated
+        batch_size: Events per transaction
+        max_batches: Stop after this many batches (None = until caught up)
+
+    Returns:
+        Dict with events, users_updated, users_created and batches
+    """
+    from ai_models.models import InteractionEvent, StreamCursor
+
+    index = get_post_vector_index(model_name)
+    totals = {'events': 0, 'users_updated': 0, 'users_created': 0, 'batches': 0}
+    if len(index) == 0:
+        logger.warning(f"No post embeddings for {model_name} - interest vectors not updated")
+        return totals
+
+    StreamCursor.objects.get_or_create(name=cursor_name(model_name))
+    while max_batches is None or totals['batches'] < max_batches:
+        with transaction.atomic():
+            # Row lock: concurrent runs wait instead of applying the same events twice
+            cursor = StreamCursor.objects.select_for_update().get(name=cursor_name(model_name))
+            events = streams.next_batch(
+                InteractionEvent.objects.filter(user__isnull=False), cursor,
+                ('user_id', 'post_id', 'event_type', 'created_at'), batch_size
+            )
+            if not events:
+                break
+
+            _, user_ids, post_ids, event_types, created = zip(*events)
+            timestamps = [moment.timestamp() for moment in created]
+            users, contributions, latest, counts = fold_events(index, user_ids, post_ids, event_types, timestamps)
+            updated, created_count = _apply_contributions(model_name, users, contributions, latest, counts)
+
+            streams.advance(cursor, events)
+
+        totals['events'] += len(events)
+        totals['users_updated'] += updated
+        totals['users_created'] += created_count
+        totals['batches'] += 1
+
+    logger.info(
+        f"Interest vectors ({model_name}): {totals['events']} events, "
+        f"{totals['users_updated']} updated, {totals['users_created']} new users"
+    )
+    return totals
+
+
+def _apply_contributions(model_name, users, contributions, latest, counts):
+    """Decay stored vectors to the new event time and add the batch contributions"""
+    from ai_models.models import UserEmbedding
+
+    if not len(users):
+        return 0, 0
+
+    now = timezone.now()
+    dimension = contributions.shape[1]
+    # UserEmbedding.user is one-to-one: a vector of another model is replaced, not kept alongside
+    existing = {
+        embedding.user_id: embedding
+        for embedding in UserEmbedding.objects.filter(user_id__in=users.tolist())
+    }
+
+    to_update, to_create = [], []
+    for position, user_id in enumerate(users.tolist()):
+        latest_at = datetime.fromtimestamp(latest[position], tz=dt_timezone.utc)
+        vector = contributions[position]
+        embedding = existing.get(user_id)
+
+        if embedding is None:
+            to_create.append(UserEmbedding(
+                user_id=user_id,
+                model_name=model_name,
+                interest_vector=vector.tolist(),
+                vector_dimension=dimension,
+                activity_count=int(counts[position]),
+                last_activity_at=latest_at,
+            ))
+            continue
+
+        previous = np.asarray(embedding.interest_vector, dtype=np.float32)
+        if embedding.model_name != model_name:
+            embedding.model_name = model_name
+            embedding.activity_count = 0
+        elif previous.shape == (dimension,) and embedding.last_activity_at is not None:
+            # Late events (older than the stored vector) are decayed to the stored time instead
+            age = (latest_at - embedding.last_activity_at).total_seconds()
+            if age >= 0:
+                vector = _decay(age) * previous + vector
+            else:
+                vector = previous + _decay(-age) * vector
+                latest_at = embedding.last_activity_at
+        embedding.interest_vector = np.asarray(vector, dtype=np.float32).tolist()
+        embedding.vector_dimension = dimension
+        embedding.activity_count += int(counts[position])
+        embedding.last_activity_at = latest_at
+        # bulk_update skips auto_now - the batch recommender compares updated_at
+        embedding.updated_at = now
+        to_update.append(embedding)
+
+    UserEmbedding.objects.bulk_update(
+        to_update,
+        ['model_name', 'interest_vector', 'vector_dimension', 'activity_count', 'last_activity_at', 'updated_at'],
+        batch_size=1000
+    )
+    UserEmbedding.objects.bulk_create(to_create, batch_size=1000)
+    return len(to_update), len(to_create)
+
+
+def reset_interest_vectors(model_name=DEFAULT_MODEL_NAME):
+    """Delete the stored vectors of a model and rewind its cursor (full replay on the next update)"""
+    from ai_models.models import UserEmbedding, StreamCursor
+
+    with transaction.atomic():
+        deleted, _ = UserEmbedding.objects.filter(model_name=model_name).delete()
+        StreamCursor.objects.update_or_create(
+            name=cursor_name(model_name),
+            defaults={'position': 0, 'processed_events': 0}
+        )
+    return deleted
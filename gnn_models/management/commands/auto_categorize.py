@@ -0,0 +1,64 @@
+"""
+Django management command to suggest or assign additional categories for posts in batches
+
+Usage:
+    python manage.py auto_categorize                      # Dry run over posts without additional categories
+    python manage.py auto_categorize --apply              # Assign the suggestions
+    python manage.py auto_categorize --apply --threshold 0.8 --max-categories 1
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from gnn_models.auto_categorization import auto_categorization_engine, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Suggest (or assign with --apply) additional categories for posts that only have a primary one'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Write the suggested categories (default: dry run)'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.75,
+            help='Minimum similarity to a category centroid (default: 0.75)'
+        )
+        parser.add_argument(
+            '--max-categories',
+            type=int,
+            default=2,
+            help='Categories per post (default: 2)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Posts per batch (default: {BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = not options['apply']
+        started = time.time()
+        result = auto_categorization_engine.batch_auto_categorize(
+            similarity_threshold=options['threshold'],
+            dry_run=dry_run,
+            max_categories=options['max_categories'],
+            batch_size=options['batch_size']
+        )
+        if 'error' in result:
+            self.stderr.write(self.style.ERROR(f"Auto-categorization failed: {result['error']}"))
+            return
+
+        with_suggestions = sum(1 for detail in result['details'] if 'post_id' in detail)
+        summary = (
+            f"{result['processed']} posts processed, {with_suggestions} with suggestions, "
+            f"{result['failed']} failed ({time.time() - started:.1f}s)"
+        )
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f'[dry run] {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{summary}, {result['assigned']} categories assigned"))
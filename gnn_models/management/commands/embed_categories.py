@@ -0,0 +1,28 @@
+"""
+Django management command to store text embeddings for categories
+
+Only categories whose name/description/parent changed since the last run
+are re-encoded.
+
+Usage:
+    python manage.py embed_categories
+    python manage.py embed_categories --force
+"""
+
+from django.core.management.base import BaseCommand
+from gnn_models.category_text_embeddings import refresh_category_text_embeddings
+
+
+class Command(BaseCommand):
+    help = 'Encode category texts and persist them as CategoryEmbedding(source="text")'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-encode every category even if its text did not change'
+        )
+
+    def handle(self, *args, **options):
+        encoded = refresh_category_text_embeddings(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(f'Encoded {encoded} categories'))
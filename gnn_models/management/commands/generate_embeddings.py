@@ -149,41 +149,17 @@ class Command(BaseCommand):
         """Generate embeddings for categories"""
         self.stdout.write('Generating category embeddings...')
 
-        categories_queryset = Category.objects.all()
+        from gnn_models.category_text_embeddings import refresh_category_text_embeddings
 
+        category_ids = None
         if limit:
-            categories_queryset = categories_queryset[:limit]
+            category_ids = list(Category.objects.values_list('id', flat=True)[:limit])
 
-        categories = list(categories_queryset)
-        total_categories = len(categories)
-
-        if total_categories == 0:
-            self.stdout.write('No categories to process.')
-            return
-
-        self.stdout.write(f'Processing {total_categories} categories...')
-
-        success_count = 0
-        error_count = 0
-
-        for category in categories:
-            try:
-                # Generate embedding
-                embedding = gnn_manager.generate_category_embedding(category.id)
-
-                if embedding is not None:
-                    success_count += 1
-                    self.stdout.write(f'✓ Category {category.id}: "{category.name}"')
-                else:
-                    error_count += 1
-                    self.stdout.write(f'✗ Failed to generate embedding for category {category.id}')
-
-            except Exception as e:
-                error_count += 1
-                self.stdout.write(f'✗ Error processing category {category.id}: {e}')
+        # Batched encode of changed category texts, persisted as CategoryEmbedding(source='text')
+        encoded = refresh_category_text_embeddings(category_ids, force=force)
 
         self.stdout.write(
-            self.style.SUCCESS(f'Category embeddings completed: {success_count} successful, {error_count} errors')
+            self.style.SUCCESS(f'Category embeddings completed: {encoded} encoded, others unchanged')
         )
 
     def generate_user_embeddings(self, gnn_manager, batch_size, force, limit):
@@ -0,0 +1,36 @@
+"""
+Django management command to refresh category centroids (mean post embeddings)
+
+Usage:
+    python manage.py refresh_category_centroids          # Only stale categories
+    python manage.py refresh_category_centroids --all    # Every category
+"""
+
+from django.core.management.base import BaseCommand
+from blog.models import Category
+from gnn_models.centroids import refresh_category_centroids, DEFAULT_MODEL_NAME
+
+
+class Command(BaseCommand):
+    help = 'Recompute CategoryEmbedding centroids from post embeddings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every category, not only stale ones'
+        )
+        parser.add_argument(
+            '--model-name',
+            type=str,
+            default=DEFAULT_MODEL_NAME,
+            help=f'Embedding model whose vectors are averaged (default: {DEFAULT_MODEL_NAME})'
+        )
+
+    def handle(self, *args, **options):
+        category_ids = None
+        if options['all']:
+            category_ids = list(Category.objects.values_list('id', flat=True))
+
+        refreshed = refresh_category_centroids(category_ids, model_name=options['model_name'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {refreshed} category centroids'))
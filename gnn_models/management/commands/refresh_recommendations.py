@@ -0,0 +1,48 @@
+"""
+Django management command to refresh precomputed recommendation lists (run from cron)
+
+Usage:
+    python manage.py refresh_recommendations                # Stale lists only
+    python manage.py refresh_recommendations --all          # Every user with an interest vector
+    python manage.py refresh_recommendations --max-age 1    # Lists older than 1 hour count as stale
+"""
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from gnn_models.centroids import DEFAULT_MODEL_NAME
+from gnn_models.batch_recommendations import refresh_user_recommendations, stale_user_ids, REFRESH_INTERVAL
+
+
+class Command(BaseCommand):
+    help = 'Score users against the post index in blocks and store their recommendation lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Refresh every user, not only stale lists'
+        )
+        parser.add_argument(
+            '--model-name',
+            type=str,
+            default=DEFAULT_MODEL_NAME,
+            help=f'Embedding model of the user and post vectors (default: {DEFAULT_MODEL_NAME})'
+        )
+        parser.add_argument(
+            '--max-age',
+            type=float,
+            default=REFRESH_INTERVAL.total_seconds() / 3600,
+            help=f'Hours after which a list is refreshed (default: {REFRESH_INTERVAL.total_seconds() / 3600:g})'
+        )
+
+    def handle(self, *args, **options):
+        model_name = options['model_name']
+        user_ids = None
+        if not options['all']:
+            user_ids = stale_user_ids(model_name, max_age=timedelta(hours=options['max_age']))
+            self.stdout.write(f'{len(user_ids)} stale recommendation lists')
+            if not user_ids:
+                return
+
+        written = refresh_user_recommendations(user_ids, model_name=model_name)
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} recommendation lists'))
@@ -0,0 +1,49 @@
+"""
+Django management command to fold new interaction events into user interest vectors (run from cron)
+
+Usage:
+    python manage.py update_interest_vectors              # Events since the last run
+    python manage.py update_interest_vectors --rebuild    # Replay the whole event log
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from gnn_models.centroids import DEFAULT_MODEL_NAME
+from gnn_models.interest_vectors import update_interest_vectors, reset_interest_vectors, EVENT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Update UserEmbedding interest vectors incrementally from InteractionEvent'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model-name',
+            type=str,
+            default=DEFAULT_MODEL_NAME,
+            help=f'Embedding model whose post vectors are aggregated (default: {DEFAULT_MODEL_NAME})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EVENT_BATCH_SIZE,
+            help=f'Events per transaction (default: {EVENT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Delete the stored vectors and replay all events'
+        )
+
+    def handle(self, *args, **options):
+        model_name = options['model_name']
+        if options['rebuild']:
+            deleted = reset_interest_vectors(model_name)
+            self.stdout.write(f'Deleted {deleted} interest vectors, cursor rewound')
+
+        started = time.time()
+        totals = update_interest_vectors(model_name, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Applied {totals['events']} events in {totals['batches']} batches: "
+            f"{totals['users_updated']} vectors updated, {totals['users_created']} created "
+            f"({time.time() - started:.1f}s)"
+        ))
@@ -0,0 +1,40 @@
+"""
+Django management command to update post popularity from new events, comments and posts (run from cron)
+
+Usage:
+    python manage.py update_popularity              # Only what happened since the last run
+    python manage.py update_popularity --rebuild    # Recompute from the full history
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from gnn_models.popularity import update_popularity, reset_popularity, BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Merge new interaction events, comments and posts into PostPopularity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Events/comments/posts per transaction (default: {BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Delete all popularity rows and replay the full history'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            deleted = reset_popularity()
+            self.stdout.write(f'Deleted {deleted} popularity rows, cursors rewound')
+
+        started = time.time()
+        totals = update_popularity(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['events']} events, {totals['comments']} comments, {totals['posts']} new posts, "
+            f"{totals['similarities']} similarities -> {totals['rows']} rows written ({time.time() - started:.1f}s)"
+        ))
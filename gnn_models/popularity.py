@@ -0,0 +1,275 @@
+"""
+Streaming post popularity for trending lists and cold-start recommendations
+
+Popularity is a time-decayed sum of weighted signals:
+- every interaction event (weight by type, see EVENT_WEIGHTS)
+- every comment (COMMENT_WEIGHT)
+- the post itself at publication: POST_WEIGHT plus CENTRALITY_WEIGHT times
+  its similarity centrality (sum of its PostSimilarity scores). Similarities
+  are usually computed after a post is first seen, so new PostSimilarity
+  rows are a stream of their own: each adds CENTRALITY_WEIGHT * score at
+  the publication time of both posts
+
+Each signal at time t contributes weight * 2^(-(now - t) / HALF_LIFE). The
+table stores log2 of the sum relative to a fixed EPOCH:
+
+    log_score = log2( sum_i weight_i * 2^((t_i - EPOCH) / HALF_LIFE) )
+
+Decay is then the same for every post, so log_score never has to be
+rewritten as time passes: ordering by it (one index scan) ranks by
+current popularity. New signals are merged with logaddexp2 and no overflow
+can occur. current_score() converts back to the decayed value at a given time.
+
+update_popularity() reads only events, comments, posts and similarities
+after its StreamCursors (up to their settled horizons, see streams), so
+each run costs as much as what happened since the last.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from . import streams
+from .interest_vectors import EVENT_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+HALF_LIFE = timedelta(days=3)
+COMMENT_WEIGHT = 3.0
+POST_WEIGHT = 1.0
+CENTRALITY_WEIGHT = 0.5
+BATCH_SIZE = 50000
+
+CURSORS = {
+    'events': 'popularity:events',
+    'comments': 'popularity:comments',
+    'posts': 'popularity:posts',
+    'similarities': 'popularity:similarities',
+}
+
+
+def log_weights(weights, timestamps):
+    """log2 contributions of signals with the given weights at the given epoch seconds"""
+    weights = np.asarray(weights, dtype=np.float64)
+    offsets = (np.asarray(timestamps, dtype=np.float64) - EPOCH.timestamp()) / HALF_LIFE.total_seconds()
+    with np.errstate(divide='ignore'):
+        return np.log2(weights) + offsets
+
+
+def current_score(log_score, at=None):
+    """Decayed popularity at `at` (default: now) for a stored log_score"""
+    at = at or timezone.now()
+    return float(np.exp2(log_score - (at - EPOCH).total_seconds() / HALF_LIFE.total_seconds()))
+
+
+def _reduce_by_post(post_ids, logs):
+    """Per post: logaddexp2 of all contributions and their number"""
+    post_ids = np.asarray(post_ids, dtype=np.int64)
+    order = np.argsort(post_ids, kind='stable')
+    post_ids, logs = post_ids[order], np.asarray(logs, dtype=np.float64)[order]
+    unique, starts, counts = np.unique(post_ids, return_index=True, return_counts=True)
+    return dict(zip(unique.tolist(), zip(np.logaddexp2.reduceat(logs, starts).tolist(), counts.tolist())))
+
+
+def _similarity_centrality(post_ids, max_similarity_id):
+    """Sum of similarity scores per post over PostSimilarity rows up to max_similarity_id"""
+    from ai_models.models import PostSimilarity
+
+    centrality = dict.fromkeys(post_ids, 0.0)
+    for side in ('post1_id', 'post2_id'):
+        sums = PostSimilarity.objects.filter(
+            **{f'{side}__in': post_ids}, id__lte=max_similarity_id
+        ).values(side).annotate(
+            total=Sum('similarity_score')
+        ).order_by().values_list(side, 'total')
+        for post_id, total in sums:
+            centrality[post_id] += total or 0.0
+    return centrality
+
+
+def _centrality_deltas(similarities):
+    """Per post: sum of the scores of new similarity rows it appears in"""
+    deltas = {}
+    for _, post1_id, post2_id, score in similarities:
+        for post_id in (post1_id, post2_id):
+            deltas[post_id] = deltas.get(post_id, 0.0) + (score or 0.0)
+    return deltas
+
+
+def update_popularity(batch_size=BATCH_SIZE):
+    """
+    Merge new posts, interaction events, comments and similarities into PostPopularity
+
+    Returns:
+        Dict with events, comments, posts, similarities and rows written
+    """
+    from ai_models.models import InteractionEvent, PostPopularity, PostSimilarity, StreamCursor
+    from blog.models import Comment, Post
+    from blog.category_tree import get_category_tree
+
+    posts_cursor, created = StreamCursor.objects.get_or_create(name=CURSORS['posts'])
+    for name in (CURSORS['events'], CURSORS['comments'], CURSORS['similarities']):
+        StreamCursor.objects.get_or_create(name=name)
+
+    totals = {'events': 0, 'comments': 0, 'posts': 0, 'similarities': 0, 'rows': 0}
+    if not created and posts_cursor.position:
+        totals['recategorized'] = sync_root_categories(since=posts_cursor.updated_at)
+    while True:
+        with transaction.atomic():
+            cursors = {
+                cursor.name: cursor
+                for cursor in StreamCursor.objects.select_for_update().filter(name__in=CURSORS.values())
+            }
+            events = streams.next_batch(InteractionEvent.objects.all(), cursors[CURSORS['events']],
+                                        ('post_id', 'event_type', 'created_at'), batch_size)
+            comments = streams.next_batch(Comment.objects.all(), cursors[CURSORS['comments']],
+                                          ('post_id', 'created_at'), batch_size)
+            new_posts = streams.next_batch(Post.objects.all(), cursors[CURSORS['posts']], ('created_at',), batch_size)
+            similarities = streams.next_batch(PostSimilarity.objects.all(), cursors[CURSORS['similarities']],
+                                              ('post1_id', 'post2_id', 'similarity_score'), batch_size)
+            if not (events or comments or new_posts or similarities):
+                break
+            similarity_position = similarities[-1][0] if similarities else cursors[CURSORS['similarities']].position
+            centrality_deltas = _centrality_deltas(similarities)
+
+            event_scores = _reduce_by_post(
+                [post_id for _, post_id, _, _ in events],
+                log_weights([EVENT_WEIGHTS.get(event_type, 0.0) for _, _, event_type, _ in events],
+                            [created.timestamp() for _, _, _, created in events])
+            ) if events else {}
+            comment_scores = _reduce_by_post(
+                [post_id for _, post_id, _ in comments],
+                log_weights([COMMENT_WEIGHT] * len(comments), [created.timestamp() for _, _, created in comments])
+            ) if comments else {}
+
+            touched = set(event_scores) | set(comment_scores) | {post_id for post_id, _ in new_posts}
+            touched |= set(centrality_deltas)
+            existing = PostPopularity.objects.in_bulk(list(touched))
+            missing = touched - set(existing)
+
+            # First sight of a post: its publication signal (with centrality) and root category
+            posts = {
+                post_id: (created, category_id)
+                for post_id, created, category_id in Post.objects.filter(id__in=list(missing)).values_list(
+                    'id', 'created_at', 'primary_category_id'
+                )
+            }
+            # Includes this batch's similarities - their deltas only go to rows that already existed
+            centrality = _similarity_centrality(list(posts), similarity_position) if posts else {}
+            tree = get_category_tree()
+
+            # New similarities of known posts: more centrality, counted at publication time
+            grown = {post_id: delta for post_id, delta in centrality_deltas.items() if post_id in existing and delta > 0}
+            published = dict(Post.objects.filter(id__in=list(grown)).values_list('id', 'created_at')) if grown else {}
+            for post_id, created in published.items():
+                row = existing[post_id]
+                row.centrality += grown[post_id]
+                row.log_score = float(np.logaddexp2(
+                    row.log_score, log_weights(CENTRALITY_WEIGHT * grown[post_id], created.timestamp())
+                ))
+
+            rows = list(existing.values())
+            for post_id, (created, category_id) in posts.items():
+                rows.append(PostPopularity(
+                    post_id=post_id,
+                    root_category_id=tree.root_of(category_id) if category_id else None,
+                    log_score=float(log_weights(POST_WEIGHT + CENTRALITY_WEIGHT * centrality[post_id],
+                                                created.timestamp())),
+                    centrality=centrality[post_id],
+                ))
+
+            now = timezone.now()
+            for row in rows:
+                for scores, counter in ((event_scores, 'interaction_count'), (comment_scores, 'comment_count')):
+                    if row.post_id in scores:
+                        log_score, count = scores[row.post_id]
+                        row.log_score = float(np.logaddexp2(row.log_score, log_score))
+                        setattr(row, counter, getattr(row, counter) + count)
+                # bulk_create skips auto_now on conflict updates
+                row.updated_at = now
+
+            PostPopularity.objects.bulk_create(
+                rows,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['post'],
+                update_fields=['root_category', 'log_score', 'interaction_count', 'comment_count',
+                               'centrality', 'updated_at'],
+            )
+
+            for key, batch in (('events', events), ('comments', comments), ('posts', new_posts),
+                               ('similarities', similarities)):
+                if batch:
+                    streams.advance(cursors[CURSORS[key]], batch)
+                    totals[key] += len(batch)
+            totals['rows'] += len(rows)
+
+    logger.info(f"Popularity: {totals['events']} events, {totals['comments']} comments, "
+                f"{totals['posts']} new posts, {totals['similarities']} similarities -> {totals['rows']} rows")
+    return totals
+
+
+def sync_root_categories(since):
+    """
+    Re-point rows of posts recategorized into another root tree
+
+    Args:
+        since: Only posts modified after this time are checked
+
+    Returns:
+        Number of rows changed
+    """
+    from ai_models.models import PostPopularity
+    from blog.models import Post
+    from blog.category_tree import get_category_tree
+
+    tree = get_category_tree()
+    changed = [
+        PostPopularity(post_id=post_id, root_category_id=root_id)
+        for post_id, category_id, current_root_id in Post.objects.filter(
+            updated_at__gte=since,
+            popularity__isnull=False
+        ).values_list('id', 'primary_category_id', 'popularity__root_category_id').iterator(chunk_size=2000)
+        for root_id in [tree.root_of(category_id) if category_id else None]
+        if root_id != current_root_id
+    ]
+    PostPopularity.objects.bulk_update(changed, ['root_category'], batch_size=1000)
+    return len(changed)
+
+
+def reset_popularity():
+    """Delete all rows and rewind the cursors (full replay on the next update)"""
+    from ai_models.models import PostPopularity, StreamCursor
+
+    with transaction.atomic():
+        deleted, _ = PostPopularity.objects.all().delete()
+        StreamCursor.objects.filter(name__in=CURSORS.values()).update(position=0, processed_events=0)
+    return deleted
+
+
+def top_popular(limit=20, root_category_id=None):
+    """
+    Most popular posts right now (one index scan)
+
+    Args:
+        limit: Number of posts
+        root_category_id: Restrict to one root category tree
+
+    Returns:
+        List of (post_id, current score, interaction_count, comment_count)
+    """
+    from ai_models.models import PostPopularity
+
+    rows = PostPopularity.objects.all()
+    if root_category_id is not None:
+        rows = rows.filter(root_category_id=root_category_id)
+    now = timezone.now()
+    return [
+        (post_id, current_score(log_score, now), interactions, comments)
+        for post_id, log_score, interactions, comments in rows.order_by('-log_score').values_list(
+            'post_id', 'log_score', 'interaction_count', 'comment_count'
+        )[:limit]
+    ]
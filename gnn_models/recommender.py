@@ -0,0 +1,286 @@
+"""
+Two-stage recommender: cheap candidate generation, vectorized re-ranking
+
+Stage 1 collects a few hundred candidates from independent sources, in
+priority order:
+- 'interest': neighbours of the user's interest vector. This is the stored
+  batch list (UserRecommendation) when it is current, otherwise a top-k
+  query on the post vector index
+- 'fresh': recent posts in the user's favorite categories (and their
+  subcategories)
+- 'popular': currently most popular posts (PostPopularity, see
+  gnn_models.popularity)
+
+Stage 2 scores all candidates at once:
+
+    relevance = W_SIMILARITY * cosine(user, post)
+              + W_FRESHNESS * 2^(-age / FRESHNESS_HALF_LIFE)
+              + W_POPULARITY * popularity / max popularity
+
+It then picks the final list with maximal marginal relevance (MMR) over the
+candidates' embeddings (gnn_models.diversify), so near-duplicates do not
+crowd each other in.
+
+Each stage has a latency budget (STAGE_BUDGETS). When candidate generation
+runs out of budget, the remaining lower-priority sources are skipped.
+Durations are returned with every result and aggregated per stage in
+each process (get_stage_stats()).
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from .centroids import DEFAULT_MODEL_NAME
+from .diversify import mmr_select, post_vectors, DEFAULT_DIVERSITY
+from .vector_index import get_post_vector_index
+
+logger = logging.getLogger(__name__)
+
+# Seconds per stage; sources after the budget is spent are skipped
+STAGE_BUDGETS = {
+    'candidates': 0.08,
+    'rerank': 0.04,
+}
+SOURCE_LIMITS = {
+    'interest': 200,
+    'fresh': 100,
+    'popular': 100,
+}
+FRESH_DAYS = 14
+POPULAR_CACHE_TIMEOUT = 300
+
+W_SIMILARITY = 1.0
+W_FRESHNESS = 0.15
+W_POPULARITY = 0.1
+FRESHNESS_HALF_LIFE = timedelta(days=7)
+
+SOURCE_REASONS = {
+    'interest': 'Matches your interests',
+    'fresh': 'New in a category you follow',
+    'popular': 'Popular content',
+}
+
+# Per process, like the event buffer counters: no cache round trip on the request path
+_stage_stats = {}
+_stage_stats_lock = threading.Lock()
+
+
+class StageTimer:
+    """Wall-clock durations of named stages, checked against STAGE_BUDGETS"""
+
+    def __init__(self):
+        self.durations = {}
+        self._started = {}
+
+    def start(self, stage):
+        self._started[stage] = time.perf_counter()
+
+    def elapsed(self, stage):
+        return time.perf_counter() - self._started[stage]
+
+    def over_budget(self, stage):
+        return self.elapsed(stage) > STAGE_BUDGETS[stage]
+
+    def stop(self, stage):
+        duration = self.elapsed(stage)
+        self.durations[stage] = duration
+        _record_stage(stage, duration)
+        if duration > STAGE_BUDGETS[stage]:
+            logger.warning(f"Recommender stage '{stage}' took {duration * 1000:.0f}ms "
+                           f"(budget {STAGE_BUDGETS[stage] * 1000:.0f}ms)")
+        return duration
+
+
+def _record_stage(stage, duration):
+    with _stage_stats_lock:
+        stats = _stage_stats.setdefault(
+            stage, {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'over_budget': 0}
+        )
+        stats['calls'] += 1
+        stats['total_seconds'] += duration
+        stats['max_seconds'] = max(stats['max_seconds'], duration)
+        stats['over_budget'] += duration > STAGE_BUDGETS[stage]
+
+
+def get_stage_stats():
+    """
+    Aggregated stage durations of this process
+
+    Returns:
+        Dict stage -> calls, avg/max seconds, over_budget count, budget
+    """
+    with _stage_stats_lock:
+        snapshot = {stage: dict(stats) for stage, stats in _stage_stats.items()}
+    return {
+        stage: {**stats, 'avg_seconds': stats['total_seconds'] / stats['calls'], 'budget': STAGE_BUDGETS[stage]}
+        for stage, stats in snapshot.items()
+    }
+
+
+# Stage 1 - candidate sources. Each returns {post_id: similarity or None}
+
+def _interest_candidates(user_id, vector, index, model_name, exclude_post_ids, limit):
+    from ai_models.models import UserRecommendation
+
+    if vector is None:
+        return {}
+
+    stored = UserRecommendation.objects.filter(user_id=user_id, model_name=model_name).values_list(
+        'post_ids', 'scores', 'source_updated_at'
+    ).first()
+    if stored is not None and stored[2] >= vector['updated_at']:
+        return {
+            post_id: score for post_id, score in zip(stored[0], stored[1])
+            if post_id not in exclude_post_ids
+        }
+
+    return dict(index.top_k(vector['vector'], limit, exclude_author_id=user_id, exclude_post_ids=exclude_post_ids))
+
+
+def _fresh_candidates(user_id, exclude_post_ids, limit):
+    from accounts.models import UserProfile
+    from blog.models import Post
+    from blog.category_tree import get_category_tree
+
+    favorite_ids = list(
+        UserProfile.favorite_categories.through.objects.filter(
+            userprofile__user_id=user_id
+        ).values_list('category_id', flat=True)
+    )
+    if not favorite_ids:
+        return {}
+
+    category_ids = get_category_tree().descendants(favorite_ids)
+    since = timezone.now() - timedelta(days=FRESH_DAYS)
+    post_ids = Post.objects.filter(
+        Q(primary_category_id__in=category_ids) | Q(additional_categories__in=category_ids),
+        created_at__gte=since
+    ).exclude(author_id=user_id).exclude(id__in=exclude_post_ids).order_by('-created_at').values_list(
+        'id', flat=True
+    ).distinct()[:limit]
+    return dict.fromkeys(post_ids)
+
+
+def popular_post_scores(limit=SOURCE_LIMITS['popular']):
+    """Current decayed popularity of the most popular posts (PostPopularity index scan, cached)"""
+    from .popularity import top_popular
+
+    cache_key = f'recommender_popular:{limit}'
+    scores = cache.get(cache_key)
+    if scores is None:
+        scores = {post_id: score for post_id, score, _, _ in top_popular(limit)}
+        cache.set(cache_key, scores, POPULAR_CACHE_TIMEOUT)
+    return scores
+
+
+def _popular_candidates(exclude_post_ids, limit):
+    return {post_id: None for post_id in popular_post_scores(limit) if post_id not in exclude_post_ids}
+
+
+def recommend(user_id, limit=10, model_name=DEFAULT_MODEL_NAME, exclude_post_ids=(), diversity=DEFAULT_DIVERSITY):
+    """
+    Recommend posts for a user with candidate generation + re-ranking
+
+    Args:
+        user_id: User to recommend for
+        limit: Number of posts to return
+        model_name: Embedding model of the interest and post vectors
+        exclude_post_ids: Posts never to return (already seen)
+        diversity: MMR redundancy weight (0.0 = rank by relevance only)
+
+    Returns:
+        (recommendations, stats) - recommendations are dicts with post_id,
+        score, similarity and sources; stats has per-stage durations and
+        candidate counts per source
+    """
+    from ai_models.models import UserEmbedding
+    from blog.models import Post
+
+    timer = StageTimer()
+    exclude_post_ids = set(exclude_post_ids)
+    index = get_post_vector_index(model_name)
+
+    timer.start('candidates')
+    vector = UserEmbedding.objects.filter(user_id=user_id, model_name=model_name).values(
+        'interest_vector', 'updated_at'
+    ).first()
+    if vector is not None:
+        vector = {'vector': vector['interest_vector'], 'updated_at': vector['updated_at']}
+        if len(index) == 0 or len(vector['vector']) != index.matrix.shape[1]:
+            vector = None
+
+    sources = [
+        ('interest', lambda: _interest_candidates(user_id, vector, index, model_name, exclude_post_ids,
+                                                  SOURCE_LIMITS['interest'])),
+        ('fresh', lambda: _fresh_candidates(user_id, exclude_post_ids, SOURCE_LIMITS['fresh'])),
+        ('popular', lambda: _popular_candidates(exclude_post_ids, SOURCE_LIMITS['popular'])),
+    ]
+    candidates = {}
+    source_counts = {}
+    skipped = []
+    for name, generate in sources:
+        if candidates and timer.over_budget('candidates'):
+            skipped.append(name)
+            continue
+        found = generate()
+        source_counts[name] = len(found)
+        for post_id, similarity in found.items():
+            entry = candidates.setdefault(post_id, {'sources': [], 'similarity': None})
+            entry['sources'].append(name)
+            if similarity is not None:
+                entry['similarity'] = similarity
+
+    # One query drops deleted and own posts and brings the creation times
+    created = dict(
+        Post.objects.filter(id__in=list(candidates)).exclude(author_id=user_id).values_list('id', 'created_at')
+    )
+    post_ids = [post_id for post_id in candidates if post_id in created]
+    timer.stop('candidates')
+
+    timer.start('rerank')
+    recommendations = []
+    if post_ids:
+        vectors = post_vectors(post_ids, model_name)
+
+        if vector is not None:
+            query = np.asarray(vector['vector'], dtype=np.float32)
+            norm = np.linalg.norm(query)
+            similarity = vectors @ (query / norm) if norm > 0 else np.zeros(len(post_ids), dtype=np.float32)
+        else:
+            similarity = np.zeros(len(post_ids), dtype=np.float32)
+
+        now = timezone.now().timestamp()
+        age = now - np.asarray([created[post_id].timestamp() for post_id in post_ids])
+        freshness = np.exp2(-np.maximum(age, 0) / FRESHNESS_HALF_LIFE.total_seconds())
+
+        popular = popular_post_scores()
+        popularity = np.asarray([popular.get(post_id, 0) for post_id in post_ids], dtype=np.float64)
+        if popularity.max() > 0:
+            popularity /= popularity.max()
+
+        relevance = W_SIMILARITY * similarity + W_FRESHNESS * freshness + W_POPULARITY * popularity
+        for choice in mmr_select(relevance, vectors, limit, diversity):
+            post_id = post_ids[choice]
+            recommendations.append({
+                'post_id': post_id,
+                'score': round(float(relevance[choice]), 4),
+                'similarity': round(float(similarity[choice]), 4),
+                'sources': candidates[post_id]['sources'],
+            })
+    timer.stop('rerank')
+
+    stats = {
+        'candidates': len(post_ids),
+        'sources': source_counts,
+        'skipped_sources': skipped,
+        'timings_ms': {stage: round(duration * 1000, 1) for stage, duration in timer.durations.items()},
+        'has_interest_vector': vector is not None,
+    }
+    logger.info(f"Recommendations for user {user_id}: {len(post_ids)} candidates {source_counts}, "
+                f"timings {stats['timings_ms']}")
+    return recommendations, stats
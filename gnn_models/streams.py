@@ -0,0 +1,59 @@
+"""
+Reading append-only tables after a StreamCursor
+
+Consumers read rows with ids above their cursor. Ids are allocated when a
+row is inserted but only become visible when its transaction commits, so
+with several writers a lower id can commit after a higher one was
+consumed - following max(id) would skip it for good. Created timestamps do
+not help: interaction events carry the client's event time.
+
+Each cursor therefore keeps a horizon: the highest id of the table when it
+was last looked at. Once SAFETY_LAG has passed every row up to the horizon
+has committed (or rolled back), so next_batch() reads only up to a horizon
+at least that old and takes a new one when it is caught up. Rows written
+since the last run are picked up by the next run.
+"""
+
+from datetime import timedelta
+from django.db.models import Max
+from django.utils import timezone
+
+# Longer than any transaction that writes stream rows (an event buffer flush takes well under a second)
+SAFETY_LAG = timedelta(seconds=30)
+
+
+def next_batch(queryset, cursor, fields, batch_size, now=None):
+    """
+    Next rows of a table after a cursor, up to its settled horizon
+
+    Args:
+        queryset: Rows of the stream (may be filtered, e.g. events with a user)
+        cursor: StreamCursor locked with select_for_update
+        fields: Fields returned after the id
+        batch_size: Maximum number of rows
+
+    Returns:
+        List of (id, *fields) tuples in id order
+    """
+    now = now or timezone.now()
+    settled = cursor.horizon_at is not None and now - cursor.horizon_at >= SAFETY_LAG
+    if settled and cursor.position < cursor.horizon:
+        rows = list(
+            queryset.filter(id__gt=cursor.position, id__lte=cursor.horizon)
+            .order_by('id').values_list('id', *fields)[:batch_size]
+        )
+        if rows:
+            return rows
+    if cursor.horizon_at is None or settled:
+        # Caught up (or first run): everything up to the current maximum is the next horizon
+        cursor.horizon = queryset.model.objects.aggregate(top=Max('id'))['top'] or 0
+        cursor.horizon_at = now
+        cursor.save(update_fields=['horizon', 'horizon_at'])
+    return []
+
+
+def advance(cursor, rows):
+    """Move a cursor past a batch from next_batch() (in the transaction that applied it)"""
+    cursor.position = rows[-1][0]
+    cursor.processed_events += len(rows)
+    cursor.save(update_fields=['position', 'processed_events', 'updated_at'])
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from ai_models.models import InteractionEvent, StreamCursor
+from blog.category_tree import CategoryTree
+from gnn_models import streams
+from gnn_models.auto_categorization import AutoCategorizationEngine, HierarchicalCategoryClassifier
+
+
+def _unit(*components):
+    vector = np.asarray(components, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class HierarchicalThresholdTests(SimpleTestCase):
+    """A specific category is found even when its broad ancestors score below the threshold"""
+
+    def setUp(self):
+        # Science > Physics > Quantum; the query is exactly Quantum
+        tree = CategoryTree([
+            (1, None, 0, 'Science'),
+            (2, 1, 1, 'Physics'),
+            (3, 2, 2, 'Quantum'),
+            (4, None, 0, 'Art'),
+        ])
+        self.query = _unit(1, 0, 0)
+        vectors = [
+            _unit(1, 1, 0),    # ~0.71 to the query
+            _unit(1, 0.5, 0),  # ~0.89
+            self.query,        # 1.0
+            _unit(0, 0, 1),    # 0.0
+        ]
+        self.classifier = HierarchicalCategoryClassifier([1, 2, 3, 4], vectors, tree)
+
+        with mock.patch.object(AutoCategorizationEngine, '_initialize'):
+            self.engine = AutoCategorizationEngine()
+        self.engine.classifier = self.classifier
+        self.engine.category_embeddings = {
+            category_id: {'name': name, 'post_count': 10}
+            for category_id, name in ((1, 'Science'), (2, 'Physics'), (3, 'Quantum'), (4, 'Art'))
+        }
+
+    def test_classify_beam_threshold_reaches_leaf(self):
+        paths = self.classifier.classify(self.query, min_similarity=0.99, beam_min_similarity=0.3)[0]
+        self.assertEqual([found['category_id'] for found in paths], [3])
+        self.assertEqual([step['category_id'] for step in paths[0]['path']], [1, 2, 3])
+
+    def test_classify_defaults_to_one_threshold(self):
+        self.assertEqual(self.classifier.classify(self.query, min_similarity=0.99), [[]])
+
+    def test_final_category_falls_back_to_ancestor(self):
+        # Closest to Physics: the branch ends at Quantum, which misses the threshold
+        paths = self.classifier.classify(_unit(1, 0.7, 0), min_similarity=0.95, beam_min_similarity=0.3)[0]
+        self.assertEqual([found['category_id'] for found in paths], [2])
+
+    def test_rank_categories_high_threshold(self):
+        suggestions = self.engine._rank_categories(self.query[None, :], [set()], 2, 0.99)[0]
+        self.assertEqual([suggestion['category_id'] for suggestion in suggestions], [3])
+
+
+class StreamBatchTests(TestCase):
+    """Stream reads stop at a horizon old enough for every lower id to have committed"""
+
+    def setUp(self):
+        self.cursor = StreamCursor.objects.create(name='test')
+        self.start = timezone.now()
+
+    def _event(self):
+        return InteractionEvent.objects.create(event_type='view', post_id=1).id
+
+    def _next(self, after, batch_size=10):
+        return [row[0] for row in streams.next_batch(
+            InteractionEvent.objects.all(), self.cursor, ('event_type',), batch_size, now=self.start + after
+        )]
+
+    def test_rows_wait_for_a_settled_horizon(self):
+        first, second = self._event(), self._event()
+        # First look only takes the horizon
+        self.assertEqual(self._next(timedelta(0)), [])
+        self.assertEqual(self.cursor.horizon, second)
+        later = self._event()
+
+        self.assertEqual(self._next(streams.SAFETY_LAG / 2), [])
+        batch = streams.next_batch(InteractionEvent.objects.all(), self.cursor, (), 1,
+                                   now=self.start + streams.SAFETY_LAG)
+        self.assertEqual(batch, [(first,)])
+        streams.advance(self.cursor, batch)
+        self.assertEqual(self._next(streams.SAFETY_LAG), [second])
+        streams.advance(self.cursor, [(second,)])
+
+        # Caught up: the row written after the horizon needs a new one
+        self.assertEqual(self._next(streams.SAFETY_LAG), [])
+        self.assertEqual(self.cursor.horizon, later)
+        self.assertEqual(self._next(2 * streams.SAFETY_LAG), [later])
+
+        self.cursor.refresh_from_db()
+        self.assertEqual((self.cursor.position, self.cursor.processed_events), (second, 2))
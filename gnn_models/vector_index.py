@@ -0,0 +1,113 @@
+"""
+In-memory post embedding index for top-k queries
+
+Scoring every PostEmbedding row in Python (JSON -> np.array -> cosine ->
+serializer) makes recommendation latency grow with the corpus. The index
+loads all vectors of a model with one query into an L2-normalized float32
+matrix. The matrix is memoized per model and validated against the
+PostEmbedding table (row count and latest updated_at, re-read at most every
+few seconds), so embeddings written by commands in other processes are
+picked up. A query is then one
+matrix-vector product, masks for excluded posts, and argpartition for the
+top k. Callers fetch and serialize only the returned post ids.
+"""
+
+import numpy as np
+from django.db.models import Count, Max
+from topicsloop.cache import StampedMemo
+
+_indexes = StampedMemo()
+
+
+class PostVectorIndex:
+    """Normalized post embedding matrix with aligned post/author id arrays"""
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows: Iterable of (post_id, author_id, embedding_vector)
+        """
+        rows = list(rows)
+        self.post_ids = np.asarray([post_id for post_id, _, _ in rows], dtype=np.int64)
+        self.author_ids = np.asarray([author_id for _, author_id, _ in rows], dtype=np.int64)
+        self.position = {post_id: row for row, post_id in enumerate(self.post_ids.tolist())}
+
+        if rows:
+            matrix = np.asarray([vector for _, _, vector in rows], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self.valid = norms.ravel() > 0
+            matrix /= np.where(norms == 0, 1, norms)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+            self.valid = np.zeros(0, dtype=bool)
+        self.matrix = matrix
+
+    def __len__(self):
+        return len(self.post_ids)
+
+    def vector(self, post_id):
+        """Normalized vector of a post (None if not indexed)"""
+        row = self.position.get(post_id)
+        return None if row is None else self.matrix[row]
+
+    def scores(self, query):
+        """Cosine similarity of every indexed post to `query` (zero vectors score -inf)"""
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if len(self) == 0 or norm == 0:
+            return np.full(len(self), -np.inf, dtype=np.float32)
+        if query.shape[0] != self.matrix.shape[1]:
+            raise ValueError(f"Query dimension {query.shape[0]} != index dimension {self.matrix.shape[1]}")
+        scores = self.matrix @ (query / norm)
+        scores[~self.valid] = -np.inf
+        return scores
+
+    def top_k(self, query, k, exclude_author_id=None, exclude_post_ids=(), scores=None):
+        """
+        Most similar posts to a query vector
+
+        Args:
+            query: Query vector (any norm)
+            k: Number of results
+            exclude_author_id: Skip posts written by this user
+            exclude_post_ids: Skip these posts
+            scores: Precomputed scores(query) to reuse
+
+        Returns:
+            List of (post_id, similarity) sorted by similarity, best first
+        """
+        if scores is None:
+            scores = self.scores(query)
+        else:
+            scores = scores.copy()
+        if exclude_author_id is not None:
+            scores[self.author_ids == exclude_author_id] = -np.inf
+        for post_id in exclude_post_ids:
+            row = self.position.get(post_id)
+            if row is not None:
+                scores[row] = -np.inf
+
+        candidates = np.flatnonzero(np.isfinite(scores))
+        if k <= 0 or not len(candidates):
+            return []
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(self.post_ids[row]), float(scores[row])) for row in candidates]
+
+
+def get_post_vector_index(model_name):
+    """Shared PostVectorIndex for one embedding model, rebuilt when its embeddings change"""
+    from ai_models.models import PostEmbedding
+
+    embeddings = PostEmbedding.objects.filter(model_name=model_name)
+
+    def stamp():
+        state = embeddings.aggregate(rows=Count('id'), last_change=Max('updated_at'))
+        return state['rows'], state['last_change']
+
+    def load():
+        rows = embeddings.values_list('post_id', 'post__author_id', 'embedding_vector')
+        return PostVectorIndex(rows.iterator(chunk_size=2000))
+
+    return _indexes.get(model_name, stamp=stamp, load=load, generations=('embeddings', 'posts'))
@@ -0,0 +1,141 @@
+"""
+Generation counters for cache invalidation
+
+Instead of deleting every derived cache entry when data changes, cached
+values embed the current generation of the data they were built from.
+Bumping a generation (on post save, category edit, new embeddings, ...)
+makes all older keys unreachable at once; they simply expire.
+
+Generations in use:
+    posts       - post rows, their categories and tags
+    categories  - category tree (names, parents)
+    embeddings  - PostEmbedding / CategoryEmbedding vectors
+    favorites   - users' favorite categories
+    layout      - stored GraphLayout coordinates
+    communities - stored GraphClustering results
+
+Bumps reach other processes only through a shared cache backend. Data
+written by management commands (layouts, clusterings, embeddings) is also
+memoized with StampedMemo, which checks a cheap database stamp of its
+source so web workers pick up the change no matter where it was made.
+"""
+
+import hashlib
+import threading
+import time
+from django.core.cache import cache
+
+GENERATION_KEY_PREFIX = 'generation'
+
+
+def _generation_key(name):
+    return f'{GENERATION_KEY_PREFIX}:{name}'
+
+
+def _new_series():
+    """
+    Starting value of a generation series (microseconds since the epoch)
+
+    A counter can be evicted like any other entry. Restarting at 1 would
+    bring back generations that older cached values (and in-process memos)
+    were built with; a time-based start is above every value the evicted
+    series reached unless it was bumped more than once per microsecond.
+    """
+    return time.time_ns() // 1000
+
+
+def get_generation(name):
+    """Return the current generation number for a data set"""
+    key = _generation_key(name)
+    value = cache.get(key)
+    if value is None:
+        # First use (or evicted) - start a new series that never expires
+        cache.add(key, _new_series(), None)
+        value = cache.get(key)
+        if value is None:
+            # Evicted again right away (cache full) - still never reuse an old value
+            value = _new_series()
+    return value
+
+
+def bump_generation(*names):
+    """Invalidate everything cached against the given data sets"""
+    for name in names:
+        key = _generation_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Key missing - a new series differs from anything readers cached with
+            cache.set(key, _new_series(), None)
+
+
+def versioned_key(prefix, parts, generations=('posts',)):
+    """
+    Build a cache key bound to the given generations
+
+    Args:
+        prefix: Key namespace, e.g. 'post_results'
+        parts: Hashable description of the query (tuple/str)
+        generations: Data sets the cached value depends on
+
+    Returns:
+        Key string like 'post_results:posts12.categories3:5f1e...'
+    """
+    generation_part = '.'.join(f'{name}{get_generation(name)}' for name in generations)
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'{prefix}:{generation_part}:{digest}'
+
+
+# Seconds a StampedMemo entry is trusted before its database stamp is re-read
+STAMP_CHECK_INTERVAL = 10
+
+
+class StampedMemo:
+    """
+    Process-local memo validated against a database stamp
+
+    The stamp is a small query describing the source's state, e.g. the
+    (id, updated_at) of a row or (count, Max(updated_at)) of a table. It runs
+    at most every check_every seconds per key, and immediately when one of
+    the given generations changed in this process. The value is reloaded
+    only when the stamp differs. A None stamp means "no data": nothing is
+    memoized, so the first write is picked up on the next call.
+    """
+
+    def __init__(self, check_every=STAMP_CHECK_INTERVAL):
+        self.check_every = check_every
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, stamp, load, generations=(), missing=None):
+        """
+        Args:
+            key: Memo key (e.g. graph key or model name)
+            stamp: Zero-argument callable returning the current stamp
+            load: Zero-argument callable returning the value
+            generations: Generation names whose bump forces a stamp check
+            missing: Returned when the stamp is None
+
+        Returns:
+            The memoized or freshly loaded value
+        """
+        now = time.monotonic()
+        generation = tuple(get_generation(name) for name in generations)
+        entry = self._entries.get(key)
+        if entry is not None and entry['generation'] == generation and now - entry['checked_at'] < self.check_every:
+            return entry['value']
+
+        current = stamp()
+        if current is None:
+            self._entries.pop(key, None)
+            return missing
+        if entry is None or entry['stamp'] != current:
+            entry = {'stamp': current, 'value': load()}
+        with self._lock:
+            self._entries[key] = {**entry, 'generation': generation, 'checked_at': now}
+        return entry['value']
+
+    def stamp(self, key):
+        """Stamp of the memoized value (None if nothing is memoized)"""
+        entry = self._entries.get(key)
+        return entry['stamp'] if entry is not None else None
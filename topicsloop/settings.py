@@ -13,6 +13,7 @@ from datetime import timedelta
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 # Load environment variables from .env file
 load_dotenv()
@@ -54,15 +55,40 @@ INSTALLED_APPS = [
 STATIC_URL = '/static/'
 
 # Cache configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'topicsloop-cache',
-        'OPTIONS': {
-            'MAX_ENTRIES': 10000,  # Maximum number of cache entries
+# The cache must be shared by all processes - web workers and management
+# commands (compute_graph_layouts, detect_communities, warm_viz_caches, ...)
+# exchange generation counters, warmed responses and single-flight locks
+# through it. REDIS_URL selects Redis (needs the `redis` package); otherwise
+# the database cache table is used (`python manage.py createcachetable`).
+# CACHE_BACKEND=locmem is only for single-process experiments.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif os.getenv('CACHE_BACKEND') == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'topicsloop-cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,  # Maximum number of cache entries
+            }
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'topicsloop_cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 50000,  # Maximum number of cache entries
+            }
         }
     }
-}
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'frontend/build/static'),
@@ -100,11 +126,13 @@ SIMPLE_JWT = {
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.VizCompressionMiddleware',  # brotli/gzip for /api/viz/
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.InteractionEventMiddleware',  # buffered post view / graph focus events
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -171,6 +199,10 @@ CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:3000'
 
 CORS_ALLOW_CREDENTIALS = True  # Pozwala na przesyłanie ciasteczek z żądaniem
 
+# Tile revalidation (viz/tiles/): the frontend sends If-None-Match and reads ETag
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match')
+CORS_EXPOSE_HEADERS = ['ETag']
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 